@@ -0,0 +1,328 @@
+"""操作轨迹录制与回放：录制界面和命令行对学习系统的每次方法调用（参数、耗时），
+再以最快速度在全新的实例上重放，把真实使用过程变成可重复的性能回归测试
+
+用法：
+    STUDYFAST_TRACE=traces/today.jsonl.gz python3 -m streamlit run modern_ui.py
+    STUDYFAST_TRACE=traces/cli.jsonl python3 studyfast.py
+    python3 action_trace.py traces/today.jsonl.gz --users 1,8,32
+    python3 action_trace.py traces/today.jsonl.gz --users 16 --shared
+"""
+import argparse
+import builtins
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import functools
+import gzip
+import importlib
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from load_test import percentile
+
+TRACE_FORMAT = "studyfast-trace"
+TRACE_VERSION = 2  # 2：返回的对象（如闪卡牌组）编号后可作为后续调用的参数
+DEFAULT_TARGET = "app.DeepLearningSystem"
+JSON_TYPES = (dict, list, tuple, str, int, float, bool, type(None))
+
+
+def _open(path: str, mode: str):
+    """.gz 结尾的轨迹文件按 gzip 读写"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TraceRecorder:
+    """线程安全的轨迹写入器：首行为文件头，之后每次调用一行紧凑的 JSON 数组
+    [开始偏移秒, 会话号, 方法名, 位置参数, 关键字参数, 耗时秒, 异常类型, 交互输入, 返回对象编号]。
+    返回 JSON 之外类型（如闪卡牌组）的调用会给返回值编号，之后作为参数传入时记为 {"__ref__": 编号}，
+    回放时重新执行生成它的调用并把结果传入；其他无法序列化的参数直接报错，不录制无法回放的轨迹"""
+
+    def __init__(self, path: str, target: str = DEFAULT_TARGET, flush_every: int = 100):
+        self.path = path
+        self._file = _open(path, "w")
+        self._lock = threading.Lock()
+        self._sessions: Dict[Any, int] = {}  # 外部会话标识 -> 轨迹中的会话号
+        self._started = time.perf_counter()
+        self._pending = 0
+        self._flush_every = flush_every
+        self._refs = weakref.WeakKeyDictionary()  # 返回过的对象 -> 编号
+        self._next_ref = 0
+        self.events = 0
+        self._file.write(json.dumps({'format': TRACE_FORMAT, 'version': TRACE_VERSION, 'target': target,
+                                     'started_at': datetime.datetime.now().isoformat()},
+                                    ensure_ascii=False) + "\n")
+
+    def record(self, session: Any, method: str, args: tuple, kwargs: Dict[str, Any], started: float,
+               seconds: float, error: Optional[str] = None, inputs: Optional[List[str]] = None,
+               result: Any = None):
+        event = [round(started - self._started, 6), None, method, list(args), kwargs, round(seconds, 6), error]
+        with self._lock:
+            event[1] = self._sessions.setdefault(session, len(self._sessions))
+            ref = self._register(result)
+            if ref is not None:
+                event += [inputs or [], ref]
+            elif inputs:
+                event.append(inputs)
+            self._file.write(json.dumps(event, ensure_ascii=False, separators=(",", ":"),
+                                        default=self._encode_ref) + "\n")
+            self.events += 1
+            self._pending += 1
+            if self._pending >= self._flush_every:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _register(self, result: Any) -> Optional[int]:
+        """给 JSON 之外类型的返回值编号（不能弱引用的对象不编号）"""
+        if isinstance(result, JSON_TYPES):
+            return None
+        try:
+            if result not in self._refs:
+                self._refs[result] = self._next_ref
+                self._next_ref += 1
+            return self._refs[result]
+        except TypeError:
+            return None
+
+    def _encode_ref(self, value: Any) -> Dict[str, int]:
+        try:
+            return {'__ref__': self._refs[value]}
+        except (KeyError, TypeError):
+            raise TypeError(f"无法录制 {type(value).__name__} 类型的参数：既不能序列化为 JSON，"
+                            f"也不是此前录制的调用返回的对象") from None
+
+
+class TracedSystem:
+    """学习系统的录制代理：公开方法的调用经过代理时写入轨迹，属性读取和内部方法原样转发。
+    方法内部互相调用不经过代理，因此只记录界面或命令行直接发起的调用"""
+
+    def __init__(self, system: Any, recorder: TraceRecorder, session: Callable[[], Any] = lambda: 0,
+                 capture_input: bool = False):
+        object.__setattr__(self, "_system", system)
+        object.__setattr__(self, "_recorder", recorder)
+        object.__setattr__(self, "_session", session)
+        object.__setattr__(self, "_capture_input", capture_input)
+
+    def __getattr__(self, name: str):
+        value = getattr(self._system, name)
+        if name.startswith("_") or not callable(value):
+            return value
+
+        @functools.wraps(value)
+        def traced(*args, **kwargs):
+            inputs = []
+            started = time.perf_counter()
+            error = None
+            result = None
+            try:
+                with self._captured_input(inputs):
+                    result = value(*args, **kwargs)
+                    return result
+            except Exception as exc:
+                error = type(exc).__name__
+                raise
+            finally:
+                # 返回学习系统自身（链式调用）时无需编号
+                self._recorder.record(self._session(), name, args, kwargs, started, time.perf_counter() - started,
+                                      error, inputs, None if result is self._system else result)
+
+        return traced
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._system, name, value)
+
+    @contextlib.contextmanager
+    def _captured_input(self, inputs: List[str]) -> Iterator[None]:
+        """命令行版本在方法内部读取交互输入，录制时一并记下，回放时按顺序喂回"""
+        if not self._capture_input:
+            yield
+            return
+        original = builtins.input
+
+        def recording_input(prompt: str = "") -> str:
+            answer = original(prompt)
+            inputs.append(answer)
+            return answer
+
+        builtins.input = recording_input
+        try:
+            yield
+        finally:
+            builtins.input = original
+
+
+def read_trace(path: str) -> Tuple[Dict[str, Any], List[list]]:
+    """读取轨迹文件，返回 (文件头, 调用列表)；录制进程中断时末尾不完整的一行被忽略"""
+    with _open(path, "r") as f:
+        header = json.loads(f.readline())
+        if header.get('format') != TRACE_FORMAT:
+            raise ValueError(f"{path} 不是学习系统的操作轨迹")
+        events = []
+        try:
+            for line in f:
+                events.append(json.loads(line))
+        except (json.JSONDecodeError, EOFError):
+            pass
+    return header, events
+
+
+def load_target(target: str) -> type:
+    """按 "模块.类名" 加载回放目标"""
+    module, _, name = target.rpartition(".")
+    return getattr(importlib.import_module(module), name)
+
+
+class _ReplayInput:
+    """回放时替代 input()：每个线程从自己的队列中取出录制时的输入"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def feed(self, answers: List[str]):
+        self._local.answers = collections.deque(answers)
+
+    def __call__(self, prompt: str = "") -> str:
+        answers = getattr(self._local, 'answers', None)
+        return answers.popleft() if answers else ""
+
+
+@contextlib.contextmanager
+def _replay_environment(target_class: type, replay_input: _ReplayInput) -> Iterator[None]:
+    """回放期间：交互输入改为读取录制内容，命令行版本的模拟等待和输出被跳过"""
+    module = importlib.import_module(target_class.__module__)
+    original_input = builtins.input
+    original_time = getattr(module, "time", None)
+    builtins.input = replay_input
+    if original_time is time:
+        module.time = type("NoSleep", (), {'sleep': staticmethod(lambda seconds: None)})
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = original_input
+        if original_time is time:
+            module.time = original_time
+
+
+def _resolve(value: Any, objects: Dict[int, Any]) -> Any:
+    """把 {"__ref__": 编号} 换成回放时同一调用返回的对象"""
+    if isinstance(value, dict) and len(value) == 1 and '__ref__' in value:
+        return objects[value['__ref__']]
+    return value
+
+
+def _replay_user(system: Any, events: List[list], replay_input: _ReplayInput,
+                 results: Dict[str, List[float]], errors: List[Tuple[str, str]], lock: threading.Lock):
+    """按录制顺序依次重放全部调用（不等待原始的时间间隔）"""
+    timings = collections.defaultdict(list)
+    failures = []
+    objects: Dict[int, Any] = {}  # 返回对象编号 -> 本次回放中同一调用的返回值
+    for event in events:
+        method, recorded_error = event[2], event[6]
+        replay_input.feed(event[7] if len(event) > 7 else [])
+        started = time.perf_counter()
+        try:
+            args = [_resolve(arg, objects) for arg in event[3]]
+            kwargs = {key: _resolve(value, objects) for key, value in event[4].items()}
+            result = getattr(system, method)(*args, **kwargs)
+            if len(event) > 8:
+                objects[event[8]] = result
+        except Exception as exc:
+            # 录制时同样出错的调用不计为回放错误
+            if type(exc).__name__ != recorded_error:
+                failures.append((method, f"{type(exc).__name__}: {exc}"))
+        timings[method].append(time.perf_counter() - started)
+    with lock:
+        for method, values in timings.items():
+            results.setdefault(method, []).extend(values)
+        errors.extend(failures)
+
+
+def replay(path: str, users: int = 1, shared: bool = False,
+           factory: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """以 users 个模拟用户并发重放轨迹：默认每个用户使用独立的全新实例，
+    shared 时所有用户共享同一个实例（对应一个进程服务多个会话）。
+    返回总体吞吐量、延迟以及各方法与录制时的耗时对比"""
+    header, events = read_trace(path)
+    target_class = load_target(header['target'])
+    factory = factory or target_class
+    events.sort(key=lambda event: event[0])
+    recorded = collections.defaultdict(list)
+    for event in events:
+        recorded[event[2]].append(event[5])
+
+    results: Dict[str, List[float]] = {}
+    errors: List[Tuple[str, str]] = []
+    lock = threading.Lock()
+    replay_input = _ReplayInput()
+    systems = [factory()] * users if shared else [factory() for _ in range(users)]
+    with _replay_environment(target_class, replay_input):
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=users) as pool:
+            futures = [pool.submit(_replay_user, system, events, replay_input, results, errors, lock)
+                       for system in systems]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(value for values in results.values() for value in values)
+    methods = []
+    for method, values in sorted(results.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        original = sorted(recorded[method])
+        methods.append({
+            'method': method,
+            'calls': len(values),
+            'total_ms': sum(values) * 1000,
+            'p50_ms': percentile(values, 50) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'recorded_p50_ms': percentile(original, 50) * 1000
+        })
+    return {
+        'target': header['target'],
+        'users': users,
+        'calls': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'methods': methods,
+        'error_samples': errors[:3]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以最快速度重放学习系统的操作轨迹")
+    parser.add_argument("trace", help="录制的轨迹文件（.jsonl 或 .jsonl.gz）")
+    parser.add_argument("--users", default="1", help="逐级增加的模拟用户数，逗号分隔")
+    parser.add_argument("--shared", action="store_true", help="所有模拟用户共享同一个学习系统实例")
+    parser.add_argument("--top", type=int, default=10, help="列出总耗时最多的方法数")
+    args = parser.parse_args()
+
+    print(f"{'模拟用户':>8} {'调用数':>8} {'错误':>6} {'吞吐(次/秒)':>12} {'p50(ms)':>10} {'p99(ms)':>10}")
+    for users in [int(n) for n in args.users.split(",") if n.strip()]:
+        result = replay(args.trace, users, args.shared)
+        print(f"{result['users']:>8} {result['calls']:>8} {result['errors']:>6} "
+              f"{result['throughput']:>12.1f} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f}")
+        for method, error in result['error_samples']:
+            print(f"    ❌ {method}: {error}")
+
+    print(f"\n{'方法':<32} {'调用数':>8} {'总耗时(ms)':>12} {'p50(ms)':>10} {'p99(ms)':>10} {'录制p50(ms)':>12}")
+    for row in result['methods'][:args.top]:
+        print(f"{row['method']:<32} {row['calls']:>8} {row['total_ms']:>12.1f} {row['p50_ms']:>10.2f} "
+              f"{row['p99_ms']:>10.2f} {row['recorded_p50_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,1550 @@
 import streamlit as st
+import atexit
+import bisect
+import collections
+import contextlib
 import json
 import datetime
-from typing import Dict, List, Any, Optional, Tuple, Union
+import functools
+import hashlib
+import itertools
+import os
+import threading
+import uuid
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from action_trace import TraceRecorder, TracedSystem
+from blob_store import BlobStore
+from clock import Clock, SystemClock
+from cold_tier import ColdTier
+from flashcards import DrillDeck, FlashcardIndex, split_cues
+from http_api import start_api_server
+from memory_accounting import MemoryLedger, QuotaExceededError, deep_sizeof
+from merkle_sync import SYNC_COLLECTIONS, MerkleTree, record_hash
+from note_history import NoteHistory
+from recall_log import RECALL_CODES, RecallLog
+from recommend import RecommendationQueue
+from scheduler import JOB_WORKERS, start_background_jobs
+from search_index import PrefixIndex, search_terms
+from session_analytics import SessionAnalytics
+from similarity import MinHashLSH
+from state_store import SQLiteStateStore
+from study_index import TimestampIndex
+
+
+def _mutation(*kinds: str):
+    """修改状态的方法：加锁执行，整个调用使用同一时间戳，完成后向变更流发布 kinds 类数据的变更；
+    接入共享状态库时，先应用其他进程的修改，再把本次调用追加到操作日志"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._lock:
+                if self._mutation_depth:
+                    return method(self, *args, **kwargs)
+                store = self._store
+                with store.transaction() if store is not None else contextlib.nullcontext():
+                    if store is not None:
+                        self._apply_remote_ops()
+                    at = self.clock.now()
+                    self._pinned_now = at
+                    self._mutation_depth += 1
+                    try:
+                        result = method(self, *args, **kwargs)
+                        self._enforce_quotas()
+                    finally:
+                        self._mutation_depth -= 1
+                        self._pinned_now = None
+                    if store is not None:
+                        self._store_seq = store.append_op(method.__name__, args, kwargs, at.isoformat())
+                self._publish(method.__name__, kinds)
+                return result
+        wrapper.change_kinds = kinds
+        return wrapper
+    return decorator
 
 # 导入深度学习系统类
 class DeepLearningSystem:
     """目标导向的深度学习循环系统"""
     
-    def __init__(self):
+    REVIEW_EXPIRY_DAYS = 7  # 逾期超过该天数的晨间复习不再顺延
+    CHANGE_FEED_SIZE = 1000  # 变更流保留的最近事件数
+    CHANGE_KINDS = ("goals", "tasks", "notes", "sessions", "reviews", "recalls", "weak_points", "progress")
+    NOTE_BODY_FIELDS = ("main_notes", "key_questions", "summary")  # 笔记正文字段
+    COLD_AFTER_DAYS = 30  # 笔记超过这么多天未被访问即转入冷存储
+    TOMBSTONE_DAYS = 30  # 复习计划的删除标记保留天数（供增量同步传播删除）
+    INDEX_FLUSH_BATCH = 1000  # 后台整理索引时每次持锁处理的记录数
+    QUOTA_EVICT_BATCH = 64  # 超过软配额时每批转入冷存储的笔记数
+    
+    def __init__(self, blob_dir: Optional[str] = None, cold_after_days: Optional[int] = None,
+                 soft_quota_bytes: Optional[int] = None, hard_quota_bytes: Optional[int] = None,
+                 clock: Optional[Clock] = None):
         self.current_goal = None
+        self.current_goal_id = None
+        self.goals = {}  # 学习目标：goal_id -> {'goal', 'modules', 'task_ids', 'created_at'}
         self.knowledge_modules = []
-        self.minimal_tasks = []
+        self.minimal_tasks = {}  # 任务 id -> 任务；id 稳定，删除后不复用
+        self._next_task_id = 0  # 下一个新任务的 id
         self.notes = {}  # 康奈尔笔记存储
         self.weak_points = []  # 薄弱点记录
         self.study_sessions = []  # 学习会话记录
         self.review_schedule = {}  # 复习计划
+        self._review_carry_from = {}  # 顺延复习：note_id -> 原定复习日期
+        self._review_tombstones = {}  # 已移除的复习计划："日期|note_id" -> 移除时间
+        self._sync_tombstones = {'notes': {}, 'sessions': {}, 'weak_points': {}}  # 已删除的记录：同步键 -> 删除时间
+        self._last_sweep_date = None  # 最近一次清理复习计划的日期
+        self._progress = {}  # 进度汇总：('goal', gid) / ('module', gid, 模块) / ('task', 索引) -> 统计
+        self._recall_log = RecallLog()  # 回忆结果事件日志
+        self._note_history = NoteHistory()  # 笔记修改历史（反向增量）
+        # 设置 blob_dir 时笔记正文存入内容寻址存储，笔记中只保留摘要和大小
+        self._blobs = BlobStore(blob_dir) if blob_dir else None
+        # 冷热分层：久未访问的笔记正文压缩保存（接入内容存储时压缩磁盘文件），访问时自动还原
+        self.cold_after_days = cold_after_days if cold_after_days is not None else self.COLD_AFTER_DAYS
+        self._cold_tier = ColdTier()  # 冷笔记正文：note_id -> 压缩数据
+        self._cold_notes = set()  # 当前处于冷存储的 note_id
+        self._last_tier_date = None  # 最近一次冷热分层的日期
+        # 工作区（学习目标）内存配额：超过软配额时把最久未访问的笔记转入冷存储，超过硬配额时拒绝新的写入
+        self.soft_quota_bytes = soft_quota_bytes
+        self.hard_quota_bytes = hard_quota_bytes
+        # 并发与共享状态
+        self._lock = threading.RLock()
+        self._mutation_depth = 0
+        self._replaying = False  # 正在回放其他进程的操作（不检查硬配额）
+        self.clock = clock or SystemClock()  # 当前时间的来源（测试和模拟时注入手动时钟）
+        self._pinned_now = None  # 修改操作执行期间固定的当前时间
+        self._store = None  # 共享状态库（SQLiteStateStore）
+        self._in_batch = False  # 是否在 batch() 中（嵌套的 batch 并入外层）
+        self._store_seq = 0  # 已应用到本地的最新变更序号
+        self._version = 0  # 本地状态版本，每次变更加一
+        self._replica_id = uuid.uuid4().hex[:12]  # 本实例的标识（未接入共享状态库时区分各进程的状态版本）
+        self._change_feed = collections.deque(maxlen=self.CHANGE_FEED_SIZE)  # (版本, 来源, 变更类别)
+        self._changed = threading.Condition(self._lock)
+        self.scheduler = None  # 后台任务调度器（get_study_system 启动）
+        self._reset_indexes()
+    
+    def _reset_indexes(self):
+        """内部方法：创建空的派生索引"""
+        self._goal_ids_by_name = {}  # 目标名称 -> goal_id
+        self._review_queue = {}  # 复习队列物化视图：日期 -> {note_id: 复习条目}
+        self._review_dates_by_note = {}  # note_id -> 已排入复习队列的日期集合
+        self._note_time_index = TimestampIndex()  # created_at -> note_id
+        self._session_time_index = TimestampIndex()  # timestamp -> 学习会话下标
+        self._weak_point_time_index = TimestampIndex()  # record_time -> 薄弱点下标
+        self._session_analytics = SessionAnalytics()  # 学习会话列式统计
+        self._weak_point_lsh = MinHashLSH()  # 相似薄弱点聚类：薄弱点下标
+        self._note_lsh = MinHashLSH()  # 相似笔记聚类：note_id
+        self._recommendations = RecommendationQueue()  # 下一步行动建议
+        self._note_access = {}  # note_id -> 最近访问时间
+        self._hot_notes = {}  # 工作区 -> 热笔记 {note_id: None}（OrderedDict，按最近访问从旧到新，超配额时从头部转冷）
+        self._hot_note_workspace = {}  # 热笔记 note_id -> 所在工作区
+        self._task_notes = {}  # 任务 id -> {note_id: None}（按登记顺序的笔记集合）
+        self._task_sessions = {}  # 任务 id -> 学习会话下标
+        self._task_weak_points = {}  # 任务 id -> 薄弱点下标
+        self._flashcards = FlashcardIndex()  # 闪卡：任务 -> 各笔记的线索数
+        self._note_search = PrefixIndex()  # 笔记检索：任务名称 + 线索栏
+        self._note_search_dirty = set()  # 待重新登记检索词的 note_id
+        self._stats_cache = {}  # 预先计算的统计：名称 -> 结果
+        self._memory = MemoryLedger()  # 各工作区的内存占用
+        self._memory_dirty = set()  # 待重新计算占用的 (类别, 键)
+        self._stats_key = None  # 统计快照对应的 (数据版本, 日期)
+        self._task_search = PrefixIndex()  # 任务检索：任务名称 + 模块
+        self._merkle = {collection: MerkleTree() for collection in SYNC_COLLECTIONS}  # 增量同步用的 Merkle 树
+        self._merkle_dirty = {collection: set() for collection in SYNC_COLLECTIONS}  # 待重新计算叶子的键
+        self._sync_item_keys = {'sessions': {}, 'weak_points': {}}  # 同步键 -> 列表下标
+    
+    def _rebuild_indexes(self):
+        """内部方法：根据基础数据重建全部派生索引"""
+        self._reset_indexes()
+        self._goal_ids_by_name = {goal['goal']: goal_id for goal_id, goal in self.goals.items()}
+        self._rebuild_review_queue()
+        for note_id, note in self.notes.items():
+            self._note_time_index.add(note['created_at'], note_id)
+            self._note_access[note_id] = note['created_at']
+            self._task_notes.setdefault(note['task_id'], {})[note_id] = None
+            self._merkle_set('notes', note_id)
+            key_questions = self._read_note_body(note_id, 'key_questions')
+            self._flashcards.set(note_id, note['task_id'], len(split_cues(key_questions)))
+            self._note_search_dirty.add(note_id)
+            if 'source' in note:
+                continue
+            self._note_lsh.add(note_id, f"{self._read_note_body(note_id, 'main_notes')} "
+                                        f"{self._read_note_body(note_id, 'key_questions')}")
+        for note_id in sorted(self._note_access, key=self._note_access.get):
+            if note_id not in self._cold_notes:
+                self._mark_hot(note_id)
+        for i, session in enumerate(self.study_sessions):
+            self._session_time_index.add(session['timestamp'], i)
+            self._task_sessions.setdefault(session['task_index'], []).append(i)
+            self._track_sync_item('sessions', self._session_sync_key(session), i)
+        self._session_analytics.extend([session['timestamp'] for session in self.study_sessions],
+                                       [session['task_index'] for session in self.study_sessions],
+                                       [session['duration'] for session in self.study_sessions])
+        for i, point in enumerate(self.weak_points):
+            self._weak_point_time_index.add(point['record_time'], i)
+            self._weak_point_lsh.add(i, f"{point['weak_point']} {point['blind_spot']}")
+            self._task_weak_points.setdefault(point['task_index'], []).append(i)
+            self._track_sync_item('weak_points', self._weak_point_sync_key(point), i)
+        for key in self._review_tombstones:
+            self._merkle_set('reviews', key)
+        for collection, tombstones in self._sync_tombstones.items():
+            for key in tombstones:
+                self._merkle_set(collection, key)
+        for task_index, task in self.minimal_tasks.items():
+            self._task_search.add(task_index, search_terms(task['name'], task.get('module') or ''))
+            self._refresh_task_recommendations(task_index)
+        for note_id in self.notes:
+            self._refresh_note_recommendation(note_id)
+        self._refresh_review_recommendation()
+    
+    def _now(self) -> datetime.datetime:
+        """内部方法：当前时间（修改操作执行和回放期间固定为操作时间）"""
+        return self._pinned_now or self.clock.now()
+    
+    @property
+    def version(self) -> int:
+        """本地状态版本（单调递增）"""
+        return self._version
+    
+    def has_store(self) -> bool:
+        """是否接入了共享状态库"""
+        return self._store is not None
+    
+    def state_tag(self) -> str:
+        """状态标识（HTTP 接口的 ETag）：接入共享状态库时为已应用的变更序号，各进程读到的同一状态标识相同；
+        否则为实例标识 + 本地状态版本"""
+        with self._lock:
+            if self._store is not None:
+                return f"seq-{self._store_seq}"
+            return f"{self._replica_id}-{self._version}"
+    
+    def _publish(self, source: str, kinds: Tuple[str, ...]):
+        """内部方法：发布一条变更事件并唤醒等待中的订阅者"""
+        with self._lock:
+            self._version += 1
+            self._change_feed.append((self._version, source, frozenset(kinds)))
+            self._changed.notify_all()
+    
+    def changes_since(self, version: int, kinds: Optional[Tuple[str, ...]] = None) -> Optional[List[Dict[str, Any]]]:
+        """获取 version 之后的变更事件（可按类别过滤）；事件已滚出变更流时返回 None，订阅者应整体刷新"""
+        with self._lock:
+            if version >= self._version:
+                return []
+            if not self._change_feed or self._change_feed[0][0] > version + 1:
+                return None
+            start = version + 1 - self._change_feed[0][0]
+            events = itertools.islice(self._change_feed, start, None)
+            return [{'version': event_version, 'source': source, 'kinds': sorted(event_kinds)}
+                    for event_version, source, event_kinds in events
+                    if kinds is None or not event_kinds.isdisjoint(kinds)]
+    
+    def wait_for_change(self, version: int, timeout: Optional[float] = None) -> int:
+        """阻塞等待状态版本超过 version（或超时），返回最新版本"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version > version, timeout)
+            return self._version
+    
+    def export_state(self) -> Dict[str, Any]:
+        """导出可 JSON 序列化的完整状态（不含可重建的索引）"""
+        with self._lock:
+            return json.loads(json.dumps({
+                'current_goal': self.current_goal,
+                'current_goal_id': self.current_goal_id,
+                'goals': self.goals,
+                'knowledge_modules': self.knowledge_modules,
+                'minimal_tasks': self.minimal_tasks,
+                'next_task_id': self._next_task_id,
+                'notes': {note_id: {**note, **self._cold_tier.peek(note_id)} if note_id in self._cold_tier else note
+                          for note_id, note in self.notes.items()},
+                'weak_points': self.weak_points,
+                'study_sessions': self.study_sessions,
+                'review_schedule': self.review_schedule,
+                'review_carry_from': self._review_carry_from,
+                'review_tombstones': self._review_tombstones,
+                'sync_tombstones': self._sync_tombstones,
+                'last_sweep_date': self._last_sweep_date,
+                'progress': [[list(key), stats] for key, stats in self._progress.items()],
+                'recall_log': self._recall_log.to_dict(),
+                'note_history': self._note_history.to_dict()
+            }, ensure_ascii=False))
+    
+    def load_state(self, state: Dict[str, Any]):
+        """载入 export_state 导出的状态并重建索引"""
+        with self._lock:
+            self.current_goal = state['current_goal']
+            self.current_goal_id = state['current_goal_id']
+            self.goals = state['goals']
+            tasks = state['minimal_tasks']
+            # 旧版状态中任务为列表，引用用的是列表下标，直接把下标作为 id
+            self.minimal_tasks = ({i: task for i, task in enumerate(tasks)} if isinstance(tasks, list)
+                                  else {int(task_index): task for task_index, task in tasks.items()})
+            self._next_task_id = state.get('next_task_id', max(self.minimal_tasks, default=-1) + 1)
+            self.knowledge_modules = (self.goals[self.current_goal_id]['modules']
+                                      if self.current_goal_id in self.goals else state['knowledge_modules'])
+            self._cold_tier.clear()
+            self._cold_notes.clear()
+            self.notes = state['notes']
+            self.weak_points = state['weak_points']
+            self.study_sessions = state['study_sessions']
+            self.review_schedule = state['review_schedule']
+            self._review_carry_from = state['review_carry_from']
+            self._review_tombstones = state.get('review_tombstones', {})
+            self._sync_tombstones = {'notes': {}, 'sessions': {}, 'weak_points': {},
+                                     **state.get('sync_tombstones', {})}
+            self._last_sweep_date = state['last_sweep_date']
+            self._progress = {tuple(key): stats for key, stats in state['progress']}
+            self._recall_log = RecallLog.from_dict(state['recall_log'])
+            self._note_history = NoteHistory.from_dict(state.get('note_history', {}))
+            self._rebuild_indexes()
+            self._publish('load_state', self.CHANGE_KINDS)
+        return self
+    
+    def attach_store(self, store: SQLiteStateStore):
+        """接入共享状态库：载入快照和操作日志，之后的修改对所有进程可见"""
+        with self._lock:
+            self._store = store
+            self._store_seq = 0
+            self._apply_remote_ops()
+        return self
+    
+    def sync(self) -> int:
+        """拉取其他进程写入共享状态库的修改，返回应用的操作数"""
+        if self._store is None:
+            return 0
+        with self._lock:
+            return self._apply_remote_ops()
+    
+    def _apply_remote_ops(self) -> int:
+        """内部方法：按变更序号回放本地尚未应用的操作"""
+        store = self._store
+        if store.latest_seq() == self._store_seq:
+            return 0
+        if store.snapshot_seq() > self._store_seq:
+            # 需要的操作已被压缩进快照，先载入快照
+            snapshot_seq, state = store.load_snapshot()
+            self.load_state(state)
+            self._store_seq = snapshot_seq
+            merkle = store.load_merkle()
+            if merkle is not None and merkle[0] == snapshot_seq:
+                self._restore_merkle(merkle[1])
+        ops = store.read_ops(self._store_seq)
+        for seq, method, args, kwargs, at in ops:
+            self._pinned_now = datetime.datetime.fromisoformat(at)
+            self._mutation_depth += 1
+            self._replaying = True
+            replayed = getattr(type(self), method)
+            try:
+                replayed.__wrapped__(self, *args, **kwargs)
+            finally:
+                self._mutation_depth -= 1
+                self._replaying = False
+                self._pinned_now = None
+            self._store_seq = seq
+            self._publish(method, replayed.change_kinds)
+        if ops:
+            self._enforce_quotas()
+        return len(ops)
+    
+    def compact_store(self, min_ops: int = 0) -> int:
+        """把当前状态写成快照并清理已覆盖的操作日志，返回快照的变更序号；
+        min_ops 大于 0 时只在快照之后积累了这么多操作时才压缩"""
+        if self._store is None:
+            return 0
+        if min_ops and self._store.latest_seq() - self._store.snapshot_seq() < min_ops:
+            return self._store.snapshot_seq()
+        with self._lock, self._store.transaction():
+            self._apply_remote_ops()
+            merkle = {collection: self._merkle_tree(collection).all_leaves() for collection in SYNC_COLLECTIONS}
+            self._store.save_snapshot(self._store_seq, self.export_state(), merkle)
+            return self._store_seq
         
+    # 增量同步：Merkle 树比较在 merkle_sync.sync_systems 中进行，这里提供两端共用的查询和写入接口
+    def _session_sync_key(self, session: Dict) -> str:
+        return f"{session['timestamp']}|{self.minimal_tasks[session['task_index']]['name']}"
+    
+    def _weak_point_sync_key(self, point: Dict) -> str:
+        return f"{point['record_time']}|{point['task_name']}|{point['weak_point']}"
+    
+    def _track_sync_item(self, collection: str, key: str, index: int):
+        """内部方法：登记会话/薄弱点的同步键并更新 Merkle 叶子"""
+        self._sync_item_keys[collection][key] = index
+        self._sync_tombstones[collection].pop(key, None)
+        self._merkle_set(collection, key)
+    
+    def _merkle_set(self, collection: str, key: str):
+        """内部方法：标记 Merkle 叶子和内存占用待更新（用到时再计算，写入路径不做哈希）"""
+        self._merkle_dirty[collection].add(key)
+        self._memory_dirty.add((collection, key))
+    
+    def _restore_merkle(self, leaves: Dict[str, Dict[str, str]]):
+        """内部方法：采用随快照保存的叶子摘要，载入快照后不必重新计算每条记录的摘要"""
+        for collection in SYNC_COLLECTIONS:
+            self._merkle[collection] = MerkleTree.from_leaves(leaves.get(collection, {}), self.merkle_depth())
+            self._merkle_dirty[collection].clear()
+    
+    def _merkle_tree(self, collection: str, limit: Optional[int] = None) -> MerkleTree:
+        """内部方法：按记录当前内容更新待更新的叶子（最多 limit 个），返回 Merkle 树"""
+        tree = self._merkle[collection]
+        dirty = self._merkle_dirty[collection]
+        for _ in range(len(dirty) if limit is None else min(limit, len(dirty))):
+            key = dirty.pop()
+            record = self._sync_record(collection, key, with_bodies=False)
+            if record is None:
+                tree.discard(key)
+            else:
+                tree.set(key, record_hash(record))
+        return tree
+    
+    def _sync_task_ref(self, task_index: int) -> Dict[str, Optional[str]]:
+        """内部方法：用名称（而非本地下标）表示任务，两端下标可以不同"""
+        task = self.minimal_tasks[task_index]
+        goal = self.goals.get(task.get('goal_id'))
+        return {'task': task['name'], 'goal': goal['goal'] if goal else None, 'module': task.get('module')}
+    
+    def _note_body_digest(self, note_id: str, field: str) -> str:
+        """内部方法：正文的 SHA-256 摘要（内容存储中的笔记直接使用引用里的摘要）"""
+        ref = self.notes[note_id].get('bodies', {}).get(field)
+        if ref is not None:
+            return ref['hash']
+        return hashlib.sha256(self._read_note_body(note_id, field).encode('utf-8')).hexdigest()
+    
+    def _sync_record(self, collection: str, key: str, with_bodies: bool = True) -> Optional[Dict[str, Any]]:
+        """内部方法：与本地存储方式无关的同步记录；with_bodies=False 时正文只取摘要（用于计算叶子）"""
+        if collection == 'notes':
+            note = self.notes.get(key)
+            if note is None:
+                return self._sync_tombstone(collection, key)
+            record = self._sync_task_ref(note['task_id'])
+            record['created_at'] = note['created_at']
+            for field in ('updated_at', 'source'):
+                if field in note:
+                    record[field] = note[field]
+            for field in self.NOTE_BODY_FIELDS:
+                record[field] = (self._read_note_body(key, field) if with_bodies
+                                 else self._note_body_digest(key, field))
+            return record
+        if collection == 'reviews':
+            if key in self._review_tombstones:
+                return {'deleted_at': self._review_tombstones[key]}
+            date, note_id = key.split('|', 1)
+            focus_point = self.review_schedule.get(date, {}).get(note_id)
+            if focus_point is None:
+                return None
+            return {'date': date, 'note_id': note_id, 'focus_point': focus_point}
+        index = self._sync_item_keys[collection].get(key)
+        if index is None:
+            return self._sync_tombstone(collection, key)
+        if collection == 'sessions':
+            session = self.study_sessions[index]
+            record = self._sync_task_ref(session['task_index'])
+            record.update(duration=session['duration'], timestamp=session['timestamp'])
+            return record
+        point = self.weak_points[index]
+        record = self._sync_task_ref(point['task_index'])
+        record.update({field: point[field] for field in
+                       ('weak_point', 'blind_spot', 'practice_score', 'record_time')})
+        return record
+    
+    def _sync_tombstone(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        """内部方法：已删除记录的删除标记（同步时传播删除，防止另一端把记录再同步回来）"""
+        deleted_at = self._sync_tombstones[collection].get(key)
+        return None if deleted_at is None else {'deleted_at': deleted_at}
+    
+    def merkle_depth(self) -> int:
+        return self._merkle['notes'].depth
+    
+    def merkle_root(self, collection: str) -> str:
+        """某类数据的 Merkle 根摘要"""
+        with self._lock:
+            return self._merkle_tree(collection).node_hash("")
+    
+    def merkle_children(self, collection: str, prefix: str) -> Dict[str, str]:
+        """Merkle 树某个节点的非空子节点摘要"""
+        with self._lock:
+            return self._merkle_tree(collection).children(prefix)
+    
+    def merkle_leaves(self, collection: str, prefix: str) -> Dict[str, str]:
+        """Merkle 树某个叶子桶内的 键 -> 记录摘要"""
+        with self._lock:
+            return self._merkle_tree(collection).leaves(prefix)
+    
+    def export_sync_records(self, collection: str, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """导出需要发给另一端的同步记录（不存在的键省略）"""
+        with self._lock:
+            records = {}
+            for key in keys:
+                record = self._sync_record(collection, key)
+                if record is not None:
+                    records[key] = record
+            return records
+    
+    def _resolve_sync_task(self, record: Dict[str, Any], task_ids: Dict[Tuple, int]) -> int:
+        """内部方法：按 目标名称 + 任务名称 找到本地任务，不存在时创建"""
+        goal_id = self._ensure_goal(record['goal']) if record['goal'] is not None else None
+        if goal_id not in task_ids:
+            task_ids[goal_id] = {self.minimal_tasks[i]['name']: i for i in self._goal_task_ids(goal_id)}
+        by_name = task_ids[goal_id]
+        if record['task'] not in by_name:
+            by_name[record['task']] = self._register_task({
+                'name': record['task'],
+                'description': "",
+                'module': record['module']
+            }, goal_id)
+        return by_name[record['task']]
+    
+    @_mutation("goals", "tasks", "notes", "sessions", "weak_points", "reviews", "progress")
+    def apply_sync_records(self, collection: str, records: Dict[str, Dict[str, Any]]) -> int:
+        """写入另一端发来的同步记录（覆盖本地同键记录，删除标记则删除本地记录），返回写入条数"""
+        task_ids = {}
+        deleted = []  # 待删除的笔记 id / 会话和薄弱点下标，最后一并删除（保证循环中的下标有效）
+        for key, record in records.items():
+            if 'deleted_at' in record and collection != 'reviews':
+                self._apply_sync_delete(collection, key, record['deleted_at'], deleted)
+            elif collection == 'notes':
+                self._apply_sync_note(key, record, task_ids)
+            elif collection == 'sessions':
+                self._apply_sync_session(key, record, task_ids)
+            elif collection == 'weak_points':
+                self._apply_sync_weak_point(key, record, task_ids)
+            else:
+                self._apply_sync_review(key, record)
+        if collection == 'notes' and deleted:
+            counts = collections.Counter(self.notes[note_id]['task_id'] for note_id in deleted)
+            self._drop_notes(deleted)
+            for task_index, count in counts.items():
+                self._rollup(task_index, notes=-count, completed=0 if self._task_notes.get(task_index) else -1)
+                self._refresh_task_recommendations(task_index)
+        elif deleted:
+            self._remove_items(collection, deleted)
+        if collection == 'reviews':
+            self._refresh_review_recommendation()
+        return len(records)
+    
+    def _apply_sync_delete(self, collection: str, key: str, deleted_at: str, deleted: List):
+        if collection == 'notes':
+            if key in self.notes:
+                deleted.append(key)
+        else:
+            index = self._sync_item_keys[collection].get(key)
+            if index is not None:
+                if collection == 'weak_points':
+                    point = self.weak_points[index]
+                    self._rollup(point['task_index'], score_sum=-point['practice_score'], score_count=-1)
+                    self._refresh_task_recommendations(point['task_index'])
+                deleted.append(index)
+        self._sync_tombstones[collection][key] = deleted_at
+        self._merkle_set(collection, key)
+    
+    def _apply_sync_note(self, note_id: str, record: Dict[str, Any], task_ids: Dict):
+        task_index = self._resolve_sync_task(record, task_ids)
+        note = self.notes.get(note_id)
+        previous = self._note_version(note_id)
+        if note is None:
+            first_note = not self._progress.get(('task', task_index), {}).get('notes')
+            self._rollup(task_index, notes=1, completed=1 if first_note else 0)
+            self._task_notes.setdefault(task_index, {})[note_id] = None
+        else:
+            self._touch_note(note_id)
+            self._note_time_index.remove(note['created_at'], note_id)
+            if note['task_id'] != task_index:
+                self._rollup(note['task_id'], notes=-1)
+                self._rollup(task_index, notes=1)
+                self._unlink_note(note_id, note['task_id'])
+                self._task_notes.setdefault(task_index, {})[note_id] = None
+        self.notes[note_id] = {'task_id': task_index, 'created_at': record['created_at']}
+        for field in ('updated_at', 'source'):
+            if field in record:
+                self.notes[note_id][field] = record[field]
+        bodies = {field: record[field] for field in self.NOTE_BODY_FIELDS}
+        self._set_note_bodies(note_id, **bodies)
+        if previous is not None:
+            self._note_history.record(note_id, *previous, bodies)
+        self._note_time_index.add(record['created_at'], note_id)
+        if 'source' in record:
+            self._note_lsh.remove(note_id)
+        else:
+            self._note_lsh.update(note_id, f"{record['main_notes']} {record['key_questions']}")
+        self._refresh_task_recommendations(task_index)
+        self._refresh_note_recommendation(note_id)
+        self._refresh_review_entries(note_id)
+    
+    def _apply_sync_session(self, key: str, record: Dict[str, Any], task_ids: Dict):
+        session = {
+            'task_index': self._resolve_sync_task(record, task_ids),
+            'duration': record['duration'],
+            'timestamp': record['timestamp']
+        }
+        index = self._sync_item_keys['sessions'].get(key)
+        if index is not None:
+            # 同一会话两端时长不同：只更新记录本身
+            self.study_sessions[index] = session
+            self._merkle_set('sessions', key)
+            return
+        self.study_sessions.append(session)
+        index = len(self.study_sessions) - 1
+        self._session_time_index.add(session['timestamp'], index)
+        self._session_analytics.append(session['timestamp'], session['task_index'], session['duration'])
+        self._task_sessions.setdefault(session['task_index'], []).append(index)
+        self._track_sync_item('sessions', key, index)
+    
+    def _apply_sync_weak_point(self, key: str, record: Dict[str, Any], task_ids: Dict):
+        task_index = self._resolve_sync_task(record, task_ids)
+        point = {'task_index': task_index, 'task_name': record['task']}
+        point.update({field: record[field] for field in ('weak_point', 'blind_spot', 'practice_score', 'record_time')})
+        index = self._sync_item_keys['weak_points'].get(key)
+        if index is not None:
+            old = self.weak_points[index]
+            self._rollup(old['task_index'], score_sum=-old['practice_score'], score_count=-1)
+            self.weak_points[index] = point
+            self._weak_point_lsh.update(index, f"{point['weak_point']} {point['blind_spot']}")
+        else:
+            self.weak_points.append(point)
+            index = len(self.weak_points) - 1
+            self._weak_point_time_index.add(point['record_time'], index)
+            self._weak_point_lsh.add(index, f"{point['weak_point']} {point['blind_spot']}")
+            self._task_weak_points.setdefault(task_index, []).append(index)
+        self._rollup(task_index, score_sum=point['practice_score'], score_count=1)
+        self._refresh_task_recommendations(task_index)
+        self._track_sync_item('weak_points', key, index)
+    
+    def _apply_sync_review(self, key: str, record: Dict[str, Any]):
+        date, note_id = key.split('|', 1)
+        if 'deleted_at' in record:
+            self._remove_review(date, note_id)
+            if note_id not in self._review_dates_by_note:
+                self._review_carry_from.pop(note_id, None)
+            self._review_tombstones[key] = record['deleted_at']
+            self._merkle_set('reviews', key)
+        else:
+            self.review_schedule.setdefault(date, {})[note_id] = record['focus_point']
+            self._put_review_entry(date, note_id, record['focus_point'])
+    
+    @_mutation("goals")
     def set_learning_goal(self, goal: str):
-        """第一阶段：设定学习目标"""
+        """第一阶段：设定学习目标（已存在的目标直接切换）"""
+        goal_id = self._ensure_goal(goal)
+        self.current_goal_id = goal_id
         self.current_goal = goal
+        self.knowledge_modules = self.goals[goal_id]['modules']
         return self
     
+    def _ensure_goal(self, goal: str) -> str:
+        """内部方法：按名称查找学习目标，不存在时创建，返回 goal_id"""
+        goal_id = self._goal_ids_by_name.get(goal)
+        if goal_id is None:
+            goal_id = f"goal_{len(self.goals) + 1}"
+            self.goals[goal_id] = {
+                'goal': goal,
+                'modules': [],
+                'task_ids': [],
+                'created_at': self._now().isoformat()
+            }
+            self._goal_ids_by_name[goal] = goal_id
+        return goal_id
+    
+    @_mutation("goals")
+    def switch_goal(self, goal_id: str) -> bool:
+        """切换当前学习目标"""
+        if goal_id not in self.goals:
+            return False
+        self.set_learning_goal(self.goals[goal_id]['goal'])
+        return True
+    
+    @_mutation("goals")
     def break_down_modules(self, modules: List[str]):
         """拆解知识模块"""
         self.knowledge_modules = modules
+        if self.current_goal_id is not None:
+            self.goals[self.current_goal_id]['modules'] = modules
         return self
     
+    @_mutation("tasks", "progress")
     def create_minimal_tasks(self, tasks: List[Dict]):
-        """创建最小学习单元任务"""
-        self.minimal_tasks = tasks
+        """创建最小学习单元任务（追加到当前目标，同名任务不重复创建）"""
+        goal_id = self.current_goal_id
+        existing = {self.minimal_tasks[i]['name'] for i in self._goal_task_ids(goal_id)}
+        for task in tasks:
+            if task['name'] not in existing:
+                self._register_task(dict(task), goal_id)
+                existing.add(task['name'])
         return self
     
+    @_mutation("tasks", "progress")
+    def add_task(self, name: str, description: str, module: Optional[str] = None) -> int:
+        """向当前目标手动添加一个学习任务，返回任务索引"""
+        return self._register_task({
+            'name': name,
+            'description': description,
+            'module': module
+        }, self.current_goal_id)
+    
+    def _register_task(self, task: Dict, goal_id: Optional[str]) -> int:
+        """内部方法：登记任务并更新目标、模块的任务计数"""
+        task_index = self._next_task_id
+        self._next_task_id += 1
+        task['goal_id'] = goal_id
+        task.setdefault('module', None)
+        self.minimal_tasks[task_index] = task
+        if goal_id is not None:
+            self.goals[goal_id]['task_ids'].append(task_index)
+        self._task_search.add(task_index, search_terms(task['name'], task.get('module') or ''))
+        self._rollup(task_index, tasks=1)
+        self._refresh_task_recommendations(task_index)
+        return task_index
+    
+    def _goal_task_ids(self, goal_id: Optional[str]) -> List[int]:
+        """内部方法：获取某个目标下的任务索引"""
+        if goal_id is None:
+            return [i for i, task in self.minimal_tasks.items() if task.get('goal_id') is None]
+        return self.goals[goal_id]['task_ids']
+    
+    def get_goal_tasks(self, goal_id: Optional[str] = None) -> List[Tuple[int, Dict]]:
+        """获取目标下的任务列表（默认当前目标），返回 (任务索引, 任务)"""
+        with self._lock:
+            if goal_id is None:
+                goal_id = self.current_goal_id
+            return [(i, self.minimal_tasks[i]) for i in self._goal_task_ids(goal_id)]
+    
+    @_mutation("goals", "tasks")
+    def reorder_tasks(self, task_ids: List[int]) -> bool:
+        """调整当前目标下任务的顺序（task_ids 须为这些任务的一个排列），任务 id 不变"""
+        goal_id = self.current_goal_id
+        if sorted(task_ids) != sorted(self._goal_task_ids(goal_id)):
+            return False
+        if goal_id is not None:
+            self.goals[goal_id]['task_ids'] = list(task_ids)
+        else:
+            # 未归属目标的任务按任务表顺序排列：依次填回它们原来的位置
+            ordered = iter(task_ids)
+            keys = [next(ordered) if task.get('goal_id') is None else i for i, task in self.minimal_tasks.items()]
+            self.minimal_tasks = {i: self.minimal_tasks[i] for i in keys}
+        return True
+    
+    @_mutation("goals", "tasks", "notes", "sessions", "weak_points", "reviews", "progress")
+    def delete_task(self, task_index: int) -> bool:
+        """删除任务及其笔记、学习会话和薄弱点（任务 id 不会被复用）；
+        只移除这些记录自己的索引项，并留下删除标记供增量同步传播删除"""
+        task = self.minimal_tasks.get(task_index)
+        if task is None:
+            return False
+        deleted_at = self._now().isoformat()
+        note_ids = list(self._task_notes.get(task_index, ()))
+        self._drop_notes(note_ids)
+        for note_id in note_ids:
+            self._sync_tombstones['notes'][note_id] = deleted_at
+        for collection, items in (('sessions', self._task_sessions), ('weak_points', self._task_weak_points)):
+            for key in self._remove_items(collection, list(items.get(task_index, ()))):
+                self._sync_tombstones[collection][key] = deleted_at
+        # 从模块、目标的汇总中扣除该任务的统计
+        stats = self._progress.get(('task', task_index))
+        if stats is not None:
+            self._rollup(task_index, **{field: -value for field, value in stats.items()})
+            del self._progress[('task', task_index)]
+        goal = self.goals.get(task.get('goal_id'))
+        if goal is not None:
+            goal['task_ids'].remove(task_index)
+        del self.minimal_tasks[task_index]
+        self._task_search.remove(task_index)
+        self._recommendations.remove(('study', task_index))
+        self._recommendations.remove(('practice', task_index))
+        self._refresh_review_recommendation()
+        return True
+    
+    def _drop_notes(self, note_ids: List[str]):
+        """内部方法：删除笔记，只移除它们自己的索引项（其复习计划留下删除标记）"""
+        for note_id in note_ids:
+            self._unmark_hot(note_id)
+            note = self.notes.pop(note_id)
+            for date in list(self._review_dates_by_note.get(note_id, ())):
+                self._remove_review(date, note_id)
+            self._review_carry_from.pop(note_id, None)
+            if note_id in self._cold_tier:
+                self._cold_tier.thaw(note_id)
+            self._cold_notes.discard(note_id)
+            self._note_history.discard(note_id)
+            self._note_time_index.remove(note['created_at'], note_id)
+            self._note_access.pop(note_id, None)
+            self._unlink_note(note_id, note['task_id'])
+            self._flashcards.remove(note_id)
+            self._note_search_dirty.add(note_id)
+            self._recommendations.remove(('summarize', note_id))
+            self._merkle_set('notes', note_id)
+        self._note_lsh.remove_many(note_ids)
+    
+    def _remove_items(self, collection: str, indexes: List[int]) -> List[str]:
+        """内部方法：删除若干学习会话/薄弱点，返回它们的同步键；
+        只移除它们自己的索引项，其余记录在各索引中的下标依次前移"""
+        if not indexes:
+            return []
+        sessions = collection == 'sessions'
+        items = self.study_sessions if sessions else self.weak_points
+        time_index = self._session_time_index if sessions else self._weak_point_time_index
+        by_task = self._task_sessions if sessions else self._task_weak_points
+        sync_keys = self._sync_item_keys[collection]
+        removed = set(indexes)
+        removed_keys = []
+        for i in indexes:
+            item = items[i]
+            key = self._session_sync_key(item) if sessions else self._weak_point_sync_key(item)
+            removed_keys.append(key)
+            time_index.remove(item['timestamp' if sessions else 'record_time'], i)
+            task_items = by_task[item['task_index']]
+            task_items.remove(i)
+            if not task_items:
+                del by_task[item['task_index']]
+            if sync_keys.get(key) == i:
+                del sync_keys[key]
+            self._merkle_set(collection, key)
+        if sessions:
+            self._session_analytics.remove(removed)
+        else:
+            self._weak_point_lsh.remove_many(removed)
+        kept = [i for i in range(len(items)) if i not in removed]
+        moved = {old: new for new, old in enumerate(kept) if old != new}
+        if sessions:
+            self.study_sessions = [items[i] for i in kept]
+        else:
+            self.weak_points = [items[i] for i in kept]
+            self._weak_point_lsh.rekey(moved)
+        if moved:
+            time_index.remap(moved)
+            for task_items in by_task.values():
+                task_items[:] = [moved.get(i, i) for i in task_items]
+            for key, i in sync_keys.items():
+                if i in moved:
+                    sync_keys[key] = moved[i]
+        return removed_keys
+    
+    def _unlink_note(self, note_id: str, task_index: int):
+        """内部方法：从任务的反向索引中移除笔记"""
+        notes = self._task_notes.get(task_index)
+        if notes is not None:
+            notes.pop(note_id, None)
+            if not notes:
+                del self._task_notes[task_index]
+    
+    def get_task_notes(self, task_index: int) -> List[str]:
+        """获取任务下的笔记 id（按登记顺序），只访问该任务的笔记"""
+        with self._lock:
+            return list(self._task_notes.get(task_index, ()))
+    
+    def get_note_count(self, task_index: Optional[int] = None) -> int:
+        """笔记总数（可限定任务），不复制笔记"""
+        with self._lock:
+            return len(self.notes) if task_index is None else len(self._task_notes.get(task_index, ()))
+    
+    def get_task_sessions(self, task_index: int) -> List[Dict]:
+        """获取任务下的学习会话"""
+        with self._lock:
+            return [self.study_sessions[i] for i in self._task_sessions.get(task_index, ())]
+    
+    def get_task_weak_points(self, task_index: int) -> List[Dict]:
+        """获取任务下的薄弱点记录"""
+        with self._lock:
+            return [self.weak_points[i] for i in self._task_weak_points.get(task_index, ())]
+    
+    @staticmethod
+    def _empty_progress() -> Dict[str, Any]:
+        return {'tasks': 0, 'completed': 0, 'notes': 0, 'score_sum': 0, 'score_count': 0}
+    
+    def _rollup(self, task_index: int, **deltas):
+        """内部方法：沿 任务 → 模块 → 目标 增量累加进度统计"""
+        task = self.minimal_tasks[task_index]
+        goal_id = task.get('goal_id')
+        for key in (('task', task_index), ('module', goal_id, task.get('module') or ''), ('goal', goal_id)):
+            stats = self._progress.get(key)
+            if stats is None:
+                stats = self._progress[key] = self._empty_progress()
+            for field, delta in deltas.items():
+                stats[field] += delta
+    
+    def _progress_view(self, key) -> Dict[str, Any]:
+        """内部方法：把累计统计转换为进度视图"""
+        stats = dict(self._progress.get(key) or self._empty_progress())
+        stats['ratio'] = stats['completed'] / stats['tasks'] if stats['tasks'] else 0
+        stats['avg_score'] = stats['score_sum'] / stats['score_count'] if stats['score_count'] else None
+        return stats
+    
+    def get_goal_progress(self, goal_id: Optional[str] = None) -> Dict[str, Any]:
+        """获取目标进度（默认当前目标）：任务数、已完成数、笔记数、平均得分"""
+        with self._lock:
+            if goal_id is None:
+                goal_id = self.current_goal_id
+            return self._progress_view(('goal', goal_id))
+    
+    def get_module_progress(self, goal_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """获取目标下各知识模块的进度"""
+        with self._lock:
+            if goal_id is None:
+                goal_id = self.current_goal_id
+            modules = self.goals[goal_id]['modules'] if goal_id in self.goals else []
+            return {module: self._progress_view(('module', goal_id, module)) for module in modules}
+    
+    def get_task_progress(self, task_index: int) -> Dict[str, Any]:
+        """获取单个任务的进度"""
+        with self._lock:
+            return self._progress_view(('task', task_index))
+    
     def start_study_session(self, task_index: int, duration_minutes: int = 25) -> Tuple[Union[str, None], str]:
         """第二阶段：开始学习会话（番茄工作法 + 康奈尔笔记）"""
-        if task_index >= len(self.minimal_tasks) or task_index < 0:
-            return None, "任务索引超出范围"
+        if task_index not in self.minimal_tasks:
+            return None, "任务不存在"
             
         task = self.minimal_tasks[task_index]
         # 创建康奈尔笔记
-        note_id = f"note_{task_index}_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}"
+        note_id = f"note_{task_index}_{self._now().strftime('%Y%m%d_%H%M')}"
         
         return note_id, task['name']
     
+    @_mutation("notes", "sessions", "progress", "reviews")
     def save_note(self, note_id: str, main_notes: str, key_questions: str, summary: str):
         """保存康奈尔笔记"""
+        # 已有笔记沿用其任务（同步来的笔记 id 中的任务 id 属于另一端）
+        task_index = self.notes[note_id]['task_id'] if note_id in self.notes else int(note_id.split('_')[1])
+        self._check_quota(self.minimal_tasks.get(task_index, {}).get('goal_id'))
+        previous = self._note_version(note_id)
+        if note_id not in self.notes:
+            first_note = not self._progress.get(('task', task_index), {}).get('notes')
+            self._rollup(task_index, notes=1, completed=1 if first_note else 0)
+            self._task_notes.setdefault(task_index, {})[note_id] = None
+        else:
+            self._touch_note(note_id)
+            self._note_time_index.remove(self.notes[note_id]['created_at'], note_id)
         self.notes[note_id] = {
-            'task_id': int(note_id.split('_')[1]),
-            'main_notes': main_notes,
-            'key_questions': key_questions,
-            'summary': summary,
-            'created_at': datetime.datetime.now().isoformat()
+            'task_id': task_index,
+            'created_at': self._now().isoformat()
         }
+        bodies = {'main_notes': main_notes, 'key_questions': key_questions, 'summary': summary}
+        self._set_note_bodies(note_id, **bodies)
+        if previous is not None:
+            self._note_history.record(note_id, *previous, bodies)
+        self._note_time_index.add(self.notes[note_id]['created_at'], note_id)
+        self._note_lsh.update(note_id, f"{main_notes} {key_questions}")
         
         self.study_sessions.append({
-            'task_index': int(note_id.split('_')[1]),
+            'task_index': task_index,
             'duration': 25,
-            'timestamp': datetime.datetime.now().isoformat()
+            'timestamp': self._now().isoformat()
         })
+        self._session_time_index.add(self.study_sessions[-1]['timestamp'], len(self.study_sessions) - 1)
+        self._session_analytics.append(self.study_sessions[-1]['timestamp'], task_index, 25)
+        self._task_sessions.setdefault(task_index, []).append(len(self.study_sessions) - 1)
+        self._track_sync_item('sessions', self._session_sync_key(self.study_sessions[-1]),
+                              len(self.study_sessions) - 1)
+        self._refresh_task_recommendations(task_index)
+        self._refresh_note_recommendation(note_id)
+        self._refresh_review_entries(note_id)
     
+    @_mutation("notes")
     def review_and_summarize(self, note_id: str, summary: str):
         """完成单元总结（补充康奈尔笔记的总结栏）"""
         if note_id in self.notes:
-            self.notes[note_id]['summary'] = summary
+            previous = self._note_version(note_id)
+            self.notes[note_id]['updated_at'] = self._now().isoformat()
+            self._set_note_bodies(note_id, summary=summary)
+            self._note_history.record(note_id, *previous, {'summary': summary})
+            self._refresh_note_recommendation(note_id)
             return True
         return False
     
+    @_mutation("tasks", "notes", "progress")
+    def import_cards(self, cards: List[Dict[str, Optional[str]]], source: str) -> Dict[str, int]:
+        """批量导入外部卡片（问题 → 关键问题，答案 → 主笔记），按牌组名称归入当前目标下的任务；
+        相同内容重复导入时跳过。导入的笔记不记为学习会话，也不参与相似笔记聚类和总结提醒"""
+        goal_id = self.current_goal_id
+        self._check_quota(goal_id)
+        task_ids = {self.minimal_tasks[i]['name']: i for i in self._goal_task_ids(goal_id)}
+        created_at = self._now().isoformat()
+        new_notes = collections.Counter()
+        tasks_created = skipped = 0
+        for card in cards:
+            task_index = task_ids.get(card['task'])
+            if task_index is None:
+                task_index = task_ids[card['task']] = self._register_task({
+                    'name': card['task'],
+                    'description': f"导入自 {source}",
+                    'module': card.get('module')
+                }, goal_id)
+                tasks_created += 1
+            digest = hashlib.sha1(f"{card['question']}\x1f{card['answer']}".encode('utf-8')).hexdigest()[:12]
+            note_id = f"note_{task_index}_{digest}"
+            if note_id in self.notes:
+                skipped += 1
+                continue
+            self.notes[note_id] = {'task_id': task_index, 'created_at': created_at, 'source': source}
+            self._task_notes.setdefault(task_index, {})[note_id] = None
+            self._set_note_bodies(note_id, main_notes=card['answer'], key_questions=card['question'], summary="")
+            self._note_time_index.add(created_at, note_id)
+            new_notes[task_index] += 1
+        for task_index, count in new_notes.items():
+            first_note = not self._progress.get(('task', task_index), {}).get('notes')
+            self._rollup(task_index, notes=count, completed=1 if first_note else 0)
+            self._refresh_task_recommendations(task_index)
+        return {'imported': sum(new_notes.values()), 'skipped': skipped, 'tasks_created': tasks_created}
+    
+    def _set_note_bodies(self, note_id: str, **bodies: str):
+        """内部方法：写入笔记正文（接入内容存储时只在笔记中保存引用）"""
+        self._touch_note(note_id)
+        self._sync_tombstones['notes'].pop(note_id, None)
+        note = self.notes[note_id]
+        for field, text in bodies.items():
+            if self._blobs is None:
+                note[field] = text
+            else:
+                note.setdefault('bodies', {})[field] = self._blobs.put(text)
+        if 'key_questions' in bodies:
+            self._flashcards.set(note_id, note['task_id'], len(split_cues(bodies['key_questions'])))
+            self._note_search_dirty.add(note_id)
+        self._merkle_set('notes', note_id)
+    
+    def _read_note_body(self, note_id: str, field: str) -> str:
+        """内部方法：读取正文字段（不记录访问，冷笔记只解压不还原）"""
+        note = self.notes[note_id]
+        if field in note:
+            return note[field]
+        if note_id in self._cold_tier:
+            return self._cold_tier.peek(note_id)[field]
+        ref = note.get('bodies', {}).get(field)
+        return self._blobs.get(ref['hash']) if ref else ""
+    
+    def get_note_body(self, note_id: str, field: str) -> str:
+        """读取笔记的某个正文字段（main_notes / key_questions / summary），按需从内容存储或冷存储加载"""
+        with self._lock:
+            self._touch_note(note_id)
+            return self._read_note_body(note_id, field)
+    
+    def _note_body_size(self, note_id: str, field: str) -> int:
+        """内部方法：正文字段的字节数（无需加载正文）"""
+        note = self.notes[note_id]
+        if field in note:
+            return len(note[field].encode('utf-8'))
+        if note_id in self._cold_tier:
+            return self._cold_tier.sizes(note_id)[field]
+        ref = note.get('bodies', {}).get(field)
+        return ref['size'] if ref else 0
+    
+    def open_note(self, note_id: str) -> Dict[str, Any]:
+        """打开笔记：返回包含全部正文的笔记副本"""
+        with self._lock:
+            self._touch_note(note_id)
+            note = {key: value for key, value in self.notes[note_id].items() if key != 'bodies'}
+            for field in self.NOTE_BODY_FIELDS:
+                note[field] = self._read_note_body(note_id, field)
+            return note
+    
+    def peek_note(self, note_id: str) -> Dict[str, Any]:
+        """预览笔记：返回包含全部正文的笔记副本，但不记录访问（冷笔记只解压不还原）"""
+        with self._lock:
+            note = {key: value for key, value in self.notes[note_id].items() if key != 'bodies'}
+            for field in self.NOTE_BODY_FIELDS:
+                note[field] = self._read_note_body(note_id, field)
+            return note
+    
+    def _note_version(self, note_id: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """内部方法：笔记当前版本的时间和正文，笔记不存在时返回 None"""
+        note = self.notes.get(note_id)
+        if note is None:
+            return None
+        return (note.get('updated_at') or note['created_at'],
+                {field: self._read_note_body(note_id, field) for field in self.NOTE_BODY_FIELDS})
+    
+    def get_note_versions(self, note_id: str) -> List[Dict[str, Any]]:
+        """笔记的修改历史（从新到旧）：版本号、时间和改动的字段"""
+        with self._lock:
+            note = self.notes[note_id]
+            return self._note_history.versions(note_id, note.get('updated_at') or note['created_at'])
+    
+    def get_note_version(self, note_id: str, version: int) -> Dict[str, str]:
+        """还原笔记的某个历史版本"""
+        with self._lock:
+            return self._note_history.version(note_id, version, self._note_version(note_id)[1])
+    
+    def get_note_as_of(self, note_id: str, at: str) -> Optional[Dict[str, str]]:
+        """查看笔记在某一时刻的内容（at 为 ISO 时间或日期，日期按当天结束计）；当时尚未创建则返回 None"""
+        if len(at) == 10:
+            at += "T23:59:59.999999"
+        with self._lock:
+            current_at, fields = self._note_version(note_id)
+            return self._note_history.as_of(note_id, at, current_at, fields)
+    
+    def _touch_note(self, note_id: str):
+        """内部方法：记录笔记访问，冷笔记还原为热数据"""
+        self._note_access[note_id] = self._now().isoformat()
+        if note_id in self._cold_notes:
+            self._cold_notes.discard(note_id)
+            self._memory_dirty.add(('notes', note_id))
+            if note_id in self._cold_tier:
+                self.notes[note_id].update(self._cold_tier.thaw(note_id))
+        self._mark_hot(note_id)
+    
+    def _mark_hot(self, note_id: str):
+        """内部方法：把热笔记移到所在工作区访问顺序的末尾（同步可能改变笔记所属的任务，每次重新确定工作区）"""
+        workspace = self._record_workspace('notes', note_id)
+        if self._hot_note_workspace.get(note_id, workspace) != workspace:
+            self._unmark_hot(note_id)
+        self._hot_note_workspace[note_id] = workspace
+        hot = self._hot_notes.setdefault(workspace, collections.OrderedDict())
+        hot[note_id] = None
+        hot.move_to_end(note_id)
+    
+    def _unmark_hot(self, note_id: str):
+        """内部方法：笔记转冷或删除时移出访问顺序"""
+        if note_id in self._hot_note_workspace:
+            self._hot_notes[self._hot_note_workspace.pop(note_id)].pop(note_id, None)
+    
+    def tier_cold_notes(self) -> Dict[str, int]:
+        """冷热分层：超过 cold_after_days 天未访问的笔记正文压缩保存并移出内存，返回本次转冷的笔记数和节省的字节数"""
+        with self._lock:
+            cutoff = (self._now() - datetime.timedelta(days=self.cold_after_days)).isoformat()
+            stale = [note_id for note_id, accessed_at in self._note_access.items()
+                     if accessed_at < cutoff and note_id not in self._cold_notes and note_id in self.notes]
+            saved = self._freeze_notes(stale)
+            self._last_tier_date = self._now().strftime("%Y-%m-%d")
+            return {'frozen': len(stale), 'saved_bytes': saved}
+    
+    def _freeze_notes(self, note_ids: List[str]) -> int:
+        """内部方法：把笔记正文转入冷存储，返回节省的字节数"""
+        saved = 0
+        if self._blobs is None:
+            if len(note_ids) >= 8 and not self._cold_tier.trained:
+                # 用首批冷笔记训练预设字典，短笔记也能获得较好的压缩率
+                self._cold_tier.train(self._read_note_body(note_id, field)
+                                      for note_id in note_ids[:1000] for field in self.NOTE_BODY_FIELDS)
+            before = self._cold_tier.stats()
+            for note_id in note_ids:
+                note = self.notes[note_id]
+                fields = {field: note.pop(field) for field in self.NOTE_BODY_FIELDS if field in note}
+                self._cold_tier.freeze(note_id, fields)
+            after = self._cold_tier.stats()
+            saved = ((after['raw_bytes'] - after['compressed_bytes'] - after['dictionary_bytes'])
+                     - (before['raw_bytes'] - before['compressed_bytes'] - before['dictionary_bytes']))
+        else:
+            for note_id in note_ids:
+                for ref in self.notes[note_id].get('bodies', {}).values():
+                    saved += self._blobs.compress(ref['hash'])
+                    self._blobs.evict(ref['hash'])
+        for note_id in note_ids:
+            self._unmark_hot(note_id)
+        self._cold_notes.update(note_ids)
+        self._memory_dirty.update(('notes', note_id) for note_id in note_ids)
+        return saved
+    
+    def get_tiering_stats(self) -> Dict[str, Any]:
+        """冷热分层统计：冷热笔记数、内存中压缩节省的字节数，以及内容存储的磁盘占用和压缩节省"""
+        with self._lock:
+            tier = self._cold_tier.stats()
+            stats = {
+                'hot_notes': len(self.notes) - len(self._cold_notes),
+                'cold_notes': len(self._cold_notes),
+                'cold_after_days': self.cold_after_days,
+                'memory_raw_bytes': tier['raw_bytes'],
+                'memory_compressed_bytes': tier['compressed_bytes'] + tier['dictionary_bytes'],
+                'memory_saved_bytes': tier['raw_bytes'] - tier['compressed_bytes'] - tier['dictionary_bytes']
+            }
+        if self._blobs is not None:
+            stats['disk'] = self._blobs.disk_usage()
+        return stats
+    
+    def _record_workspace(self, collection: str, key: str) -> Optional[str]:
+        """内部方法：数据所属的工作区（任务所属的学习目标）"""
+        if collection == 'notes':
+            task_index = self.notes[key]['task_id']
+        elif collection == 'reviews':
+            note = self.notes.get(key.split('|', 1)[1])
+            task_index = note['task_id'] if note else None
+        elif collection == 'sessions':
+            task_index = self.study_sessions[self._sync_item_keys['sessions'][key]]['task_index']
+        else:
+            task_index = self.weak_points[self._sync_item_keys['weak_points'][key]]['task_index']
+        task = self.minimal_tasks.get(task_index)
+        return task.get('goal_id') if task else None
+    
+    def _record_size(self, collection: str, key: str) -> Optional[int]:
+        """内部方法：一条数据在内存中的字节数（笔记含冷存储中的压缩正文和修改历史；
+        正文在内容存储中时内存里只有引用，不计磁盘上的正文）；数据已不存在时返回 None"""
+        if collection == 'notes':
+            note = self.notes.get(key)
+            if note is None:
+                return None
+            size = deep_sizeof(note) + self._note_history.size_of(key)
+            if key in self._cold_tier:
+                size += self._cold_tier.stored_bytes(key)
+            return size
+        if collection == 'reviews':
+            if key in self._review_tombstones:
+                return deep_sizeof(self._review_tombstones[key])
+            date, note_id = key.split('|', 1)
+            focus_point = self.review_schedule.get(date, {}).get(note_id)
+            return None if focus_point is None else deep_sizeof(focus_point)
+        index = self._sync_item_keys[collection].get(key)
+        if index is None:
+            return None
+        items = self.study_sessions if collection == 'sessions' else self.weak_points
+        return deep_sizeof(items[index])
+    
+    def _flush_memory(self, limit: Optional[int] = None) -> int:
+        """内部方法：重新计算变化过的数据的内存占用，返回处理的条数"""
+        dirty = self._memory_dirty
+        count = len(dirty) if limit is None else min(limit, len(dirty))
+        for _ in range(count):
+            collection, key = dirty.pop()
+            size = self._record_size(collection, key)
+            if size is None:
+                self._memory.discard(collection, key)
+            else:
+                self._memory.set(collection, key, self._record_workspace(collection, key), size)
+        return count
+    
+    def _check_quota(self, goal_id: Optional[str]):
+        """内部方法：工作区超过硬配额时拒绝新的写入（回放其他进程的操作时不检查）"""
+        if self.hard_quota_bytes is None or self._replaying:
+            return
+        self._flush_memory()
+        used = self._memory.total(goal_id)
+        if used >= self.hard_quota_bytes:
+            raise QuotaExceededError(
+                f"「{self._workspace_name(goal_id)}」占用 {used / 1048576:.1f} MB，"
+                f"已超过硬配额 {self.hard_quota_bytes / 1048576:.1f} MB，请先删除部分任务或笔记")
+    
+    def _enforce_quotas(self):
+        """内部方法：超过软配额的工作区从访问顺序的头部（最久未访问）起把笔记正文转入冷存储，直到回到软配额以内；
+        正文在内容存储中时内存里只有引用，转冷不能降低占用，不做驱逐"""
+        if self.soft_quota_bytes is None or self._blobs is not None:
+            return
+        self._flush_memory()
+        for goal_id in self._memory.workspaces():
+            hot = self._hot_notes.get(goal_id)
+            while hot and self._memory.total(goal_id) > self.soft_quota_bytes:
+                self._freeze_notes(list(itertools.islice(hot, self.QUOTA_EVICT_BATCH)))
+                self._flush_memory()
+    
+    def _workspace_name(self, goal_id: Optional[str]) -> str:
+        """内部方法：工作区显示名称"""
+        return self.goals[goal_id]['goal'] if goal_id in self.goals else "未归属目标"
+    
+    def get_memory_usage(self, n: int = 10) -> Dict[str, Any]:
+        """各工作区（学习目标）的内存占用：占用最多的 n 个工作区的各类数据字节数和条数，以及配额状态"""
+        with self._lock:
+            self._flush_memory()
+            top = self._memory.top(n)
+            for usage in top:
+                usage['name'] = self._workspace_name(usage['workspace'])
+                total = usage['total_bytes']
+                if self.hard_quota_bytes is not None and total >= self.hard_quota_bytes:
+                    usage['status'] = 'hard'
+                elif self.soft_quota_bytes is not None and total > self.soft_quota_bytes:
+                    usage['status'] = 'soft'
+                else:
+                    usage['status'] = 'ok'
+            return {
+                'workspaces': top,
+                'workspace_count': len(self._memory.workspaces()),
+                'total_bytes': sum(self._memory.total(goal_id) for goal_id in self._memory.workspaces()),
+                'soft_quota_bytes': self.soft_quota_bytes,
+                'hard_quota_bytes': self.hard_quota_bytes
+            }
+    
     def _get_today_notes(self):
-        """内部方法：获取今日创建的笔记"""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        return {
-            note_id: note 
-            for note_id, note in self.notes.items() 
-            if note['created_at'].startswith(today)
-        }
+        """内部方法：获取今日学习时创建的笔记（不含导入的卡片）"""
+        today = self._now().date()
+        return self.get_notes_between(today.isoformat(), (today + datetime.timedelta(days=1)).isoformat())
+    
+    def get_today_notes(self) -> Dict[str, Dict]:
+        """获取今日学习时创建的笔记（不含导入的卡片）"""
+        with self._lock:
+            return self._get_today_notes()
+    
+    def get_notes_between(self, start: str, end: str, imported: bool = False) -> Dict[str, Dict]:
+        """获取 start <= 创建时间 < end 的笔记（日期格式 YYYY-MM-DD 或 ISO 时间）；
+        导入的卡片的创建时间是导入时间，不算学习产出，imported 为 True 时才包含"""
+        with self._lock:
+            notes = {note_id: self.notes[note_id] for note_id in self._note_time_index.range(start, end)}
+        if imported:
+            return notes
+        return {note_id: note for note_id, note in notes.items() if 'source' not in note}
+    
+    def get_sessions_between(self, start: str, end: str) -> List[Dict]:
+        """获取 start <= 时间 < end 的学习会话"""
+        with self._lock:
+            return [self.study_sessions[i] for i in self._session_time_index.range(start, end)]
+    
+    def get_weak_points_between(self, start: str, end: str) -> List[Dict]:
+        """获取 start <= 记录时间 < end 的薄弱点"""
+        with self._lock:
+            return [self.weak_points[i] for i in self._weak_point_time_index.range(start, end)]
+    
+    def list_goals(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """列出全部学习目标（含任务数），返回 (目标列表, 当前目标 id)"""
+        with self._lock:
+            goals = [{'goal_id': goal_id, 'goal': goal['goal'], 'modules': goal['modules'],
+                      'task_count': len(goal['task_ids']), 'created_at': goal['created_at']}
+                     for goal_id, goal in self.goals.items()]
+            return goals, self.current_goal_id
+    
+    def list_tasks(self, goal_id: Optional[str] = None, after: Optional[int] = None,
+                   limit: int = 50) -> Tuple[List[Tuple[int, Dict]], Optional[int]]:
+        """按任务 id 分页列出任务（可限定目标），返回 (任务列表, 下一页游标)"""
+        with self._lock:
+            ids = sorted(self.goals[goal_id]['task_ids'] if goal_id is not None else self.minimal_tasks)
+            start = bisect.bisect_right(ids, after) if after is not None else 0
+            page = ids[start:start + limit]
+            cursor = page[-1] if page and start + limit < len(ids) else None
+            return [(i, self.minimal_tasks[i]) for i in page], cursor
+    
+    def list_notes(self, after: Optional[Any] = None, limit: int = 50, task_index: Optional[int] = None,
+                   with_bodies: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """按创建时间分页列出笔记（限定任务时按任务内的登记顺序），返回 (笔记列表, 下一页游标)；
+        with_bodies=False 时只返回元数据和正文字节数，不加载正文"""
+        with self._lock:
+            if task_index is None:
+                note_ids, cursor = self._note_time_index.page(tuple(after) if after else None, limit)
+            else:
+                ids = list(self._task_notes.get(task_index, ()))
+                start = ids.index(after) + 1 if after in ids else 0
+                note_ids = ids[start:start + limit]
+                cursor = note_ids[-1] if note_ids and start + limit < len(ids) else None
+            notes = []
+            for note_id in note_ids:
+                note = {key: value for key, value in self.notes[note_id].items()
+                        if key != 'bodies' and key not in self.NOTE_BODY_FIELDS}
+                note['note_id'] = note_id
+                for field in self.NOTE_BODY_FIELDS:
+                    if with_bodies:
+                        note[field] = self._read_note_body(note_id, field)
+                    else:
+                        note[f"{field}_bytes"] = self._note_body_size(note_id, field)
+                notes.append(note)
+            return notes, cursor
+    
+    def list_weak_points(self, after: Optional[Any] = None, limit: int = 50,
+                         task_index: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """按记录时间分页列出薄弱点（可限定任务），返回 (薄弱点列表, 下一页游标)"""
+        with self._lock:
+            if task_index is None:
+                indexes, cursor = self._weak_point_time_index.page(tuple(after) if after else None, limit)
+            else:
+                ids = self._task_weak_points.get(task_index, [])
+                start = bisect.bisect_right(ids, after) if after is not None else 0
+                indexes = ids[start:start + limit]
+                cursor = indexes[-1] if indexes and start + limit < len(ids) else None
+            return [self.weak_points[i] for i in indexes], cursor
+    
+    @contextlib.contextmanager
+    def batch(self):
+        """批量写入：整批持锁执行，接入共享状态库时合并为一个写事务。
+        批内抛出异常时共享状态库撤销事务，内存中的状态从状态库重新载入（与其他进程保持一致）；
+        未接入共享状态库时没有事务，出错前已完成的写入保留"""
+        with self._lock:
+            if self._in_batch:
+                yield self
+                return
+            store = self._store
+            self._in_batch = True
+            try:
+                with store.transaction() if store is not None else contextlib.nullcontext():
+                    yield self
+            except BaseException:
+                if store is not None:
+                    self._reload_from_store()
+                raise
+            finally:
+                self._in_batch = False
+    
+    def _reload_from_store(self):
+        """内部方法：丢弃内存中的状态，按共享状态库的快照和操作日志重新载入（只在批量写入回滚时使用）"""
+        self.load_state(type(self)(clock=self.clock).export_state())
+        self._store_seq = 0
+        self._apply_remote_ops()
+    
+    def count_sessions_per_week(self, start: str, end: str) -> List[Tuple[str, int]]:
+        """按周（周一开始）统计学习会话次数，返回 (周一日期, 次数)"""
+        first = datetime.date.fromisoformat(start)
+        first -= datetime.timedelta(days=first.weekday())
+        last = datetime.date.fromisoformat(end)
+        weeks = []
+        while first < last:
+            weeks.append(first)
+            first += datetime.timedelta(days=7)
+        boundaries = [week.isoformat() for week in weeks] + [first.isoformat()]
+        with self._lock:
+            return list(zip(boundaries, self._session_time_index.count_buckets(boundaries)))
+    
+    def get_session_analytics(self) -> Dict[str, Any]:
+        """学习会话分析：各任务学习时长、最近 7/30 天滚动时长、连续学习天数和时段分布"""
+        with self._lock:
+            return self._session_analytics.summary(self._now().date().isoformat())
+    
+    def get_study_heatmap(self, end: Optional[str] = None, days: int = 365) -> Dict[str, int]:
+        """学习热力图数据：每天的学习活动数（学习会话 + 薄弱点记录）"""
+        with self._lock:
+            last = datetime.date.fromisoformat(end) if end else self._now().date()
+            dates = [last - datetime.timedelta(days=offset) for offset in range(days - 1, -2, -1)]
+            boundaries = [date.isoformat() for date in dates]
+            sessions = self._session_time_index.count_buckets(boundaries)
+            weak_points = self._weak_point_time_index.count_buckets(boundaries)
+        return {boundaries[i]: sessions[i] + weak_points[i] for i in range(days)}
     
     def _schedule_morning_review(self, note_id: str, focus_point: str):
         """内部方法：添加晨间复习计划"""
-        tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
+        tomorrow = self._now() + datetime.timedelta(days=1)
         tomorrow_date = tomorrow.strftime("%Y-%m-%d")
+        # 每条笔记只保留一条待复习计划，重新安排时移除旧的
+        for date in list(self._review_dates_by_note.get(note_id, ())):
+            if date != tomorrow_date:
+                self._remove_review(date, note_id)
+        self._review_carry_from.pop(note_id, None)
         if tomorrow_date not in self.review_schedule:
             self.review_schedule[tomorrow_date] = {}
         self.review_schedule[tomorrow_date][note_id] = focus_point
+        self._put_review_entry(tomorrow_date, note_id, focus_point)
+        self._refresh_review_recommendation()
     
     def _get_today_morning_reviews(self):
         """内部方法：获取今日的晨间复习任务"""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        today = self._now().strftime("%Y-%m-%d")
+        self._maybe_sweep_review_schedule(today)
         return self.review_schedule.get(today, {})
     
-    def evening_review(self, recall_results: Dict[str, bool], focus_points: Dict[str, str]):
+    def _remove_review(self, date: str, note_id: str):
+        """内部方法：从复习计划和复习队列中移除一条记录"""
+        reviews = self.review_schedule.get(date)
+        if reviews is not None:
+            if reviews.pop(note_id, None) is not None:
+                self._tombstone_review(date, note_id)
+            if not reviews:
+                del self.review_schedule[date]
+        bucket = self._review_queue.get(date)
+        if bucket is not None:
+            bucket.pop(note_id, None)
+            if not bucket:
+                del self._review_queue[date]
+        dates = self._review_dates_by_note.get(note_id)
+        if dates is not None:
+            dates.discard(date)
+            if not dates:
+                del self._review_dates_by_note[note_id]
+    
+    @_mutation("reviews")
+    def sweep_review_schedule(self, today: Optional[str] = None) -> Dict[str, int]:
+        """清理复习计划：逾期未复习的内容顺延到今天，逾期过久或笔记已不存在的直接过期"""
+        if today is None:
+            today = self._now().strftime("%Y-%m-%d")
+        today_day = datetime.date.fromisoformat(today)
+        carried = expired = 0
+        for date in sorted(d for d in self.review_schedule if d < today):
+            for note_id, focus_point in list(self.review_schedule[date].items()):
+                self._remove_review(date, note_id)
+                due_date = self._review_carry_from.get(note_id, date)
+                overdue_days = (today_day - datetime.date.fromisoformat(due_date)).days
+                if note_id not in self.notes or overdue_days > self.REVIEW_EXPIRY_DAYS:
+                    self._review_carry_from.pop(note_id, None)
+                    expired += 1
+                    continue
+                today_reviews = self.review_schedule.setdefault(today, {})
+                if note_id not in today_reviews:
+                    today_reviews[note_id] = focus_point
+                    self._review_carry_from[note_id] = due_date
+                    self._put_review_entry(today, note_id, focus_point)
+                carried += 1
+        # 压缩：移除空的日期桶
+        for date in [d for d, reviews in self.review_schedule.items() if not reviews]:
+            del self.review_schedule[date]
+            self._review_queue.pop(date, None)
+        # 删除标记只需保留到两边都已清理掉对应日期为止
+        tombstone_cutoff = (today_day - datetime.timedelta(days=self.TOMBSTONE_DAYS)).isoformat()
+        for key in [key for key in self._review_tombstones if key < tombstone_cutoff]:
+            del self._review_tombstones[key]
+            self._merkle_set('reviews', key)
+        for collection, tombstones in self._sync_tombstones.items():
+            for key in [key for key, deleted_at in tombstones.items() if deleted_at < tombstone_cutoff]:
+                del tombstones[key]
+                self._merkle_set(collection, key)
+        self._last_sweep_date = today
+        self._refresh_review_recommendation()
+        return {'carried': carried, 'expired': expired}
+    
+    def _maybe_sweep_review_schedule(self, today: str):
+        """内部方法：每天首次访问复习计划时执行一次清理（作为修改操作写入操作日志）和冷热分层"""
+        with self._lock:
+            if self._last_sweep_date != today:
+                self.sweep_review_schedule(today)
+            if self._last_tier_date != today:
+                self.tier_cold_notes()
+    
+    def _build_review_entry(self, date: str, note_id: str, focus_point: str) -> Optional[Dict[str, Any]]:
+        """内部方法：将复习计划与笔记、任务信息连接成一条复习条目"""
+        note = self.notes.get(note_id)
+        if note is None or note['task_id'] not in self.minimal_tasks:
+            return None
+        return {
+            'note_id': note_id,
+            'task_id': note['task_id'],
+            'task_name': self.minimal_tasks[note['task_id']]['name'],
+            'focus_point': focus_point,
+            'due_date': date,
+            'carried_from': self._review_carry_from.get(note_id)
+        }
+    
+    def _put_review_entry(self, date: str, note_id: str, focus_point: str):
+        """内部方法：增量更新复习队列中的一条记录"""
+        self._review_dates_by_note.setdefault(note_id, set()).add(date)
+        entry = self._build_review_entry(date, note_id, focus_point)
+        bucket = self._review_queue.setdefault(date, {})
+        if entry is None:
+            bucket.pop(note_id, None)
+        else:
+            bucket[note_id] = entry
+        self._review_tombstones.pop(f"{date}|{note_id}", None)
+        self._merkle_set('reviews', f"{date}|{note_id}")
+    
+    def _tombstone_review(self, date: str, note_id: str):
+        """内部方法：记录复习计划的删除，同步时传播给另一端"""
+        key = f"{date}|{note_id}"
+        self._review_tombstones[key] = self._now().isoformat()
+        self._merkle_set('reviews', key)
+    
+    def _drop_review_date(self, date: str):
+        """内部方法：移除某一天的复习队列"""
+        scheduled = set(self._review_queue.pop(date, {})) | set(self.review_schedule.get(date, {}))
+        for note_id in scheduled:
+            dates = self._review_dates_by_note.get(note_id)
+            if dates is not None:
+                dates.discard(date)
+                if not dates:
+                    del self._review_dates_by_note[note_id]
+    
+    def _refresh_review_entries(self, note_id: str):
+        """内部方法：笔记变化后刷新其所在的复习条目"""
+        for date in self._review_dates_by_note.get(note_id, ()):
+            focus_point = self.review_schedule.get(date, {}).get(note_id)
+            if focus_point is not None:
+                self._put_review_entry(date, note_id, focus_point)
+    
+    def _rebuild_review_queue(self):
+        """内部方法：根据复习计划整体重建复习队列"""
+        self._review_queue = {}
+        self._review_dates_by_note = {}
+        for date, reviews in self.review_schedule.items():
+            for note_id, focus_point in reviews.items():
+                self._put_review_entry(date, note_id, focus_point)
+    
+    def get_review_queue(self, date: str) -> List[Dict[str, Any]]:
+        """获取某一天的复习队列（已包含任务名称和重点内容，逾期内容顺延到今天）"""
+        with self._lock:
+            self._maybe_sweep_review_schedule(self._now().strftime("%Y-%m-%d"))
+            return list(self._review_queue.get(date, {}).values())
+    
+    @_mutation("reviews", "recalls")
+    def evening_review(self, recall_results: Dict[str, str], focus_points: Dict[str, str]):
         """第三阶段：睡前复习（海马体记忆法）"""
         today_notes = self._get_today_notes()
         
         if not today_notes:
             return "今天没有创建学习笔记，无需复习"
+        
+        # 记录每条笔记的回忆结果
+        for note_id, outcome in recall_results.items():
+            self.record_recall(note_id, outcome)
             
         # 记录需要晨间强化的重点内容
         for note_id, focus_point in focus_points.items():
@@ -101,6 +1553,7 @@ class DeepLearningSystem:
         
         return "睡前复习完成，重点内容已安排晨间巩固"
     
+    @_mutation("reviews")
     def morning_review(self):
         """第三阶段：晨间快速激活（海马体记忆法）"""
         today_reviews = self._get_today_morning_reviews()
@@ -109,18 +1562,103 @@ class DeepLearningSystem:
             return "今天没有安排晨间复习任务"
             
         # 完成后清空今日晨间复习记录
-        today_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        today_date = self._now().strftime("%Y-%m-%d")
+        for note_id in today_reviews:
+            self._review_carry_from.pop(note_id, None)
+            self._tombstone_review(today_date, note_id)
+        self._drop_review_date(today_date)
         if today_date in self.review_schedule:
             del self.review_schedule[today_date]
+        self._refresh_review_recommendation()
         
         return "晨间复习完成，记忆已强化"
     
+    @_mutation("recalls")
+    def record_recall(self, note_id: str, outcome: str) -> bool:
+        """记录一次回忆结果（能回忆起 / 部分回忆 / 无法回忆）"""
+        code = RECALL_CODES.get(outcome)
+        if code is None or note_id not in self.notes:
+            return False
+        note = self.notes[note_id]
+        today = self._now().date()
+        created = datetime.date.fromisoformat(note['created_at'][:10])
+        self._recall_log.append(note_id, note['task_id'], code, (today - created).days,
+                                (today - datetime.date(1970, 1, 1)).days)
+        return True
+    
+    def _drill_task_ids(self, task_index: Optional[int]) -> List[int]:
+        """内部方法：闪卡练习的范围（指定任务，或当前目标下的全部任务）"""
+        return [task_index] if task_index is not None else self._goal_task_ids(self.current_goal_id)
+    
+    def get_flashcard_count(self, task_index: Optional[int] = None) -> int:
+        """某个任务（默认当前目标全部任务）可练习的闪卡数"""
+        with self._lock:
+            return self._flashcards.count(self._drill_task_ids(task_index))
+    
+    def build_drill_deck(self, task_index: Optional[int] = None, seed: Optional[int] = None) -> DrillDeck:
+        """生成洗好的闪卡牌组：线索栏中的每个问题为一张卡片"""
+        with self._lock:
+            return DrillDeck(self._flashcards.cards(self._drill_task_ids(task_index)), seed)
+    
+    def draw_flashcard(self, deck: DrillDeck) -> Optional[Dict[str, Any]]:
+        """从牌组抽下一张卡片（问题 + 主笔记作为答案），笔记已修改导致线索不存在时跳过；抽完返回 None"""
+        with self._lock:
+            while True:
+                card = deck.draw()
+                if card is None:
+                    return None
+                note_id, cue_index = card
+                if note_id not in self.notes:
+                    continue
+                cues = split_cues(self.get_note_body(note_id, 'key_questions'))
+                if cue_index < len(cues):
+                    return {
+                        'card': card,
+                        'note_id': note_id,
+                        'task_name': self.minimal_tasks[self.notes[note_id]['task_id']]['name'],
+                        'cue': cues[cue_index],
+                        'answer': self.get_note_body(note_id, 'main_notes')
+                    }
+    
+    @_mutation("recalls")
+    def grade_drill(self, results: List[Tuple[str, str]]) -> int:
+        """批量提交闪卡评分，每张卡片记为一次回忆结果，返回记录条数"""
+        return sum(1 for note_id, outcome in results if self.record_recall(note_id, outcome))
+    
+    def get_recall_history(self, note_id: str) -> List[str]:
+        """获取某条笔记历次的回忆结果"""
+        with self._lock:
+            return self._recall_log.note_history(note_id)
+    
+    def get_note_retention(self) -> Dict[str, float]:
+        """获取每条笔记的平均记忆保持率（0-1）"""
+        with self._lock:
+            return self._recall_log.note_retention()
+    
+    def get_retention_curve(self, task_index: Optional[int] = None, max_age: int = 30):
+        """获取遗忘曲线：距笔记创建第 N 天复习时的平均记忆保持率"""
+        with self._lock:
+            return self._recall_log.retention_curve(task_index, max_age)
+    
+    def get_recall_counts(self, days: Optional[int] = None) -> Dict[str, int]:
+        """统计最近 days 天（默认全部）的各类回忆结果次数"""
+        # 统计期间持有锁：日志数组被 NumPy 视图引用时不能追加
+        with self._lock:
+            if days is None:
+                return self._recall_log.outcome_counts()
+            today = (self._now().date() - datetime.date(1970, 1, 1)).days
+            return self._recall_log.outcome_counts(today - days + 1, today + 1)
+    
+    @_mutation("weak_points", "progress")
     def practice_testing(self, task_index: int, score: int, weak_point: str = "", blind_spot: str = ""):
         """第四阶段：实战检验（做题总结法 + 费曼学习法）"""
-        if task_index >= len(self.minimal_tasks) or task_index < 0:
-            return "任务索引无效"
+        if task_index not in self.minimal_tasks:
+            return "任务不存在"
             
         task = self.minimal_tasks[task_index]
+        self._check_quota(task.get('goal_id'))
+        self._rollup(task_index, score_sum=score, score_count=1)
+        self._refresh_task_recommendations(task_index)
         
         # 80分以下需记录薄弱点
         if score < 80:
@@ -130,28 +1668,289 @@ class DeepLearningSystem:
                 'weak_point': weak_point,
                 'blind_spot': blind_spot,
                 'practice_score': score,
-                'record_time': datetime.datetime.now().isoformat()
+                'record_time': self._now().isoformat()
             })
+            self._weak_point_time_index.add(self.weak_points[-1]['record_time'], len(self.weak_points) - 1)
+            self._weak_point_lsh.add(len(self.weak_points) - 1, f"{weak_point} {blind_spot}")
+            self._task_weak_points.setdefault(task_index, []).append(len(self.weak_points) - 1)
+            self._track_sync_item('weak_points', self._weak_point_sync_key(self.weak_points[-1]),
+                                  len(self.weak_points) - 1)
             return f"检测到未完全掌握，薄弱点已记录！建议重新学习该知识点。"
         else:
             return "得分≥80，知识点基本掌握！可定期回顾笔记巩固。"
     
     def show_weak_points(self):
-        """查看所有记录的薄弱点（错题本功能）"""
-        return self.weak_points
+        """查看所有记录的薄弱点（错题本功能），返回副本（后台同步可能同时写入）"""
+        with self._lock:
+            return list(self.weak_points)
+    
+    def get_recurring_weak_points(self) -> List[List[Dict]]:
+        """获取反复出现的薄弱点分组（按描述相似度聚类，组内按记录时间排序）"""
+        with self._lock:
+            return [[self.weak_points[i] for i in sorted(group)] for group in self._weak_point_lsh.groups()]
+    
+    def get_similar_note_groups(self) -> List[List[str]]:
+        """获取内容相近的笔记分组"""
+        with self._lock:
+            return self._note_lsh.groups()
+    
+    def _refresh_task_recommendations(self, task_index: int):
+        """内部方法：根据任务的笔记和得分更新“开始学习”“巩固练习”建议"""
+        task = self.minimal_tasks[task_index]
+        stats = self._progress_view(('task', task_index))
+        if stats['notes'] == 0:
+            self._recommendations.update(('study', task_index), 50, {
+                'kind': 'study', 'task_id': task_index, 'goal_id': task.get('goal_id'),
+                'label': f"开始学习：{task['name']}", 'detail': "该任务还没有学习笔记"
+            })
+        else:
+            self._recommendations.remove(('study', task_index))
+        if stats['avg_score'] is not None and stats['avg_score'] < 80:
+            self._recommendations.update(('practice', task_index), 60 + (80 - stats['avg_score']) / 2, {
+                'kind': 'practice', 'task_id': task_index, 'goal_id': task.get('goal_id'),
+                'label': f"巩固练习：{task['name']}", 'detail': f"实战平均得分 {stats['avg_score']:.0f}"
+            })
+        else:
+            self._recommendations.remove(('practice', task_index))
+    
+    def _refresh_note_recommendation(self, note_id: str):
+        """内部方法：笔记缺少总结时建议补充总结"""
+        note = self.notes[note_id]
+        if 'source' in note or self._note_body_size(note_id, 'summary'):
+            self._recommendations.remove(('summarize', note_id))
+            return
+        task = self.minimal_tasks[note['task_id']]
+        self._recommendations.update(('summarize', note_id), 40, {
+            'kind': 'summarize', 'note_id': note_id, 'task_id': note['task_id'], 'goal_id': task.get('goal_id'),
+            'label': f"完善总结：{task['name']}", 'detail': f"笔记 {note_id} 尚未完成总结栏"
+        })
+    
+    def _refresh_review_recommendation(self):
+        """内部方法：今天有待完成的晨间复习时置顶提醒"""
+        today = self._now().strftime("%Y-%m-%d")
+        due = len(self._review_queue.get(today, {}))
+        if due:
+            self._recommendations.update(('review', None), 100 + due, {
+                'kind': 'review', 'goal_id': None,
+                'label': f"晨间复习：{due} 项待复习", 'detail': "今日复习计划尚未完成"
+            })
+        else:
+            self._recommendations.remove(('review', None))
+    
+    def get_next_actions(self, n: int = 3) -> List[Dict[str, Any]]:
+        """获取当前目标下得分最高的下一步行动建议"""
+        with self._lock:
+            self._maybe_sweep_review_schedule(self._now().strftime("%Y-%m-%d"))
+            goal_id = self.current_goal_id
+            return self._recommendations.top(
+                n, lambda action: action['kind'] == 'review' or action['goal_id'] == goal_id)
+    
+    def refresh_indexes(self) -> int:
+        """整理延迟更新的派生索引（笔记检索词、Merkle 叶子、内存占用），每批处理 INDEX_FLUSH_BATCH 条后释放锁，
+        返回处理的记录数"""
+        total = 0
+        while True:
+            with self._lock:
+                count = self._flush_note_search(self.INDEX_FLUSH_BATCH)
+                count += self._flush_memory(self.INDEX_FLUSH_BATCH)
+                for collection in SYNC_COLLECTIONS:
+                    count += len(self._merkle_dirty[collection])
+                    self._merkle_tree(collection, self.INDEX_FLUSH_BATCH)
+                    count -= len(self._merkle_dirty[collection])
+                if not count:
+                    self._note_search.merge()
+                    self._task_search.merge()
+                    for collection in SYNC_COLLECTIONS:
+                        self._merkle[collection].node_hash("")
+                    return total
+            total += count
+    
+    def precompute_reviews(self) -> Dict[str, int]:
+        """预先完成当天的复习计划清理和冷热分层，并按当天日期刷新复习提醒；返回今天和明天的待复习数"""
+        with self._lock:
+            now = self._now()
+            today = now.strftime("%Y-%m-%d")
+            tomorrow = (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+            self._maybe_sweep_review_schedule(today)
+            self._refresh_review_recommendation()
+            return {'today': len(self._review_queue.get(today, {})),
+                    'tomorrow': len(self._review_queue.get(tomorrow, {}))}
+    
+    def _stats_sources(self) -> Dict[str, Callable[[], Any]]:
+        """内部方法：可预先计算的统计项"""
+        return {
+            'session_analytics': self.get_session_analytics,
+            'study_heatmap': self.get_study_heatmap,
+            'recall_counts_7d': lambda: self.get_recall_counts(days=7),
+            'tiering': self.get_tiering_stats
+        }
+    
+    def refresh_stats(self, force: bool = False) -> int:
+        """重新计算统计快照（数据版本或日期变化时才计算），返回计算的统计项数；
+        整个计算持锁，各统计项对应同一个数据版本"""
+        with self._lock:
+            key = (self.version, self._now().date().isoformat())
+            if not force and key == self._stats_key:
+                return 0
+            self._stats_cache = {name: compute() for name, compute in self._stats_sources().items()}
+            self._stats_key = key
+            return len(self._stats_cache)
+    
+    def get_cached_stats(self, name: str) -> Any:
+        """读取后台预先计算的统计（可能落后一个刷新周期）；未启动后台任务或尚未计算时当场计算"""
+        with self._lock:
+            if self.scheduler is None:
+                return self._stats_sources()[name]()
+            cached = self._stats_cache.get(name)
+            if cached is None:
+                cached = self._stats_cache[name] = self._stats_sources()[name]()
+            return cached
+    
+    def _flush_note_search(self, limit: Optional[int] = None) -> int:
+        """内部方法：登记待更新笔记（最多 limit 条）的检索词，返回处理的笔记数"""
+        dirty = self._note_search_dirty
+        count = len(dirty) if limit is None else min(limit, len(dirty))
+        for _ in range(count):
+            note_id = dirty.pop()
+            note = self.notes.get(note_id)
+            if note is None:
+                self._note_search.remove(note_id)
+            else:
+                self._note_search.add(note_id, search_terms(self.minimal_tasks[note['task_id']]['name'],
+                                                            self._read_note_body(note_id, 'key_questions')))
+        return count
+    
+    def search_notes(self, query: str = "", limit: int = 20) -> List[Tuple[str, str]]:
+        """按任务名称或线索栏关键词（前缀匹配）检索笔记，返回 [(note_id, 显示标签)]；查询为空时返回最近的笔记"""
+        with self._lock:
+            if query.strip():
+                self._flush_note_search()
+                note_ids = self._note_search.search(query, limit)
+            else:
+                note_ids = self._note_time_index.latest(limit)
+            results = []
+            for note_id in note_ids:
+                note = self.notes[note_id]
+                cues = split_cues(self._read_note_body(note_id, 'key_questions'))
+                results.append((note_id, f"{self.minimal_tasks[note['task_id']]['name']}｜"
+                                         f"{cues[0] if cues else '（无线索）'}｜{note['created_at'][:10]}"))
+            return results
+    
+    def search_tasks(self, query: str = "", limit: int = 20, goal_only: bool = True) -> List[Tuple[int, str]]:
+        """按任务名称或模块（前缀匹配）检索任务，返回 [(任务索引, 显示标签)]；goal_only 时只检索当前目标"""
+        with self._lock:
+            goal_id = self.current_goal_id
+            if query.strip():
+                predicate = (lambda i: self.minimal_tasks[i].get('goal_id') == goal_id) if goal_only else None
+                task_ids = self._task_search.search(query, limit, predicate)
+            elif goal_only:
+                task_ids = self._goal_task_ids(goal_id)[:limit]
+            else:
+                task_ids = list(itertools.islice(self.minimal_tasks, limit))
+            results = []
+            for task_index in task_ids:
+                task = self.minimal_tasks[task_index]
+                module = f"（{task['module']}）" if task.get('module') else ""
+                results.append((task_index, f"{task['name']}{module}"))
+            return results
     
     def get_notes(self):
-        """获取所有笔记"""
-        return self.notes
+        """获取所有笔记，返回副本（后台同步可能同时写入）"""
+        with self._lock:
+            return dict(self.notes)
     
     def get_tasks(self):
-        """获取所有任务"""
-        return self.minimal_tasks
+        """获取所有任务，返回副本（后台同步可能同时写入）"""
+        with self._lock:
+            return dict(self.minimal_tasks)
 
-# 初始化系统
+# 初始化系统（设置 STUDYFAST_STATE_DB 时多个进程共享同一份状态，
+# 设置 STUDYFAST_BLOB_DIR 时笔记正文存放在磁盘内容存储中，打开笔记时才加载，
+# STUDYFAST_JOB_WORKERS 为后台任务线程数，设为 0 时不启动后台任务，
+# 设置 STUDYFAST_API_PORT 时在该端口同时提供本地 HTTP JSON 接口，
+# 设置 STUDYFAST_TRACE 时把页面对学习系统的调用录制到该轨迹文件）
 @st.cache_resource
 def get_study_system():
-    return DeepLearningSystem()
+    cold_after_days = os.environ.get("STUDYFAST_COLD_AFTER_DAYS")
+    # 工作区配额以 MB 配置
+    soft_quota, hard_quota = (os.environ.get(f"STUDYFAST_{kind}_QUOTA_MB") for kind in ("SOFT", "HARD"))
+    study_system = DeepLearningSystem(blob_dir=os.environ.get("STUDYFAST_BLOB_DIR"),
+                                      cold_after_days=int(cold_after_days) if cold_after_days else None,
+                                      soft_quota_bytes=int(float(soft_quota) * 1048576) if soft_quota else None,
+                                      hard_quota_bytes=int(float(hard_quota) * 1048576) if hard_quota else None)
+    state_db = os.environ.get("STUDYFAST_STATE_DB")
+    if state_db:
+        study_system.attach_store(SQLiteStateStore(state_db))
+    workers = int(os.environ.get("STUDYFAST_JOB_WORKERS", JOB_WORKERS))
+    if workers > 0:
+        study_system.scheduler = start_background_jobs(study_system, workers)
+    api_port = os.environ.get("STUDYFAST_API_PORT")
+    if api_port:
+        start_api_server(study_system, port=int(api_port))
+    trace_path = os.environ.get("STUDYFAST_TRACE")
+    if trace_path:
+        # 录制页面发起的调用（后台任务直接使用原实例，不计入轨迹）
+        recorder = TraceRecorder(trace_path)
+        atexit.register(recorder.close)
+        study_system = TracedSystem(study_system, recorder, session=_script_session_id)
+    return study_system
+
+
+def _script_session_id() -> Optional[str]:
+    """当前 Streamlit 浏览器会话的标识（不在页面脚本中调用时为 None）"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+# 检索式选择器：每次重跑只查询索引，返回笔记/任务的稳定标识
+def render_note_picker(study_system, label: str, key: str, empty_message: str, **kwargs) -> Optional[str]:
+    query = st.text_input("🔍 搜索笔记", key=f"{key}_query", placeholder="输入任务名称或问题关键词")
+    options = dict(study_system.search_notes(query))
+    if not options:
+        if query.strip():
+            st.info("没有匹配的笔记")
+        else:
+            st.warning(empty_message)
+        return None
+    return st.selectbox(label, list(options), format_func=options.get, key=key, **kwargs)
+
+
+def render_task_picker(study_system, label: str, key: str, empty_message: str,
+                       goal_only: bool = True, **kwargs) -> Optional[int]:
+    query = st.text_input("🔍 搜索任务", key=f"{key}_query", placeholder="输入任务名称或模块")
+    options = dict(study_system.search_tasks(query, goal_only=goal_only))
+    if not options:
+        if query.strip():
+            st.info("没有匹配的任务")
+        else:
+            st.warning(empty_message)
+        return None
+    return st.selectbox(label, list(options), format_func=options.get, key=key, **kwargs)
+
+# “查看所有笔记”页每页列出的笔记数
+NOTES_PER_PAGE = 20
+
+
+# 游标分页：session_state 中保存已翻过各页的起始游标，每次重跑只取当前页的笔记元数据
+def render_note_page(study_system, key: str, task_index: Optional[int] = None) -> List[Dict[str, Any]]:
+    total = study_system.get_note_count(task_index)
+    state_key = f"{key}_cursors"
+    if st.session_state.get(f"{key}_scope") != task_index:
+        st.session_state[f"{key}_scope"] = task_index
+        st.session_state[state_key] = [None]
+    cursors = st.session_state.setdefault(state_key, [None])
+    notes, cursor = study_system.list_notes(cursors[-1], NOTES_PER_PAGE, task_index)
+    if not notes and len(cursors) > 1:
+        # 当前页的笔记已全部删除，回到第一页
+        cursors[:] = [None]
+        notes, cursor = study_system.list_notes(None, NOTES_PER_PAGE, task_index)
+    pages = max(1, (total + NOTES_PER_PAGE - 1) // NOTES_PER_PAGE)
+    previous_col, info_col, next_col = st.columns([1, 2, 1])
+    previous_col.button("⬅️ 上一页", key=f"{key}_previous", disabled=len(cursors) == 1,
+                        on_click=cursors.pop)
+    info_col.caption(f"第 {len(cursors)} 页，共 {pages} 页（{total} 条笔记）")
+    next_col.button("下一页 ➡️", key=f"{key}_next", disabled=cursor is None,
+                    on_click=cursors.append, args=(cursor,))
+    return notes
 
 # Streamlit应用
 def main():
@@ -160,6 +1959,7 @@ def main():
     
     # 初始化系统
     study_system = get_study_system()
+    study_system.sync()
     
     # 侧边栏导航
     st.sidebar.title("学习导航")
@@ -195,7 +1995,8 @@ def main():
                 for module in module_list:
                     tasks.append({
                         "name": f"学习{module}",
-                        "description": f"掌握{module}的核心概念和应用方法"
+                        "description": f"掌握{module}的核心概念和应用方法",
+                        "module": module
                     })
                 study_system.create_minimal_tasks(tasks)
                 st.success("已自动生成学习任务")
@@ -211,33 +2012,26 @@ def main():
         
         if st.button("添加任务"):
             if task_name and task_description:
-                study_system.minimal_tasks.append({
-                    "name": task_name,
-                    "description": task_description
-                })
+                study_system.add_task(task_name, task_description)
                 st.success(f"已添加任务：{task_name}")
             else:
                 st.warning("请填写任务名称和描述")
         
         # 显示现有任务
-        if study_system.minimal_tasks:
+        tasks = study_system.get_tasks()
+        if tasks:
             st.subheader("现有任务列表")
-            for i, task in enumerate(study_system.minimal_tasks):
-                st.markdown(f"{i+1}. **{task['name']}** - {task['description']}")
+            for i, task in enumerate(tasks.values(), 1):
+                st.markdown(f"{i}. **{task['name']}** - {task['description']}")
     
     elif page == "⏰ 开始学习会话":
         st.header("⏰ 开始学习会话")
         
-        if not study_system.minimal_tasks:
-            st.warning("请先创建学习任务")
-            return
-        
         # 选择任务
-        task_options = [f"{i+1}. {task['name']}" for i, task in enumerate(study_system.minimal_tasks)]
-        selected_task = st.selectbox("选择要学习的任务", task_options)
+        task_index = render_task_picker(study_system, "选择要学习的任务", "session_task", "请先创建学习任务",
+                                        goal_only=False)
         
-        if selected_task:
-            task_index = int(selected_task.split('.')[0]) - 1
+        if task_index is not None:
             
             # 显示任务详情
             task = study_system.minimal_tasks[task_index]
@@ -264,18 +2058,10 @@ def main():
         st.header("📋 完善笔记总结")
         
         # 选择笔记
-        note_options = [(note_id, f"任务{note['task_id']+1}: {study_system.minimal_tasks[note['task_id']]['name']}") 
-                       for note_id, note in study_system.notes.items()]
+        note_id = render_note_picker(study_system, "选择要完善的笔记", "summary_note", "暂无笔记，请先完成学习会话")
         
-        if not note_options:
-            st.warning("暂无笔记，请先完成学习会话")
-            return
-        
-        selected_note = st.selectbox("选择要完善的笔记", [option[1] for option in note_options])
-        
-        if selected_note:
-            note_id = [option[0] for option in note_options if option[1] == selected_note][0]
-            note = study_system.notes[note_id]
+        if note_id is not None:
+            note = study_system.open_note(note_id)
             
             # 显示笔记内容
             st.info(f"**主笔记：** {note['main_notes']}")
@@ -297,20 +2083,19 @@ def main():
         
         # 显示当前复习计划
         st.subheader("当前复习计划")
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        tomorrow = (datetime.datetime.now() + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        now = study_system.clock.now()
+        today = now.strftime("%Y-%m-%d")
+        tomorrow = (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
         
-        if tomorrow in study_system.review_schedule and study_system.review_schedule[tomorrow]:
+        tomorrow_queue = study_system.get_review_queue(tomorrow)
+        if tomorrow_queue:
             st.info(f"已安排的明日 ({tomorrow}) 复习计划:")
-            for note_id, focus_point in study_system.review_schedule[tomorrow].items():
-                if note_id in study_system.notes:
-                    note = study_system.notes[note_id]
-                    task_name = study_system.minimal_tasks[note['task_id']]['name']
-                    st.markdown(f"- **{task_name}**: {focus_point}")
+            for entry in tomorrow_queue:
+                st.markdown(f"- **{entry['task_name']}**: {entry['focus_point']}")
         else:
             st.info(f"暂无明日 ({tomorrow}) 复习计划")
         
-        today_notes = study_system._get_today_notes()
+        today_notes = study_system.get_today_notes()
         if not today_notes:
             st.info("今天没有创建学习笔记，无需复习")
             return
@@ -322,7 +2107,7 @@ def main():
         for note_id, note in today_notes.items():
             task = study_system.minimal_tasks[note['task_id']]
             st.markdown(f"### 复习任务: {task['name']}")
-            st.info(f"**关键问题:** {note['key_questions']}")
+            st.info(f"**关键问题:** {study_system.get_note_body(note_id, 'key_questions')}")
             
             col1, col2 = st.columns(2)
             with col1:
@@ -342,43 +2127,37 @@ def main():
         
         # 显示复习计划状态
         st.subheader("复习计划状态")
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        tomorrow = (datetime.datetime.now() + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        now = study_system.clock.now()
+        today = now.strftime("%Y-%m-%d")
+        tomorrow = (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
         
-        if today in study_system.review_schedule and study_system.review_schedule[today]:
+        today_queue = study_system.get_review_queue(today)
+        if today_queue:
             st.info(f"今日 ({today}) 复习计划:")
-            for note_id, focus_point in study_system.review_schedule[today].items():
-                if note_id in study_system.notes:
-                    note = study_system.notes[note_id]
-                    task_name = study_system.minimal_tasks[note['task_id']]['name']
-                    st.markdown(f"- **{task_name}**: {focus_point}")
+            for entry in today_queue:
+                carried = f"（顺延自 {entry['carried_from']}）" if entry['carried_from'] else ""
+                st.markdown(f"- **{entry['task_name']}**: {entry['focus_point']}{carried}")
         else:
             st.info(f"今日 ({today}) 没有安排复习任务")
             
-        if tomorrow in study_system.review_schedule and study_system.review_schedule[tomorrow]:
+        tomorrow_queue = study_system.get_review_queue(tomorrow)
+        if tomorrow_queue:
             st.info(f"明日 ({tomorrow}) 复习计划:")
-            for note_id, focus_point in study_system.review_schedule[tomorrow].items():
-                if note_id in study_system.notes:
-                    note = study_system.notes[note_id]
-                    task_name = study_system.minimal_tasks[note['task_id']]['name']
-                    st.markdown(f"- **{task_name}**: {focus_point}")
+            for entry in tomorrow_queue:
+                st.markdown(f"- **{entry['task_name']}**: {entry['focus_point']}")
         else:
             st.info(f"明日 ({tomorrow}) 没有安排复习任务")
         
         # 实际的晨间复习功能
-        today_reviews = study_system._get_today_morning_reviews()
-        if not today_reviews:
+        if not today_queue:
             st.info("今天没有安排晨间复习任务")
             return
         
         st.subheader("今日晨间复习任务")
-        for note_id, focus_point in today_reviews.items():
-            if note_id in study_system.notes:
-                note = study_system.notes[note_id]
-                task_name = study_system.minimal_tasks[note['task_id']]['name']
-                st.markdown(f"### 复习任务: {task_name}")
-                st.info(f"**重点强化:** {focus_point}")
-                st.success("✅ 已完成晨间复习")
+        for entry in today_queue:
+            st.markdown(f"### 复习任务: {entry['task_name']}")
+            st.info(f"**重点强化:** {entry['focus_point']}")
+            st.success("✅ 已完成晨间复习")
         
         if st.button("完成所有晨间复习"):
             result = study_system.morning_review()
@@ -387,16 +2166,11 @@ def main():
     elif page == "📝 实战检验":
         st.header("📝 实战检验（做题+费曼验证）")
         
-        if not study_system.minimal_tasks:
-            st.warning("请先创建学习任务")
-            return
-        
         # 选择任务
-        task_options = [f"{i+1}. {task['name']}" for i, task in enumerate(study_system.minimal_tasks)]
-        selected_task = st.selectbox("选择要检验的任务", task_options)
+        task_index = render_task_picker(study_system, "选择要检验的任务", "practice_task", "请先创建学习任务",
+                                        goal_only=False)
         
-        if selected_task:
-            task_index = int(selected_task.split('.')[0]) - 1
+        if task_index is not None:
             
             # 输入得分
             score = st.number_input("请输入本次练习得分（0-100）", min_value=0, max_value=100, value=85)
@@ -433,21 +2207,24 @@ def main():
     elif page == "📖 查看所有笔记":
         st.header("📖 所有学习笔记")
         
-        notes = study_system.get_notes()
         tasks = study_system.get_tasks()
         
-        if not notes:
+        if not study_system.get_note_count():
             st.info("暂无学习笔记")
             return
         
-        for note_id, note in notes.items():
+        # 按页列出笔记元数据，勾选展开时才加载正文（冷笔记此时才解压）
+        for note in render_note_page(study_system, "all_notes"):
+            note_id = note['note_id']
             task = tasks[note['task_id']]
             st.markdown(f"### 笔记ID: {note_id}")
             st.markdown(f"**任务:** {task['name']}")
-            st.markdown(f"**主笔记:** {note['main_notes']}")
-            st.markdown(f"**关键问题:** {note['key_questions']}")
-            st.markdown(f"**总结:** {note.get('summary', '未完成')}")
             st.markdown(f"**创建时间:** {note['created_at']}")
+            if st.checkbox("展开正文", key=f"note_body_{note_id}"):
+                note = study_system.open_note(note_id)
+                st.markdown(f"**主笔记:** {note['main_notes']}")
+                st.markdown(f"**关键问题:** {note['key_questions']}")
+                st.markdown(f"**总结:** {note.get('summary', '未完成')}")
             st.markdown("---")
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+import collections
+import hashlib
+import os
+import tempfile
+import struct
+import threading
+import zlib
+from typing import Dict
+
+
+class BlobStore:
+    """基于内容寻址的磁盘存储：相同内容只存一份，按 SHA-256 读取，近期读取的内容保留在小型 LRU 缓存中"""
+    
+    def __init__(self, root: str, cache_size: int = 256):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()  # 摘要 -> 文本
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        # 磁盘占用计数：打开时扫描一次目录，之后随写入和压缩增量更新（其他进程的写入在重新打开时计入）
+        self._usage = self._scan_disk_usage()
+    
+    COMPRESSED_SUFFIX = ".z"  # 冷数据压缩文件：8 字节原始大小 + zlib 数据
+    
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+    
+    def _write_atomic(self, path: str, data: bytes):
+        # 先写临时文件再原子替换，避免并发写入或中断留下不完整的内容
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    def put(self, text: str) -> Dict[str, object]:
+        """写入文本，返回引用 {'hash': 摘要, 'size': 字节数}；内容已存在时不重复写入"""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            if not os.path.exists(path) and not os.path.exists(path + self.COMPRESSED_SUFFIX):
+                self._write_atomic(path, data)
+                self._usage['blobs'] += 1
+                self._usage['bytes'] += len(data)
+        return {'hash': digest, 'size': len(data)}
+    
+    def get(self, digest: str) -> str:
+        """按摘要读取文本"""
+        with self._lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                return text
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as f:
+                text = f.read().decode('utf-8')
+        except FileNotFoundError:
+            with open(path + self.COMPRESSED_SUFFIX, 'rb') as f:
+                text = zlib.decompress(f.read()[8:]).decode('utf-8')
+        with self._lock:
+            self._cache[digest] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+    
+    def compress(self, digest: str) -> int:
+        """把内容改为压缩存储（冷数据），返回节省的字节数；压缩无收益或已压缩时返回 0"""
+        path = self._path(digest)
+        with self._lock:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return 0
+            packed = struct.pack('>Q', len(data)) + zlib.compress(data, 9)
+            if len(packed) >= len(data):
+                return 0
+            self._write_atomic(path + self.COMPRESSED_SUFFIX, packed)
+            os.remove(path)
+            saved = len(data) - len(packed)
+            self._usage['bytes'] -= saved
+            self._usage['compressed_blobs'] += 1
+            self._usage['saved_bytes'] += saved
+            return saved
+    
+    def evict(self, digest: str):
+        """把内容移出内存缓存"""
+        with self._lock:
+            self._cache.pop(digest, None)
+    
+    def disk_usage(self) -> Dict[str, int]:
+        """磁盘上的内容数、总字节数，以及压缩存储的内容数和节省的字节数（读取计数，不扫描目录）"""
+        with self._lock:
+            return dict(self._usage)
+    
+    def _scan_disk_usage(self) -> Dict[str, int]:
+        blobs = size = compressed = saved = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                file_size = os.path.getsize(path)
+                blobs += 1
+                size += file_size
+                if name.endswith(self.COMPRESSED_SUFFIX):
+                    with open(path, 'rb') as f:
+                        raw_size, = struct.unpack('>Q', f.read(8))
+                    compressed += 1
+                    saved += raw_size - file_size
+        return {'blobs': blobs, 'bytes': size, 'compressed_blobs': compressed, 'saved_bytes': saved}
@@ -0,0 +1,45 @@
+"""可注入的时钟：学习系统的所有“当前时间”都从时钟读取，测试和模拟时可用手动时钟快进"""
+import abc
+import datetime
+import threading
+from typing import Optional
+
+# 手动时钟的默认起点：固定时间，未指定起点的测试和模拟每次运行结果一致
+MANUAL_CLOCK_EPOCH = datetime.datetime(2024, 1, 1, 7)
+
+
+class Clock(abc.ABC):
+    """时钟接口"""
+
+    @abc.abstractmethod
+    def now(self) -> datetime.datetime:
+        """当前时间（不带时区的本地时间）"""
+
+
+class SystemClock(Clock):
+    """真实时间"""
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+
+class ManualClock(Clock):
+    """手动推进的时钟：不随真实时间流逝，只在 advance/set 时改变"""
+
+    def __init__(self, start: Optional[datetime.datetime] = None):
+        self._now = start or MANUAL_CLOCK_EPOCH
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime.datetime:
+        with self._lock:
+            return self._now
+
+    def set(self, moment: datetime.datetime):
+        with self._lock:
+            self._now = moment
+
+    def advance(self, **delta: float) -> datetime.datetime:
+        """向前推进（参数同 datetime.timedelta），返回推进后的时间"""
+        with self._lock:
+            self._now += datetime.timedelta(**delta)
+            return self._now
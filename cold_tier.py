@@ -0,0 +1,107 @@
+import collections
+import json
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def train_dictionary(samples: Iterable[str], size: int = 32 * 1024) -> bytes:
+    """根据样本文本训练 zlib 预设字典：出现次数最多的词和中文二元组排在字典末尾（距离最近、编码最短）"""
+    counts = collections.Counter()
+    for text in samples:
+        for word in re.findall(r"[A-Za-z0-9_]{3,}", text):
+            counts[word] += 1
+        for run in re.findall(r"[一-鿿]+", text):
+            counts.update(run[i:i + 2] for i in range(len(run) - 1))
+    pieces = []
+    total = 0
+    for piece, count in counts.most_common():
+        if count < 2:
+            break
+        data = piece.encode('utf-8')
+        if total + len(data) > size:
+            break
+        pieces.append(data)
+        total += len(data)
+    return b"".join(reversed(pieces))
+
+
+class ColdTier:
+    """冷数据存储：把不常访问的文本字段整体压缩保存，读取时解压还原"""
+
+    def __init__(self, level: int = 9):
+        self.level = level
+        self._dictionaries: List[bytes] = []  # 训练得到的预设字典（按版本保存，旧数据仍可解压）
+        self._entries: Dict[str, Tuple[int, bytes, Dict[str, int]]] = {}  # 键 -> (字典版本, 压缩数据, 各字段字节数)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def trained(self) -> bool:
+        return bool(self._dictionaries)
+
+    def train(self, samples: Iterable[str], size: int = 32 * 1024) -> int:
+        """训练新的预设字典，返回字典版本；样本重复内容太少时不生成字典，返回 -1"""
+        dictionary = train_dictionary(samples, size)
+        if not dictionary:
+            return -1
+        self._dictionaries.append(dictionary)
+        return len(self._dictionaries) - 1
+
+    def _compressor(self, version: int):
+        if version < 0:
+            return zlib.compressobj(self.level)
+        return zlib.compressobj(self.level, zdict=self._dictionaries[version])
+
+    def _decompressor(self, version: int):
+        if version < 0:
+            return zlib.decompressobj()
+        return zlib.decompressobj(zdict=self._dictionaries[version])
+
+    def freeze(self, key: str, fields: Dict[str, str]):
+        """压缩保存一组文本字段"""
+        version = len(self._dictionaries) - 1
+        compressor = self._compressor(version)
+        data = compressor.compress(json.dumps(fields, ensure_ascii=False).encode('utf-8')) + compressor.flush()
+        sizes = {field: len(text.encode('utf-8')) for field, text in fields.items()}
+        self._entries[key] = (version, data, sizes)
+
+    def peek(self, key: str) -> Dict[str, str]:
+        """解压读取，数据仍保留在冷存储中"""
+        version, data, _ = self._entries[key]
+        decompressor = self._decompressor(version)
+        return json.loads(decompressor.decompress(data) + decompressor.flush())
+
+    def thaw(self, key: str) -> Dict[str, str]:
+        """解压读取并移出冷存储"""
+        fields = self.peek(key)
+        del self._entries[key]
+        return fields
+
+    def sizes(self, key: str) -> Optional[Dict[str, int]]:
+        """各字段的原始字节数（无需解压）"""
+        entry = self._entries.get(key)
+        return entry[2] if entry else None
+
+    def stored_bytes(self, key: str) -> int:
+        """压缩后占用的字节数（不在冷存储中时为 0）"""
+        entry = self._entries.get(key)
+        return len(entry[1]) if entry else 0
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """统计冷数据条数、原始字节数和压缩后字节数"""
+        raw = sum(sum(sizes.values()) for _, _, sizes in self._entries.values())
+        compressed = sum(len(data) for _, data, _ in self._entries.values())
+        return {
+            'entries': len(self._entries),
+            'raw_bytes': raw,
+            'compressed_bytes': compressed,
+            'dictionary_bytes': sum(len(dictionary) for dictionary in self._dictionaries)
+        }
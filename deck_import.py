@@ -0,0 +1,138 @@
+import argparse
+import csv
+import html
+import itertools
+import os
+import re
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+BATCH_SIZE = 2000  # 每批写入的卡片数，同时决定解析时驻留内存的卡片上限
+
+# CSV 表头别名 -> 卡片字段
+HEADER_ALIASES = {
+    'question': 'question', 'front': 'question', 'q': 'question', '问题': 'question', '题目': 'question',
+    'answer': 'answer', 'back': 'answer', 'a': 'answer', '答案': 'answer', '解答': 'answer',
+    'deck': 'task', 'task': 'task', '牌组': 'task', '任务': 'task',
+    'module': 'module', '模块': 'module'
+}
+
+# Anki 纯文本导出的分隔符名称
+ANKI_SEPARATORS = {'tab': '\t', 'comma': ',', 'semicolon': ';', 'pipe': '|', 'space': ' '}
+
+_TAG_RE = re.compile(r"<br\s*/?>|<[^>]+>", re.IGNORECASE)
+
+
+def _strip_html(text: str) -> str:
+    return html.unescape(_TAG_RE.sub(lambda m: "\n" if m.group(0).lower().startswith("<br") else "", text)).strip()
+
+
+def iter_cards(stream: TextIO, default_task: str) -> Iterator[Dict[str, Optional[str]]]:
+    """逐行解析 CSV 题库或 Anki 纯文本导出，产出 {'task', 'module', 'question', 'answer'} 卡片"""
+    # Anki 导出的文件头：#separator:tab、#html:true、#deck column:3 等
+    options = {}
+    line = stream.readline()
+    while line.startswith('#'):
+        key, _, value = line[1:].rstrip('\r\n').partition(':')
+        options[key.strip().lower()] = value.strip()
+        line = stream.readline()
+    if not line:
+        return
+    separator = options.get('separator')
+    if separator is not None:
+        delimiter = ANKI_SEPARATORS.get(separator.lower(), separator[:1] or '\t')
+    else:
+        delimiter = '\t' if '\t' in line else ','
+    reader = csv.reader(itertools.chain([line], stream), delimiter=delimiter)
+    strip = _strip_html if options.get('html', '').lower() == 'true' else str.strip
+
+    columns = {'question': 0, 'answer': 1}
+    first_row = next(reader, None)
+    if first_row is None:
+        return
+    header = {HEADER_ALIASES.get(name.strip().lower()): i for i, name in enumerate(first_row)}
+    header.pop(None, None)
+    if 'question' in header and 'answer' in header:
+        columns = header
+        rows = reader
+    else:
+        # 无表头：跳过 Anki 的 guid / 笔记类型列，前两个内容列依次为问题和答案
+        meta = {int(options[key]) - 1 for key in ('guid column', 'notetype column', 'deck column', 'tags column')
+                if options.get(key, '').isdigit()}
+        content = [i for i in range(len(first_row)) if i not in meta]
+        if len(content) >= 2:
+            columns = {'question': content[0], 'answer': content[1]}
+        if options.get('deck column', '').isdigit():
+            columns['task'] = int(options['deck column']) - 1
+        rows = itertools.chain([first_row], reader)
+
+    width = max(columns.values()) + 1
+    for row in rows:
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        question = strip(row[columns['question']])
+        answer = strip(row[columns['answer']])
+        if not question and not answer:
+            continue
+        task = row[columns['task']].strip() if 'task' in columns else ''
+        module = row[columns['module']].strip() if 'module' in columns else ''
+        yield {
+            'task': task.replace('::', ' / ') or default_task,
+            'module': module or None,
+            'question': question,
+            'answer': answer
+        }
+
+
+def iter_batches(cards: Iterable[Dict], size: int = BATCH_SIZE) -> Iterator[List[Dict]]:
+    """把卡片流切成固定大小的批次"""
+    cards = iter(cards)
+    while True:
+        batch = list(itertools.islice(cards, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_deck(study_system, stream: TextIO, source: str, default_task: Optional[str] = None,
+                batch_size: int = BATCH_SIZE,
+                progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """流式导入题库：按批解析并写入学习系统，内存中最多驻留一批卡片；返回导入统计"""
+    totals = {'imported': 0, 'skipped': 0, 'tasks_created': 0}
+    for batch in iter_batches(iter_cards(stream, default_task or source), batch_size):
+        result = study_system.import_cards(batch, source)
+        for key in totals:
+            totals[key] += result[key]
+        if progress is not None:
+            progress(totals)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 CSV 题库或 Anki 纯文本导出导入为学习任务和康奈尔笔记")
+    parser.add_argument("path", help="CSV / TSV / Anki 导出的 .txt 文件")
+    parser.add_argument("--task", help="没有牌组列时使用的任务名称（默认取文件名）")
+    parser.add_argument("--state-db", default=os.environ.get("STUDYFAST_STATE_DB"),
+                        help="导入到共享状态库（默认读取 STUDYFAST_STATE_DB）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app import DeepLearningSystem
+    from state_store import SQLiteStateStore
+    study_system = DeepLearningSystem(blob_dir=os.environ.get("STUDYFAST_BLOB_DIR"))
+    if args.state_db:
+        study_system.attach_store(SQLiteStateStore(args.state_db))
+    source = os.path.basename(args.path)
+    start = time.perf_counter()
+    with open(args.path, encoding='utf-8-sig', newline='') as f:
+        totals = import_deck(study_system, f, source, args.task or os.path.splitext(source)[0],
+                             args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"导入 {totals['imported']} 张卡片，跳过重复 {totals['skipped']} 张，"
+          f"新建任务 {totals['tasks_created']} 个，用时 {elapsed:.2f} 秒")
+    if not args.state_db:
+        print("提示：未指定 --state-db，导入结果未保存")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_CUE_SPLIT = re.compile(r"\n+|(?<=[？?；;])")
+_CUE_STRIP = " \t-•·；;"
+
+Card = Tuple[str, int]  # (note_id, 线索序号)
+
+
+def split_cues(key_questions: str) -> List[str]:
+    """把线索栏拆成单独的问题：按换行，以及问号、分号之后断开"""
+    return [cue.strip(_CUE_STRIP) for cue in _CUE_SPLIT.split(key_questions) if cue.strip(_CUE_STRIP)]
+
+
+class FlashcardIndex:
+    """闪卡索引：任务 -> {note_id: 线索数}，只保存数量，抽到卡片时再读取线索文本"""
+
+    def __init__(self):
+        self._by_task: Dict[int, Dict[str, int]] = {}
+        self._note_tasks: Dict[str, int] = {}  # note_id -> 所在任务
+
+    def set(self, note_id: str, task_index: int, cue_count: int):
+        """登记或更新一条笔记的线索数"""
+        old_task = self._note_tasks.get(note_id)
+        if old_task is not None and old_task != task_index:
+            self.remove(note_id)
+        if cue_count:
+            self._by_task.setdefault(task_index, {})[note_id] = cue_count
+            self._note_tasks[note_id] = task_index
+        else:
+            self.remove(note_id)
+
+    def remove(self, note_id: str):
+        task_index = self._note_tasks.pop(note_id, None)
+        if task_index is not None:
+            cards = self._by_task[task_index]
+            cards.pop(note_id, None)
+            if not cards:
+                del self._by_task[task_index]
+
+    def count(self, task_indexes: Iterable[int]) -> int:
+        return sum(sum(self._by_task.get(task_index, {}).values()) for task_index in task_indexes)
+
+    def cards(self, task_indexes: Iterable[int]) -> List[Card]:
+        """列出若干任务下的全部卡片，只访问这些任务的笔记"""
+        return [(note_id, i) for task_index in task_indexes
+                for note_id, count in self._by_task.get(task_index, {}).items() for i in range(count)]
+
+
+class DrillDeck:
+    """一次闪卡练习：创建时洗好牌，抽卡 O(1)；评分先在本地缓存，按批提交"""
+
+    def __init__(self, cards: List[Card], seed: Optional[int] = None):
+        random.Random(seed).shuffle(cards)
+        self._cards = cards
+        self._position = 0
+        self._graded: List[Tuple[str, str]] = []  # 待提交的 (note_id, 回忆结果)
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    @property
+    def position(self) -> int:
+        """已抽出的卡片数"""
+        return self._position
+
+    def draw(self) -> Optional[Card]:
+        """抽下一张卡片，抽完返回 None"""
+        if self._position >= len(self._cards):
+            return None
+        card = self._cards[self._position]
+        self._position += 1
+        return card
+
+    def grade(self, card: Card, outcome: str):
+        self._graded.append((card[0], outcome))
+
+    @property
+    def pending(self) -> int:
+        """尚未提交的评分数"""
+        return len(self._graded)
+
+    def take_graded(self) -> List[Tuple[str, str]]:
+        """取出待提交的评分"""
+        graded, self._graded = self._graded, []
+        return graded
@@ -0,0 +1,350 @@
+"""本地 HTTP JSON 接口：脚本和其他工具无需驱动页面即可读写学习数据
+
+与 Streamlit 页面共享同一个学习系统（设置 STUDYFAST_API_PORT），或单独运行：
+    python3 http_api.py --port 8765 --state-db /var/lib/studyfast/state.db
+
+读取（列表接口按游标分页，响应带 ETag，请求带 If-None-Match 且状态版本未变时返回 304）：
+    GET  /api/goals
+    GET  /api/tasks?goal_id=&cursor=&limit=
+    GET  /api/notes?task_id=&cursor=&limit=&bodies=1
+    GET  /api/notes/<note_id>
+    GET  /api/reviews?date=YYYY-MM-DD
+    GET  /api/weak_points?task_id=&cursor=&limit=
+    GET  /api/progress?goal_id=
+批量写入（请求体 {"items": [...]}，逐条返回结果，整批合并为一个写事务）：
+    POST /api/goals            {"goal": "...", "modules": [...]}（设定并切换到该目标）
+    POST /api/tasks/batch      [{"name", "description", "module"}]（加入当前目标）
+    POST /api/notes/batch      [{"task_id", "main_notes", "key_questions", "summary", "note_id"?}]
+    POST /api/practice/batch   [{"task_id", "score", "weak_point", "blind_spot"}]
+    POST /api/recalls/batch    [{"note_id", "outcome"}]
+"""
+import argparse
+import base64
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from memory_accounting import QuotaExceededError
+
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500  # 单页最多返回的记录数
+MAX_BATCH = 1000  # 单次批量写入最多的条数
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class ApiError(Exception):
+    """以 JSON 错误响应返回给客户端的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_cursor(cursor: Any) -> Optional[str]:
+    """分页游标对客户端不透明：JSON 后做 URL 安全的 Base64"""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cursor, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token: Optional[str]) -> Any:
+    if not token:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except ValueError:
+        raise ApiError(400, "无效的分页游标")
+
+
+class StudyApi:
+    """把请求路由到学习系统的公开方法；与传输层无关，便于直接调用"""
+
+    def __init__(self, study_system):
+        self.system = study_system
+        self._routes: List[Tuple[str, re.Pattern, Callable]] = [
+            ("GET", re.compile(r"/api/goals"), self.get_goals),
+            ("GET", re.compile(r"/api/tasks"), self.get_tasks),
+            ("GET", re.compile(r"/api/notes"), self.get_notes),
+            ("GET", re.compile(r"/api/notes/(?P<note_id>[^/]+)"), self.get_note),
+            ("GET", re.compile(r"/api/reviews"), self.get_reviews),
+            ("GET", re.compile(r"/api/weak_points"), self.get_weak_points),
+            ("GET", re.compile(r"/api/progress"), self.get_progress),
+            ("POST", re.compile(r"/api/goals"), self.post_goal),
+            ("POST", re.compile(r"/api/tasks/batch"), self.post_tasks),
+            ("POST", re.compile(r"/api/notes/batch"), self.post_notes),
+            ("POST", re.compile(r"/api/practice/batch"), self.post_practice),
+            ("POST", re.compile(r"/api/recalls/batch"), self.post_recalls),
+        ]
+
+    def version(self) -> str:
+        """读取前先拉取其他进程的修改，ETag 为最新的状态标识（接入共享状态库时各进程一致）"""
+        self.system.sync()
+        return self.system.state_tag()
+
+    def dispatch(self, method: str, path: str, query: Dict[str, List[str]], body: Any) -> Dict[str, Any]:
+        allowed = False
+        for route_method, pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            params = {key: values[-1] for key, values in query.items()}
+            kwargs = {key: unquote(value) for key, value in match.groupdict().items()}
+            return handler(params, body, **kwargs) if method == "POST" else handler(params, **kwargs)
+        if allowed:
+            raise ApiError(405, f"{path} 不支持 {method}")
+        raise ApiError(404, f"未知接口：{path}")
+
+    # ---------- 读取 ----------
+
+    @staticmethod
+    def _int_param(params: Dict[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+        value = params.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(400, f"参数 {name} 应为整数")
+
+    def _limit(self, params: Dict[str, str]) -> int:
+        return min(max(self._int_param(params, 'limit', DEFAULT_LIMIT), 1), MAX_LIMIT)
+
+    def _goal_param(self, params: Dict[str, str]) -> Optional[str]:
+        goal_id = params.get('goal_id') or None
+        if goal_id is not None and goal_id not in self.system.goals:
+            raise ApiError(404, "目标不存在")
+        return goal_id
+
+    def _task_param(self, params: Dict[str, str]) -> Optional[int]:
+        task_index = self._int_param(params, 'task_id')
+        if task_index is not None and task_index not in self.system.minimal_tasks:
+            raise ApiError(404, "任务不存在")
+        return task_index
+
+    def get_goals(self, params: Dict[str, str]) -> Dict[str, Any]:
+        goals, current_goal_id = self.system.list_goals()
+        return {'items': goals, 'current_goal_id': current_goal_id}
+
+    def get_tasks(self, params: Dict[str, str]) -> Dict[str, Any]:
+        tasks, cursor = self.system.list_tasks(self._goal_param(params), decode_cursor(params.get('cursor')),
+                                               self._limit(params))
+        return {'items': [{'task_id': task_index, **task} for task_index, task in tasks],
+                'next_cursor': encode_cursor(cursor)}
+
+    def get_notes(self, params: Dict[str, str]) -> Dict[str, Any]:
+        notes, cursor = self.system.list_notes(decode_cursor(params.get('cursor')), self._limit(params),
+                                               self._task_param(params), params.get('bodies') in ("1", "true"))
+        return {'items': notes, 'next_cursor': encode_cursor(cursor)}
+
+    def get_note(self, params: Dict[str, str], note_id: str) -> Dict[str, Any]:
+        if note_id not in self.system.notes:
+            raise ApiError(404, "笔记不存在")
+        return {'note_id': note_id, **self.system.open_note(note_id)}
+
+    def get_reviews(self, params: Dict[str, str]) -> Dict[str, Any]:
+        date = params.get('date') or self.system.clock.now().strftime("%Y-%m-%d")
+        if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", date):
+            raise ApiError(400, "参数 date 应为 YYYY-MM-DD")
+        return {'date': date, 'items': self.system.get_review_queue(date)}
+
+    def get_weak_points(self, params: Dict[str, str]) -> Dict[str, Any]:
+        points, cursor = self.system.list_weak_points(decode_cursor(params.get('cursor')), self._limit(params),
+                                                      self._task_param(params))
+        return {'items': points, 'next_cursor': encode_cursor(cursor)}
+
+    def get_progress(self, params: Dict[str, str]) -> Dict[str, Any]:
+        goal_id = self._goal_param(params)
+        return {'goal': self.system.get_goal_progress(goal_id),
+                'modules': self.system.get_module_progress(goal_id)}
+
+    # ---------- 批量写入 ----------
+
+    @staticmethod
+    def _items(body: Any) -> List[Dict[str, Any]]:
+        items = body.get('items') if isinstance(body, dict) else None
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ApiError(400, "请求体应为 {\"items\": [...]}")
+        if len(items) > MAX_BATCH:
+            raise ApiError(413, f"单次最多写入 {MAX_BATCH} 条")
+        return items
+
+    def _apply_batch(self, items: List[Dict[str, Any]], apply: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+        """整批持锁并合并为一个写事务；单条失败不影响其他条目，结果按请求顺序返回。
+        其他异常时不返回逐条结果：接入共享状态库时整批回滚，否则出错前的条目已写入"""
+        results = []
+        try:
+            with self.system.batch():
+                for item in items:
+                    try:
+                        results.append({'ok': True, 'result': apply(item)})
+                    except QuotaExceededError as exc:
+                        results.append({'ok': False, 'status': 507, 'error': str(exc)})
+                    except ApiError as exc:
+                        results.append({'ok': False, 'status': exc.status, 'error': str(exc)})
+                    except (KeyError, TypeError, ValueError) as exc:
+                        results.append({'ok': False, 'status': 400, 'error': f"{type(exc).__name__}: {exc}"})
+        except Exception as exc:
+            outcome = "整批已回滚" if self.system.has_store() else f"此前的 {len(results)} 条已写入"
+            raise ApiError(500, f"写入失败，{outcome}：{type(exc).__name__}: {exc}") from exc
+        return {'results': results, 'written': sum(result['ok'] for result in results),
+                'version': self.system.state_tag()}
+
+    def _existing_task(self, item: Dict[str, Any]) -> int:
+        task_index = int(item['task_id'])
+        if task_index not in self.system.minimal_tasks:
+            raise ApiError(404, "任务不存在")
+        return task_index
+
+    def post_goal(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        if not isinstance(body, dict) or not isinstance(body.get('goal'), str) or not body['goal'].strip():
+            raise ApiError(400, "请求体应为 {\"goal\": \"...\", \"modules\": [...]}")
+        with self.system.batch():
+            self.system.set_learning_goal(body['goal'].strip())
+            if body.get('modules'):
+                self.system.break_down_modules([str(module) for module in body['modules']])
+            goal_id = self.system.current_goal_id
+        return {'goal_id': goal_id, 'version': self.system.state_tag()}
+
+    def post_tasks(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        return self._apply_batch(self._items(body), lambda item: {'task_id': self.system.add_task(
+            str(item['name']), str(item.get('description', "")), item.get('module'))})
+
+    def post_notes(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        system = self.system
+
+        def save(item: Dict[str, Any]) -> Dict[str, Any]:
+            note_id = item.get('note_id')
+            if note_id is None:
+                note_id, _ = system.start_study_session(self._existing_task(item))
+                # 同一分钟内的多条笔记追加序号，避免互相覆盖
+                base, n = note_id, 1
+                while note_id in system.notes:
+                    note_id, n = f"{base}_{n}", n + 1
+            elif note_id not in system.notes:
+                raise ApiError(404, "笔记不存在（新建笔记时不要传 note_id）")
+            system.save_note(note_id, str(item.get('main_notes', "")), str(item.get('key_questions', "")),
+                             str(item.get('summary', "")))
+            return {'note_id': note_id}
+
+        return self._apply_batch(self._items(body), save)
+
+    def post_practice(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        return self._apply_batch(self._items(body), lambda item: {'message': self.system.practice_testing(
+            self._existing_task(item), int(item['score']), str(item.get('weak_point', "")),
+            str(item.get('blind_spot', "")))})
+
+    def post_recalls(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        def record(item: Dict[str, Any]) -> Dict[str, Any]:
+            if not self.system.record_recall(str(item['note_id']), str(item['outcome'])):
+                raise ApiError(400, "笔记不存在或回忆结果无效")
+            return {}
+
+        return self._apply_batch(self._items(body), record)
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 长连接：每个响应都带 Content-Length，客户端可在同一连接上连续请求"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 响应头和响应体分两次写出，关闭 Nagle 避免与延迟确认叠加出 40ms 停顿
+    server_version = "StudyfastAPI/1.0"
+    api: StudyApi  # 由 make_server 设置
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        try:
+            body = self._read_body() if method == "POST" else None
+            if method == "GET":
+                etag = f'"{self.api.version()}"'
+                if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                    self._send(304, None, etag)
+                    return
+                payload = self.api.dispatch(method, url.path.rstrip("/"), parse_qs(url.query), None)
+                self._send(200, payload, etag)
+            else:
+                payload = self.api.dispatch(method, url.path.rstrip("/"), parse_qs(url.query), body)
+                self._send(200, payload, f'"{payload["version"]}"')
+        except ApiError as exc:
+            self._send(exc.status, {'error': str(exc)})
+        except QuotaExceededError as exc:
+            self._send(507, {'error': str(exc)})
+        except Exception as exc:  # 未预料的错误也返回 JSON，连接可继续使用
+            self._send(500, {'error': f"{type(exc).__name__}: {exc}"})
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ApiError(413, "请求体过大")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            raise ApiError(400, "请求体不是有效的 JSON")
+
+    def _send(self, status: int, payload: Optional[Dict[str, Any]], etag: Optional[str] = None):
+        data = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args):
+        pass  # 高频调用时不逐条打印访问日志
+
+
+def make_server(study_system, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    handler = type("BoundApiRequestHandler", (ApiRequestHandler,), {'api': StudyApi(study_system)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_api_server(study_system, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """在后台线程中启动接口服务（与页面共享同一个学习系统）"""
+    server = make_server(study_system, host, port)
+    threading.Thread(target=server.serve_forever, name="studyfast-api", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="深度学习系统本地 HTTP JSON 接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--state-db", help="共享状态库（SQLite）路径；不指定时数据只保存在本进程内存中")
+    args = parser.parse_args()
+
+    from app import DeepLearningSystem
+    from state_store import SQLiteStateStore
+    study_system = DeepLearningSystem()
+    if args.state_db:
+        study_system.attach_store(SQLiteStateStore(args.state_db))
+    server = make_server(study_system, args.host, args.port)
+    print(f"接口已启动：http://{args.host}:{args.port}/api/goals")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
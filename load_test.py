@@ -0,0 +1,264 @@
+"""并发用户压测：模拟 N 个学习者同时使用共享的学习系统，统计吞吐量和延迟
+
+用法：
+    python3 load_test.py --users 1,4,16,64 --rounds 5
+    python3 load_test.py --users 1,4,16 --shared-store
+    python3 load_test.py --mode apptest --users 1,2,4 --rounds 2
+"""
+import argparse
+import concurrent.futures
+import os
+import tempfile
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Tuple
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    """线程安全地收集每一步的耗时和错误"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []  # 秒
+        self.errors = []  # (步骤名, 异常描述)
+    
+    def timed(self, step: str, action: Callable[[], object]):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as exc:
+            with self._lock:
+                self.errors.append((step, f"{type(exc).__name__}: {exc}"))
+            return
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(elapsed)
+
+
+def direct_user_flow(study_system, user_id: int, rounds: int, recorder: Recorder, next_day: threading.Barrier):
+    """直接调用学习系统：每一步对应页面一次提交及随后渲染时读取的数据；
+    所有用户共用学习系统的手动时钟，晨间复习前在 next_day 屏障处会合，由屏障把时钟拨到第二天（每轮只拨一次），
+    使前一晚安排的复习到期"""
+    clock = study_system.clock
+    goal = f"压测目标{user_id}"
+    modules = [f"模块{user_id}-{i}" for i in range(3)]
+    task_ids = []
+    
+    def setup_goal():
+        # 拆解模块和创建任务都作用于“当前目标”，整体放在一个批次中，不与其他用户切换目标交错
+        with study_system.batch():
+            study_system.set_learning_goal(goal)
+            study_system.break_down_modules(modules)
+            study_system.create_minimal_tasks([
+                {"name": f"学习{module}", "description": f"掌握{module}的核心概念和应用方法", "module": module}
+                for module in modules
+            ])
+            task_ids.extend(task_index for task_index, _ in study_system.get_goal_tasks())
+        study_system.get_goal_progress()
+        study_system.get_next_actions()
+    
+    recorder.timed("设定学习目标", setup_goal)
+    
+    for round_index in range(rounds):
+        task_index = task_ids[round_index % len(task_ids)]
+        note_id = f"note_{task_index}_u{user_id}r{round_index}"
+        
+        def study():
+            study_system.start_study_session(task_index)
+            study_system.save_note(note_id, f"第{round_index}轮主笔记：变量、类型转换与作用域",
+                                   "什么是变量？\n如何转换类型？", "")
+            study_system.get_goal_progress()
+        
+        def summarize():
+            study_system.review_and_summarize(note_id, f"第{round_index}轮总结")
+            study_system.get_notes()
+        
+        def evening():
+            today = clock.now().strftime("%Y-%m-%d")
+            study_system.get_review_queue(today)
+            study_system.evening_review({note_id: "部分回忆"}, {note_id: "类型转换"})
+            study_system.get_recall_counts(days=7)
+        
+        def morning():
+            study_system.get_review_queue(clock.now().strftime("%Y-%m-%d"))
+            study_system.morning_review()
+        
+        def practice():
+            study_system.practice_testing(task_index, 60 + round_index % 40, "类型转换不熟练", "不会用 int()")
+            study_system.get_recurring_weak_points()
+        
+        for step, action in (("学习会话", study), ("完善总结", summarize), ("睡前复习", evening),
+                             ("晨间复习", morning), ("实战检验", practice)):
+            if action is morning:
+                next_day.wait()
+            recorder.timed(step, action)
+
+
+def apptest_user_flow(user_id: int, rounds: int, recorder: Recorder):
+    """通过 Streamlit AppTest 驱动 modern_ui.py 页面（AppTest 不是线程安全的，每个用户在独立进程中运行）"""
+    from streamlit.testing.v1 import AppTest
+    
+    at = AppTest.from_file(os.path.join(APP_DIR, "modern_ui.py"), default_timeout=60)
+    
+    def run(action: Callable[[], object]):
+        action()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    
+    def go(page: str):
+        run(lambda: at.sidebar.radio(key="nav_page").set_value(page).run())
+    
+    def click(label: str):
+        button = next(b for b in at.button if label in str(b.label))
+        run(lambda: button.click().run())
+    
+    def fill(label: str, value: str):
+        next(t for t in at.text_input if str(t.label).startswith(label)).set_value(value)
+    
+    recorder.timed("首次加载", lambda: run(at.run))
+    
+    def setup_goal():
+        go("🎯 设定学习目标")
+        at.text_input[0].set_value(f"压测目标{user_id}")
+        click("设定目标")
+    
+    recorder.timed("设定学习目标", setup_goal)
+    for round_index in range(rounds):
+        def study():
+            go("⏰ 开始学习会话")
+            at.text_area[0].set_value(f"第{round_index}轮主笔记：变量、类型转换与作用域")
+            at.text_area[1].set_value("什么是变量？\n如何转换类型？")
+            click("完成学习会话")
+        
+        def summarize():
+            go("📋 完善笔记总结")
+            at.text_area[0].set_value(f"第{round_index}轮总结")
+            click("保存总结")
+        
+        def evening():
+            go("🌙 睡前复习")
+            if any("完成睡前复习" in str(b.label) for b in at.button):
+                click("完成睡前复习")
+        
+        def morning():
+            go("🌅 晨间复习")
+            if any("完成所有晨间复习" in str(b.label) for b in at.button):
+                click("完成所有晨间复习")
+        
+        def practice():
+            go("📝 实战检验")
+            at.number_input[0].set_value(60)
+            run(at.run)
+            fill("具体薄弱环节", "类型转换不熟练")
+            fill("理解盲区", "不会用 int()")
+            click("记录薄弱点")
+        
+        for step, action in (("学习会话", study), ("完善总结", summarize), ("睡前复习", evening),
+                             ("晨间复习", morning), ("实战检验", practice)):
+            recorder.timed(step, action)
+
+
+def apptest_user_process(user_id: int, rounds: int, state_db: str) -> Tuple[List[float], List[Tuple[str, str]]]:
+    """AppTest 用户进程：通过共享状态库与其他用户进程共享学习状态，返回 (耗时列表, 错误列表)"""
+    os.environ["STUDYFAST_STATE_DB"] = state_db
+    os.environ["STUDYFAST_JOB_WORKERS"] = "0"
+    recorder = Recorder()
+    try:
+        apptest_user_flow(user_id, rounds, recorder)
+    except Exception:
+        recorder.errors.append(("用户流程", traceback.format_exc(limit=1).strip()))
+    return recorder.latencies, recorder.errors
+
+
+def run_level(mode: str, users: int, rounds: int, shared_store: bool = False) -> Dict[str, float]:
+    """以 users 个并发用户运行一轮压测，返回统计结果；
+    direct 模式下用户是共享同一个学习系统的线程，apptest 模式下用户是共享状态库的进程"""
+    recorder = Recorder()
+    state_db = os.path.join(tempfile.mkdtemp(prefix="studyfast_load_"), "state.db")
+    study_system = None
+    if mode == "direct":
+        from app import DeepLearningSystem
+        from clock import ManualClock
+        from state_store import SQLiteStateStore
+        study_system = DeepLearningSystem(clock=ManualClock())
+        if shared_store:
+            study_system.attach_store(SQLiteStateStore(state_db))
+    
+    start = time.perf_counter()
+    if mode == "direct":
+        next_day = threading.Barrier(users, action=lambda: study_system.clock.advance(days=1))
+        
+        def user(user_id: int):
+            try:
+                direct_user_flow(study_system, user_id, rounds, recorder, next_day)
+            except BaseException:
+                next_day.abort()  # 一个用户中途退出时其他用户不再等待
+                raise
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=users) as pool:
+            futures = [pool.submit(user, i) for i in range(users)]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    recorder.errors.append(("用户流程", traceback.format_exc(limit=1).strip()))
+    else:
+        from weekly_report import make_pool
+        with make_pool(users) as pool:
+            futures = [pool.submit(apptest_user_process, i, rounds, state_db) for i in range(users)]
+            for future in futures:
+                try:
+                    latencies, errors = future.result()
+                except Exception:
+                    recorder.errors.append(("用户进程", traceback.format_exc(limit=1).strip()))
+                    continue
+                recorder.latencies.extend(latencies)
+                recorder.errors.extend(errors)
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(recorder.latencies)
+    return {
+        'users': users,
+        'steps': len(latencies),
+        'errors': len(recorder.errors),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'error_samples': recorder.errors[:3]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="深度学习系统并发用户压测")
+    parser.add_argument("--mode", choices=["direct", "apptest"], default="direct",
+                        help="direct：多个线程直接调用共享的学习系统；"
+                             "apptest：每个用户一个进程，用 Streamlit AppTest 驱动 modern_ui.py")
+    parser.add_argument("--users", default="1,2,4,8,16,32", help="逐级增加的并发用户数，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=5, help="每个用户重复学习循环的轮数")
+    parser.add_argument("--shared-store", action="store_true",
+                        help="direct 模式下接入临时的共享状态库（SQLite），测量多进程部署的写入开销")
+    args = parser.parse_args()
+    
+    print(f"{'并发用户':>8} {'步骤数':>8} {'错误':>6} {'吞吐(步/秒)':>12} {'p50(ms)':>10} {'p99(ms)':>10}")
+    for users in [int(n) for n in args.users.split(",") if n.strip()]:
+        result = run_level(args.mode, users, args.rounds, args.shared_store)
+        print(f"{result['users']:>8} {result['steps']:>8} {result['errors']:>6} "
+              f"{result['throughput']:>12.1f} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f}")
+        for step, error in result['error_samples']:
+            print(f"    ❌ {step}: {error}")
+
+
+if __name__ == "__main__":
+    main()
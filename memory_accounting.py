@@ -0,0 +1,73 @@
+import sys
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+MEMORY_CATEGORIES = ("notes", "sessions", "weak_points", "reviews")  # 计入工作区占用的数据类别
+
+
+class QuotaExceededError(RuntimeError):
+    """工作区占用超过硬配额时拒绝写入"""
+
+
+def deep_sizeof(obj: Any) -> int:
+    """对象及其包含的 dict/list/tuple/set 和字符串的总字节数（同一对象只计一次；
+    dict 的键是各记录共享的字段名，不计入）"""
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+
+class MemoryLedger:
+    """按工作区汇总的内存占用账本：记录每条数据的字节数，数据变化时只重算该条"""
+
+    def __init__(self):
+        self._records: Dict[Tuple[str, Hashable], Tuple[Optional[str], int]] = {}  # (类别, 键) -> (工作区, 字节数)
+        self._usage: Dict[Optional[str], Dict[str, List[int]]] = {}  # 工作区 -> 类别 -> [字节数, 条数]
+
+    def set(self, category: str, key: Hashable, workspace: Optional[str], size: int):
+        """登记或更新一条数据的占用"""
+        self.discard(category, key)
+        self._records[(category, key)] = (workspace, size)
+        usage = self._usage.setdefault(workspace, {name: [0, 0] for name in MEMORY_CATEGORIES})
+        usage[category][0] += size
+        usage[category][1] += 1
+
+    def discard(self, category: str, key: Hashable):
+        old = self._records.pop((category, key), None)
+        if old is None:
+            return
+        workspace, size = old
+        usage = self._usage[workspace]
+        usage[category][0] -= size
+        usage[category][1] -= 1
+        if not any(count for _, count in usage.values()):
+            del self._usage[workspace]
+
+    def total(self, workspace: Optional[str]) -> int:
+        usage = self._usage.get(workspace)
+        return sum(size for size, _ in usage.values()) if usage else 0
+
+    def usage(self, workspace: Optional[str]) -> Dict[str, Any]:
+        """工作区各类数据的字节数和条数"""
+        usage = self._usage.get(workspace) or {name: [0, 0] for name in MEMORY_CATEGORIES}
+        return {'workspace': workspace, 'total_bytes': sum(size for size, _ in usage.values()),
+                **{f"{name}_bytes": size for name, (size, _) in usage.items()},
+                **{f"{name}_count": count for name, (_, count) in usage.items()}}
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """占用最多的 n 个工作区"""
+        workspaces = sorted(self._usage, key=self.total, reverse=True)[:n]
+        return [self.usage(workspace) for workspace in workspaces]
+
+    def workspaces(self) -> List[Optional[str]]:
+        return list(self._usage)
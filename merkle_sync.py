@@ -0,0 +1,196 @@
+"""两个学习状态之间的增量同步：按 Merkle 树逐层比较，只交换有差异的子树
+
+用法：
+    python3 merkle_sync.py laptop.db server.db
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+SYNC_COLLECTIONS = ("notes", "sessions", "weak_points", "reviews")  # 同步的数据类别（按依赖顺序）
+HEX_DIGITS = "0123456789abcdef"
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """记录的叶子摘要（与字段顺序无关）"""
+    return hashlib.sha1(json.dumps(record, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class MerkleTree:
+    """按键摘要前缀分桶的 16 叉 Merkle 树：叶子为 键 -> 记录摘要，修改时只让所在路径上的节点失效"""
+
+    def __init__(self, depth: int = 3):
+        self.depth = depth  # 叶子桶前缀长度（16^depth 个桶）
+        self._buckets: Dict[str, Dict[str, str]] = {}  # 桶前缀 -> {键: 记录摘要}
+        self._node_hashes: Dict[str, str] = {}  # 前缀 -> 子树摘要缓存
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def _bucket_prefix(self, key: str) -> str:
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:self.depth]
+
+    def _invalidate(self, prefix: str):
+        for i in range(self.depth + 1):
+            self._node_hashes.pop(prefix[:i], None)
+
+    def set(self, key: str, leaf_hash: str):
+        prefix = self._bucket_prefix(key)
+        bucket = self._buckets.setdefault(prefix, {})
+        if bucket.get(key) != leaf_hash:
+            bucket[key] = leaf_hash
+            self._invalidate(prefix)
+
+    def discard(self, key: str):
+        prefix = self._bucket_prefix(key)
+        bucket = self._buckets.get(prefix)
+        if bucket is not None and key in bucket:
+            del bucket[key]
+            if not bucket:
+                del self._buckets[prefix]
+            self._invalidate(prefix)
+
+    def node_hash(self, prefix: str = "") -> str:
+        """子树摘要，空子树为空字符串"""
+        cached = self._node_hashes.get(prefix)
+        if cached is not None:
+            return cached
+        if len(prefix) == self.depth:
+            bucket = self._buckets.get(prefix)
+            parts = [f"{key}\0{leaf}" for key, leaf in sorted(bucket.items())] if bucket else []
+        else:
+            parts = [f"{digit}\0{child}" for digit in HEX_DIGITS
+                     for child in (self.node_hash(prefix + digit),) if child]
+        result = hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest() if parts else ""
+        self._node_hashes[prefix] = result
+        return result
+
+    def children(self, prefix: str) -> Dict[str, str]:
+        """非空子节点的摘要：子前缀 -> 摘要"""
+        return {prefix + digit: child for digit in HEX_DIGITS
+                for child in (self.node_hash(prefix + digit),) if child}
+
+    def leaves(self, prefix: str) -> Dict[str, str]:
+        """叶子桶内的 键 -> 记录摘要"""
+        return dict(self._buckets.get(prefix, {}))
+
+    def all_leaves(self) -> Dict[str, str]:
+        """全部 键 -> 记录摘要（随快照持久化）"""
+        return {key: leaf for bucket in self._buckets.values() for key, leaf in bucket.items()}
+
+    @classmethod
+    def from_leaves(cls, leaves: Dict[str, str], depth: int = 3) -> "MerkleTree":
+        """由持久化的叶子摘要重建（只需按键分桶，不必重新计算记录摘要）"""
+        tree = cls(depth)
+        for key, leaf in leaves.items():
+            tree._buckets.setdefault(tree._bucket_prefix(key), {})[key] = leaf
+        return tree
+
+
+def record_version(collection: str, record: Dict[str, Any]) -> Tuple[str, str]:
+    """冲突时比较的版本：删除标记（已删除的记录、已移除的复习计划）优先于仍存在的记录；笔记取最后修改时间"""
+    if 'deleted_at' in record:
+        return ("1", record['deleted_at'])
+    if collection == "notes":
+        return ("", record.get('updated_at') or record['created_at'])
+    return ("", "")
+
+
+def _diff_keys(local, remote, collection: str, stats: Dict[str, int]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """自顶向下比较两棵树，返回 (键, 本地摘要, 远端摘要) 中有差异的叶子"""
+    diffs = []
+    pending = [""]
+    depth = local.merkle_depth()
+    while pending:
+        prefix = pending.pop()
+        stats['nodes_compared'] += 1
+        if len(prefix) == depth:
+            local_leaves = local.merkle_leaves(collection, prefix)
+            remote_leaves = remote.merkle_leaves(collection, prefix)
+            for key in local_leaves.keys() | remote_leaves.keys():
+                if local_leaves.get(key) != remote_leaves.get(key):
+                    diffs.append((key, local_leaves.get(key), remote_leaves.get(key)))
+            continue
+        local_children = local.merkle_children(collection, prefix)
+        remote_children = remote.merkle_children(collection, prefix)
+        pending.extend(child for child in local_children.keys() | remote_children.keys()
+                       if local_children.get(child) != remote_children.get(child))
+    return diffs
+
+
+def sync_systems(local, remote) -> Dict[str, int]:
+    """双向同步两个 DeepLearningSystem：只比较、传输有差异的子树；
+    同一键两边不同时按 (版本, 记录摘要) 取较大者，两边结果一致"""
+    stats = {'nodes_compared': 0, 'sent_to_local': 0, 'sent_to_remote': 0, 'conflicts': 0}
+    if local.merkle_depth() != remote.merkle_depth():
+        raise ValueError("两边的 Merkle 树深度不一致")
+    for collection in SYNC_COLLECTIONS:
+        stats['nodes_compared'] += 1
+        if local.merkle_root(collection) == remote.merkle_root(collection):
+            continue
+        diffs = _diff_keys(local, remote, collection, stats)
+        if not diffs:
+            continue
+        keys = [key for key, _, _ in diffs]
+        local_records = local.export_sync_records(collection, keys)
+        remote_records = remote.export_sync_records(collection, keys)
+        to_local, to_remote = {}, {}
+        for key, local_hash, remote_hash in diffs:
+            if local_hash is None:
+                to_local[key] = remote_records[key]
+            elif remote_hash is None:
+                to_remote[key] = local_records[key]
+            else:
+                stats['conflicts'] += 1
+                local_rank = (record_version(collection, local_records[key]), local_hash)
+                remote_rank = (record_version(collection, remote_records[key]), remote_hash)
+                if local_rank > remote_rank:
+                    to_remote[key] = local_records[key]
+                else:
+                    to_local[key] = remote_records[key]
+        if to_local:
+            local.apply_sync_records(collection, to_local)
+        if to_remote:
+            remote.apply_sync_records(collection, to_remote)
+        stats['sent_to_local'] += len(to_local)
+        stats['sent_to_remote'] += len(to_remote)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量同步两个共享状态库（SQLite）")
+    parser.add_argument("local", help="本地状态库路径")
+    parser.add_argument("remote", help="另一端状态库路径")
+    args = parser.parse_args()
+
+    from app import DeepLearningSystem
+    from state_store import SQLiteStateStore
+    start = time.perf_counter()
+    local_store, remote_store = SQLiteStateStore(args.local), SQLiteStateStore(args.remote)
+    local_peer, remote_peer = os.path.abspath(args.local), os.path.abspath(args.remote)
+    # 两边自上次同步以来都没有新的操作时，不必载入状态
+    if local_store.peer_seqs(remote_peer) == (local_store.latest_seq(), remote_store.latest_seq()):
+        print("自上次同步以来两边都没有新的修改")
+        return
+    # 载入快照时直接采用随快照保存的 Merkle 叶子，只重新计算快照之后修改过的记录
+    local = DeepLearningSystem().attach_store(local_store)
+    remote = DeepLearningSystem().attach_store(remote_store)
+    local_seq, remote_seq = local_store.latest_seq(), remote_store.latest_seq()
+    loaded = time.perf_counter()
+    stats = sync_systems(local, remote)
+    # 同步期间只有本次写入的操作时，两边此刻一致，记下变更序号；否则下次重新比较
+    if all(method == "apply_sync_records" for store, seq in ((local_store, local_seq), (remote_store, remote_seq))
+           for _, method, _, _, _ in store.read_ops(seq)):
+        local_seq, remote_seq = local_store.latest_seq(), remote_store.latest_seq()
+    local_store.set_peer_seqs(remote_peer, local_seq, remote_seq)
+    remote_store.set_peer_seqs(local_peer, remote_seq, local_seq)
+    print(f"比较 {stats['nodes_compared']} 个节点，向本地写入 {stats['sent_to_local']} 条、"
+          f"向远端写入 {stats['sent_to_remote']} 条，解决冲突 {stats['conflicts']} 条；"
+          f"载入 {loaded - start:.2f} 秒，同步 {time.perf_counter() - loaded:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,166 @@
 import streamlit as st
+import io
 import json
 import datetime
+import random
 from typing import Dict, List, Any, Optional, Tuple, Union
 
 # 导入深度学习系统类
 # 由于在同一目录下，直接导入
-from app import DeepLearningSystem
+from app import get_study_system, render_note_page, render_note_picker, render_task_picker
+from deck_import import import_deck
+from memory_accounting import MEMORY_CATEGORIES, QuotaExceededError
+from weekly_report import make_pool, submit_report
+
+# 遗忘趋势：最近回忆结果统计 + 遗忘曲线
+def render_retention_trend(study_system):
+    recall_counts = study_system.get_cached_stats('recall_counts_7d')
+    if not sum(recall_counts.values()):
+        return
+    st.subheader("📉 遗忘趋势")
+    col1, col2, col3 = st.columns(3)
+    for col, (outcome, count) in zip((col1, col2, col3), recall_counts.items()):
+        with col:
+            st.metric(f"最近 7 天{outcome}", count)
+    curve = study_system.get_retention_curve(max_age=14)
+    st.line_chart({"平均记忆保持率": curve})
+    st.caption("横轴为距笔记创建的天数，纵轴为该天复习时的平均记忆保持率")
+
+# 自动刷新间隔（秒）：只检查状态版本号，数据有变化时才刷新
+LIVE_UPDATE_SECONDS = 2
+
+# “查看所有笔记”页正文预览的字数
+NOTE_PREVIEW_CHARS = 120
+
+# 闪卡练习每评多少张卡片提交一次回忆结果
+DRILL_BATCH_SIZE = 10
+
+# 生成周报的进程数
+REPORT_WORKERS = 2
 
-# 初始化系统
 @st.cache_resource
-def get_study_system():
-    return DeepLearningSystem()
+def get_report_pool():
+    return make_pool(REPORT_WORKERS)
+
+# 周报在进程池中生成，这里只轮询结果
+@st.fragment(run_every=LIVE_UPDATE_SECONDS)
+def render_weekly_report():
+    future = st.session_state.get("weekly_report")
+    if future is None:
+        return
+    if not future.done():
+        st.info("⏳ 周报生成中，可以继续使用其他页面")
+        return
+    try:
+        report, page = future.result()
+    except Exception as exc:
+        st.error(f"周报生成失败：{exc}")
+        return
+    totals = report['totals']
+    st.caption(f"{report['week_start']} ~ {report['week_end']} · 学习 {totals['minutes']} 分钟 · "
+               f"新笔记 {totals['notes']} 条（完成总结 {totals['summaries']} 条） · "
+               f"新增薄弱点 {totals['weak_points']} 个")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ 下载 HTML 周报", page, file_name=f"weekly-{report['week_start']}.html",
+                           mime="text/html")
+    with col2:
+        st.download_button("⬇️ 下载 JSON 数据", json.dumps(report, ensure_ascii=False, indent=2),
+                           file_name=f"weekly-{report['week_start']}.json", mime="application/json")
+
+# 各页面依赖的数据类别，这些数据变化时自动刷新页面；
+# 含输入表单的页面不自动刷新，避免打断正在填写的内容
+PAGE_DEPENDENCIES = {
+    "📚 创建学习任务": ("tasks",),
+    "🌅 晨间复习": ("reviews", "recalls"),
+    "❌ 查看薄弱点": ("weak_points",),
+    "📖 查看所有笔记": ("notes", "tasks"),
+    "📅 学习热力图": ("notes", "sessions", "weak_points"),
+    "📊 学习分析": ("sessions",),
+    "🗄️ 内存占用": ("notes", "sessions", "weak_points", "reviews")
+}
+
+# 自动刷新的片段只在依赖的数据类别变化（或跨天）时重新计算，其余时候直接显示上次的结果
+def live_data(key, kinds, compute):
+    study_system = get_study_system()
+    study_system.sync()
+    version = study_system.version
+    today = study_system.clock.now().date()
+    cached = st.session_state.get(key)
+    if cached is not None and cached[1] == today and study_system.changes_since(cached[0], kinds) == []:
+        st.session_state[key] = (version, today, cached[2])
+        return cached[2]
+    data = compute(study_system)
+    st.session_state[key] = (version, today, data)
+    return data
+
+# 顶部统计卡片
+@st.fragment(run_every=LIVE_UPDATE_SECONDS)
+def render_stats_cards():
+    stats = live_data("stats_cards", ("tasks", "notes", "weak_points"), lambda study_system: {
+        'tasks': len(study_system.minimal_tasks),
+        'notes': len(study_system.notes),
+        'weak_points': len(study_system.weak_points),
+        'today_notes': len(study_system.get_today_notes())
+    })
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(f'''
+        <div class="stats-card">
+            <div class="stats-number">{stats['tasks']}</div>
+            <div class="stats-label">学习任务</div>
+        </div>
+        ''', unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f'''
+        <div class="stats-card">
+            <div class="stats-number">{stats['notes']}</div>
+            <div class="stats-label">学习笔记</div>
+        </div>
+        ''', unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown(f'''
+        <div class="stats-card">
+            <div class="stats-number">{stats['weak_points']}</div>
+            <div class="stats-label">薄弱点</div>
+        </div>
+        ''', unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown(f'''
+        <div class="stats-card">
+            <div class="stats-number">{stats['today_notes']}</div>
+            <div class="stats-label">今日笔记</div>
+        </div>
+        ''', unsafe_allow_html=True)
+
+# 侧边栏学习进度
+@st.fragment(run_every=LIVE_UPDATE_SECONDS)
+def render_goal_progress():
+    # 进度条（由增量汇总的目标进度直接读取）
+    goal_progress = live_data("goal_progress", ("goals", "tasks", "notes", "weak_points", "progress"),
+                              lambda study_system: study_system.get_goal_progress())
+    
+    st.subheader("📈 学习进度")
+    st.progress(goal_progress['ratio'])
+    st.caption(f"已完成 {goal_progress['completed']}/{goal_progress['tasks']} 个任务")
+    if goal_progress['avg_score'] is not None:
+        st.caption(f"实战平均得分 {goal_progress['avg_score']:.1f}")
+
+# 订阅变更流：当前页面依赖的数据变化时刷新整个页面
+@st.fragment(run_every=LIVE_UPDATE_SECONDS)
+def watch_page_changes(page):
+    study_system = get_study_system()
+    study_system.sync()
+    if page in PAGE_DEPENDENCIES:
+        changes = study_system.changes_since(st.session_state.get("page_version", 0), PAGE_DEPENDENCIES[page])
+        if changes is None or changes:
+            st.rerun()
+    st.session_state["page_version"] = study_system.version
+    st.caption(f"🟢 实时同步中 · 数据版本 {study_system.version}")
 
 # 现代化UI主函数
 def modern_ui():
@@ -125,50 +275,37 @@ def modern_ui():
         color: #6c757d;
         margin-top: 0.5rem;
     }
+    
+    .heatmap {
+        display: grid;
+        grid-template-rows: repeat(7, 12px);
+        grid-auto-flow: column;
+        grid-auto-columns: 12px;
+        gap: 3px;
+        margin: 1rem 0;
+    }
+    
+    .heatmap-cell {
+        border-radius: 2px;
+        background: #ebedf0;
+    }
+    
+    .heatmap-l1 { background: #c6e48b; }
+    .heatmap-l2 { background: #7bc96f; }
+    .heatmap-l3 { background: #239a3b; }
+    .heatmap-l4 { background: #196127; }
     </style>
     """, unsafe_allow_html=True)
     
-    # 初始化系统
+    # 初始化系统（接入共享状态库时先拉取其他进程的修改）
     study_system = get_study_system()
+    study_system.sync()
     
     # 主标题
     st.markdown('<div class="main-header"><h1>🎯 目标导向的深度学习循环系统</h1></div>', unsafe_allow_html=True)
     
-    # 顶部统计卡片
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown(f'''
-        <div class="stats-card">
-            <div class="stats-number">{len(study_system.minimal_tasks)}</div>
-            <div class="stats-label">学习任务</div>
-        </div>
-        ''', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f'''
-        <div class="stats-card">
-            <div class="stats-number">{len(study_system.notes)}</div>
-            <div class="stats-label">学习笔记</div>
-        </div>
-        ''', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f'''
-        <div class="stats-card">
-            <div class="stats-number">{len(study_system.weak_points)}</div>
-            <div class="stats-label">薄弱点</div>
-        </div>
-        ''', unsafe_allow_html=True)
-    
-    with col4:
-        today_notes = study_system._get_today_notes()
-        st.markdown(f'''
-        <div class="stats-card">
-            <div class="stats-number">{len(today_notes)}</div>
-            <div class="stats-label">今日笔记</div>
-        </div>
-        ''', unsafe_allow_html=True)
+    # 顶部统计卡片（数据变化时单独刷新）
+    render_stats_cards()
     
     # 侧边栏导航
     with st.sidebar:
@@ -177,35 +314,52 @@ def modern_ui():
         # 学习目标显示
         if study_system.current_goal:
             st.subheader("🎯 当前目标")
+            if len(study_system.goals) > 1:
+                goal_ids = list(study_system.goals)
+                selected_goal = st.selectbox("切换学习目标", goal_ids,
+                                           index=goal_ids.index(study_system.current_goal_id),
+                                           format_func=lambda gid: study_system.goals[gid]['goal'])
+                if selected_goal != study_system.current_goal_id:
+                    study_system.switch_goal(selected_goal)
+                    st.rerun()
             st.info(study_system.current_goal)
-            
-            # 进度条
-            total_tasks = len(study_system.minimal_tasks)
-            completed_tasks = len([note for note in study_system.notes.values() 
-                                 if note['task_id'] < len(study_system.minimal_tasks)])
-            progress = completed_tasks / total_tasks if total_tasks > 0 else 0
-            
-            st.subheader("📈 学习进度")
-            st.progress(progress)
-            st.caption(f"已完成 {completed_tasks}/{total_tasks} 个任务")
+            render_goal_progress()
+        
+        # 下一步行动建议（点击直接跳转到对应页面）
+        next_actions = study_system.get_next_actions()
+        if next_actions:
+            st.subheader("👉 下一步")
+            action_pages = {
+                'review': "🌅 晨间复习",
+                'practice': "📝 实战检验",
+                'study': "⏰ 开始学习会话",
+                'summarize': "📋 完善笔记总结"
+            }
+            for i, action in enumerate(next_actions):
+                st.button(action['label'], key=f"next_action_{i}", help=action['detail'],
+                          on_click=st.session_state.update, kwargs={'nav_page': action_pages[action['kind']]})
         
         # 导航菜单
         page = st.radio("选择功能", [
             "🎯 设定学习目标",
             "📚 创建学习任务",
+            "📥 导入题库",
             "⏰ 开始学习会话",
             "📋 完善笔记总结",
             "🌙 睡前复习",
             "🌅 晨间复习",
+            "🃏 闪卡练习",
             "📝 实战检验",
             "❌ 查看薄弱点",
-            "📖 查看所有笔记"
-        ])
+            "📖 查看所有笔记",
+            "📅 学习热力图",
+            "📊 学习分析",
+            "🗄️ 内存占用"
+        ], key="nav_page")
         
-        # 快速操作
-        st.subheader("⚡ 快速操作")
-        if st.button("刷新页面"):
-            st.rerun()
+        # 实时同步：页面依赖的数据变化时自动刷新
+        st.session_state["page_version"] = study_system.version
+        watch_page_changes(page)
     
     # 页面内容
     if page == "🎯 设定学习目标":
@@ -236,13 +390,32 @@ def modern_ui():
                     for module in module_list:
                         tasks.append({
                             "name": f"学习{module}",
-                            "description": f"掌握{module}的核心概念和应用方法"
+                            "description": f"掌握{module}的核心概念和应用方法",
+                            "module": module
                         })
                     study_system.create_minimal_tasks(tasks)
                     st.success("🤖 已自动生成学习任务")
                     st.rerun()
                 else:
                     st.warning("⚠️ 请填写学习目标和知识模块")
+        
+        # 所有目标的进度总览
+        goals, _ = study_system.list_goals()
+        if goals:
+            st.subheader("📊 所有目标进度")
+            for goal_info in goals:
+                goal_progress = study_system.get_goal_progress(goal_info['goal_id'])
+                avg_score = goal_progress['avg_score']
+                st.markdown(f"**{goal_info['goal']}**")
+                st.progress(goal_progress['ratio'])
+                st.caption(f"已完成 {goal_progress['completed']}/{goal_progress['tasks']} 个任务 · "
+                           f"笔记 {goal_progress['notes']} 条 · "
+                           f"平均得分 {f'{avg_score:.1f}' if avg_score is not None else '暂无'}")
+                module_progress = study_system.get_module_progress(goal_info['goal_id'])
+                if module_progress:
+                    with st.expander("查看模块进度"):
+                        for module, stats in module_progress.items():
+                            st.caption(f"📚 {module}：已完成 {stats['completed']}/{stats['tasks']} 个任务")
     
     elif page == "📚 创建学习任务":
         st.header("📚 创建学习任务")
@@ -257,41 +430,59 @@ def modern_ui():
             
             if submitted:
                 if task_name and task_description:
-                    study_system.minimal_tasks.append({
-                        "name": task_name,
-                        "description": task_description
-                    })
+                    study_system.add_task(task_name, task_description)
                     st.success(f"✅ 已添加任务：{task_name}")
                     st.rerun()
                 else:
                     st.warning("⚠️ 请填写任务名称和描述")
         
         # 显示现有任务
-        if study_system.minimal_tasks:
+        goal_tasks = study_system.get_goal_tasks()
+        if goal_tasks:
             st.subheader("📋 现有任务列表")
-            for i, task in enumerate(study_system.minimal_tasks):
+            task_ids = [task_index for task_index, _ in goal_tasks]
+            for position, (task_index, task) in enumerate(goal_tasks):
                 st.markdown(f'''
                 <div class="feature-card">
-                    <h4>📝 任务 {i+1}: {task['name']}</h4>
+                    <h4>📝 任务 {position + 1}: {task['name']}</h4>
                     <p>{task['description']}</p>
                 </div>
                 ''', unsafe_allow_html=True)
+                with st.expander("查看任务详情"):
+                    note_ids = study_system.get_task_notes(task_index)
+                    sessions = study_system.get_task_sessions(task_index)
+                    weak_points = study_system.get_task_weak_points(task_index)
+                    st.caption(f"笔记 {len(note_ids)} 条 · 学习会话 {len(sessions)} 次 · 薄弱点 {len(weak_points)} 个")
+                    for note_id in note_ids[-5:]:
+                        st.markdown(f"- 📘 {note_id}（{study_system.notes[note_id]['created_at'][:10]}）")
+                    for point in weak_points[-3:]:
+                        st.markdown(f"- ❌ {point['weak_point'] or '未填写'}（{point['practice_score']} 分）")
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        if st.button("⬆️ 上移", key=f"task_up_{task_index}", disabled=position == 0):
+                            task_ids[position - 1:position + 1] = [task_index, task_ids[position - 1]]
+                            study_system.reorder_tasks(task_ids)
+                            st.rerun()
+                    with col2:
+                        if st.button("⬇️ 下移", key=f"task_down_{task_index}", disabled=position == len(task_ids) - 1):
+                            task_ids[position:position + 2] = [task_ids[position + 1], task_index]
+                            study_system.reorder_tasks(task_ids)
+                            st.rerun()
+                    with col3:
+                        confirmed = st.checkbox("确认删除", key=f"task_delete_confirm_{task_index}",
+                                                help="同时删除该任务的笔记、学习会话和薄弱点")
+                        if st.button("🗑️ 删除任务", key=f"task_delete_{task_index}", disabled=not confirmed):
+                            study_system.delete_task(task_index)
+                            st.rerun()
     
     elif page == "⏰ 开始学习会话":
         st.header("⏰ 开始学习会话")
         
-        if not study_system.minimal_tasks:
-            st.warning("⚠️ 请先创建学习任务")
-            return
-        
-        # 选择任务
-        task_options = [f"{i+1}. {task['name']}" for i, task in enumerate(study_system.minimal_tasks)]
-        
-        selected_task = st.selectbox("选择要学习的任务", task_options,
-                                   help="选择您要开始学习的任务")
+        # 选择任务（仅检索当前目标下的任务）
+        task_index = render_task_picker(study_system, "选择要学习的任务", "session_task", "⚠️ 请先创建学习任务",
+                                        help="选择您要开始学习的任务")
         
-        if selected_task:
-            task_index = int(selected_task.split('.')[0]) - 1
+        if task_index is not None:
             
             # 显示任务详情
             task = study_system.minimal_tasks[task_index]
@@ -325,31 +516,48 @@ def modern_ui():
                     if main_notes and key_questions:
                         note_id, task_name_or_error = study_system.start_study_session(task_index)
                         if note_id is not None:
-                            study_system.save_note(note_id, main_notes, key_questions, "")
-                            st.success(f"🎉 学习会话完成！笔记已保存，ID: {note_id}")
-                            st.rerun()
+                            try:
+                                study_system.save_note(note_id, main_notes, key_questions, "")
+                            except QuotaExceededError as exc:
+                                st.error(str(exc))
+                            else:
+                                st.success(f"🎉 学习会话完成！笔记已保存，ID: {note_id}")
+                                st.rerun()
                         else:
                             st.error(task_name_or_error)
                     else:
                         st.warning("⚠️ 请填写主笔记和关键问题")
     
+    elif page == "📥 导入题库":
+        st.header("📥 导入题库")
+        st.markdown("支持 CSV 题库（表头含 问题/答案，可选 牌组/模块）和 Anki 导出的纯文本文件；"
+                    "问题写入笔记的线索栏，答案写入主笔记区，按牌组归入当前目标下的任务。")
+        
+        uploaded = st.file_uploader("选择题库文件", type=["csv", "tsv", "txt"])
+        if uploaded is not None:
+            default_task = st.text_input("没有牌组列时归入的任务", uploaded.name.rsplit('.', 1)[0])
+            if st.button("📥 开始导入"):
+                progress_text = st.empty()
+                stream = io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline='')
+                try:
+                    totals = import_deck(study_system, stream, uploaded.name, default_task,
+                                         progress=lambda totals: progress_text.caption(
+                                             f"已导入 {totals['imported']} 张卡片…"))
+                except QuotaExceededError as exc:
+                    st.error(str(exc))
+                else:
+                    st.success(f"✅ 导入 {totals['imported']} 张卡片，跳过重复 {totals['skipped']} 张，"
+                               f"新建任务 {totals['tasks_created']} 个")
+    
     elif page == "📋 完善笔记总结":
         st.header("📋 完善笔记总结")
         
         # 选择笔记
-        note_options = [(note_id, f"任务{note['task_id']+1}: {study_system.minimal_tasks[note['task_id']]['name']}") 
-                       for note_id, note in study_system.notes.items()]
-        
-        if not note_options:
-            st.warning("⚠️ 暂无笔记，请先完成学习会话")
-            return
-        
-        selected_note = st.selectbox("选择要完善的笔记", [option[1] for option in note_options],
-                                   help="选择您要完善总结的笔记")
+        note_id = render_note_picker(study_system, "选择要完善的笔记", "summary_note", "⚠️ 暂无笔记，请先完成学习会话",
+                                     help="选择您要完善总结的笔记")
         
-        if selected_note:
-            note_id = [option[0] for option in note_options if option[1] == selected_note][0]
-            note = study_system.notes[note_id]
+        if note_id is not None:
+            note = study_system.open_note(note_id)
             
             # 显示笔记内容（康奈尔笔记格式）
             st.subheader("📖 笔记内容")
@@ -384,40 +592,58 @@ def modern_ui():
                     st.rerun()
                 else:
                     st.error("❌ 保存失败，请重试")
+            
+            # 修改历史：查看理解的演变过程
+            versions = study_system.get_note_versions(note_id)
+            if len(versions) > 1:
+                with st.expander(f"🕘 修改历史（{len(versions)} 个版本）"):
+                    for version in versions:
+                        changed = "、".join(version['changed']) or "创建"
+                        st.markdown(f"- 版本 {version['version']}｜{version['at'].replace('T', ' ')[:16]}｜{changed}")
+                    as_of = st.date_input("查看某天的笔记内容", datetime.date.fromisoformat(versions[-1]['at'][:10]),
+                                          key=f"as_of_{note_id}")
+                    snapshot = study_system.get_note_as_of(note_id, as_of.isoformat())
+                    if snapshot is None:
+                        st.info("这一天笔记尚未创建")
+                    else:
+                        st.caption(f"{snapshot['at'].replace('T', ' ')[:16]} 的版本")
+                        st.markdown(f"**主笔记：** {snapshot['main_notes']}")
+                        st.markdown(f"**关键问题：** {snapshot['key_questions']}")
+                        st.markdown(f"**总结：** {snapshot['summary'] or '尚未完成总结'}")
     
     elif page == "🌙 睡前复习":
         st.header("🌙 睡前复习（海马体记忆法）")
         
         # 显示当前复习计划
         st.subheader("📅 复习计划预览")
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        tomorrow = (datetime.datetime.now() + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        now = study_system.clock.now()
+        today = now.strftime("%Y-%m-%d")
+        tomorrow = (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown(f"**今日 ({today}) 复习计划:**")
-            if today in study_system.review_schedule and study_system.review_schedule[today]:
-                for note_id, focus_point in study_system.review_schedule[today].items():
-                    if note_id in study_system.notes:
-                        note = study_system.notes[note_id]
-                        task_name = study_system.minimal_tasks[note['task_id']]['name']
-                        st.markdown(f"- 📘 {task_name}: {focus_point}")
+            today_queue = study_system.get_review_queue(today)
+            if today_queue:
+                for entry in today_queue:
+                    carried = f"（顺延自 {entry['carried_from']}）" if entry['carried_from'] else ""
+                    st.markdown(f"- 📘 {entry['task_name']}: {entry['focus_point']}{carried}")
             else:
                 st.info("📭 今日无复习任务")
         
         with col2:
             st.markdown(f"**明日 ({tomorrow}) 复习计划:**")
-            if tomorrow in study_system.review_schedule and study_system.review_schedule[tomorrow]:
-                for note_id, focus_point in study_system.review_schedule[tomorrow].items():
-                    if note_id in study_system.notes:
-                        note = study_system.notes[note_id]
-                        task_name = study_system.minimal_tasks[note['task_id']]['name']
-                        st.markdown(f"- 📗 {task_name}: {focus_point}")
+            tomorrow_queue = study_system.get_review_queue(tomorrow)
+            if tomorrow_queue:
+                for entry in tomorrow_queue:
+                    st.markdown(f"- 📗 {entry['task_name']}: {entry['focus_point']}")
             else:
                 st.info("📭 明日无复习任务")
         
-        today_notes = study_system._get_today_notes()
+        render_retention_trend(study_system)
+        
+        today_notes = study_system.get_today_notes()
         if not today_notes:
             st.info("📭 今天没有创建学习笔记，无需复习")
             return
@@ -431,9 +657,12 @@ def modern_ui():
             st.markdown(f'''
             <div class="review-item">
                 <h3>📘 复习任务: {task['name']}</h3>
-                <p><strong>关键问题:</strong> {note['key_questions']}</p>
+                <p><strong>关键问题:</strong> {study_system.get_note_body(note_id, 'key_questions')}</p>
             </div>
             ''', unsafe_allow_html=True)
+            recall_history = study_system.get_recall_history(note_id)
+            if recall_history:
+                st.caption(f"历次回忆：{' → '.join(recall_history)}")
             
             col1, col2 = st.columns(2)
             with col1:
@@ -456,71 +685,127 @@ def modern_ui():
         
         # 显示复习计划状态
         st.subheader("📅 复习计划状态")
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        tomorrow = (datetime.datetime.now() + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        now = study_system.clock.now()
+        today = now.strftime("%Y-%m-%d")
+        tomorrow = (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown(f"**今日 ({today}) 复习计划:**")
-            if today in study_system.review_schedule and study_system.review_schedule[today]:
-                for note_id, focus_point in study_system.review_schedule[today].items():
-                    if note_id in study_system.notes:
-                        note = study_system.notes[note_id]
-                        task_name = study_system.minimal_tasks[note['task_id']]['name']
-                        st.markdown(f"- 📘 {task_name}: {focus_point}")
+            today_queue = study_system.get_review_queue(today)
+            if today_queue:
+                for entry in today_queue:
+                    carried = f"（顺延自 {entry['carried_from']}）" if entry['carried_from'] else ""
+                    st.markdown(f"- 📘 {entry['task_name']}: {entry['focus_point']}{carried}")
             else:
                 st.info("📭 今日无复习任务")
         
         with col2:
             st.markdown(f"**明日 ({tomorrow}) 复习计划:**")
-            if tomorrow in study_system.review_schedule and study_system.review_schedule[tomorrow]:
-                for note_id, focus_point in study_system.review_schedule[tomorrow].items():
-                    if note_id in study_system.notes:
-                        note = study_system.notes[note_id]
-                        task_name = study_system.minimal_tasks[note['task_id']]['name']
-                        st.markdown(f"- 📗 {task_name}: {focus_point}")
+            tomorrow_queue = study_system.get_review_queue(tomorrow)
+            if tomorrow_queue:
+                for entry in tomorrow_queue:
+                    st.markdown(f"- 📗 {entry['task_name']}: {entry['focus_point']}")
             else:
                 st.info("📭 明日无复习任务")
         
-        # 实际的晨间复习功能
-        today_reviews = study_system._get_today_morning_reviews()
-        if not today_reviews:
+        render_retention_trend(study_system)
+        
+        # 实际的晨间复习功能（复用上方的今日复习队列）
+        if not today_queue:
             st.info("📭 今天没有安排晨间复习任务")
             return
         
         st.subheader("⚡ 今日晨间复习任务")
-        for note_id, focus_point in today_reviews.items():
-            if note_id in study_system.notes:
-                note = study_system.notes[note_id]
-                task_name = study_system.minimal_tasks[note['task_id']]['name']
-                st.markdown(f'''
-                <div class="review-item">
-                    <h3>📘 复习任务: {task_name}</h3>
-                    <p><strong>重点强化:</strong> {focus_point}</p>
-                </div>
-                ''', unsafe_allow_html=True)
-                st.success("✅ 已完成晨间复习")
+        note_retention = study_system.get_note_retention()
+        for entry in today_queue:
+            retention = note_retention.get(entry['note_id'])
+            st.markdown(f'''
+            <div class="review-item">
+                <h3>📘 复习任务: {entry['task_name']}</h3>
+                <p><strong>重点强化:</strong> {entry['focus_point']}</p>
+                {f"<p>⏳ 顺延自 {entry['carried_from']}</p>" if entry['carried_from'] else ""}
+                {f"<p>🧠 记忆保持率: {retention:.0%}</p>" if retention is not None else ""}
+            </div>
+            ''', unsafe_allow_html=True)
+            st.success("✅ 已完成晨间复习")
         
         if st.button("✅ 完成所有晨间复习"):
             result = study_system.morning_review()
             st.success(result)
             st.rerun()
     
-    elif page == "📝 实战检验":
-        st.header("📝 实战检验（做题+费曼验证）")
+    elif page == "🃏 闪卡练习":
+        st.header("🃏 闪卡练习（主动回忆）")
         
-        if not study_system.minimal_tasks:
-            st.warning("⚠️ 请先创建学习任务")
+        deck = st.session_state.get("drill_deck")
+        if deck is None:
+            goal_tasks = study_system.get_goal_tasks()
+            if not goal_tasks:
+                st.warning("⚠️ 请先创建学习任务")
+                return
+            task_names = dict(goal_tasks)
+            scope = st.selectbox("练习范围", [None] + list(task_names),
+                                 format_func=lambda i: "当前目标的全部任务" if i is None else task_names[i]['name'])
+            card_count = study_system.get_flashcard_count(scope)
+            st.caption(f"线索栏中的每个问题为一张卡片，共 {card_count} 张")
+            if card_count and st.button("▶️ 开始练习"):
+                # 显式传入随机种子，录制的轨迹回放时洗出同样的牌序
+                st.session_state["drill_deck"] = study_system.build_drill_deck(scope, seed=random.randrange(2 ** 32))
+                st.session_state["drill_card"] = None
+                st.session_state["drill_revealed"] = False
+                st.rerun()
             return
         
-        # 选择任务
-        task_options = [f"{i+1}. {task['name']}" for i, task in enumerate(study_system.minimal_tasks)]
-        selected_task = st.selectbox("选择要检验的任务", task_options,
-                                   help="选择您要检验掌握程度的任务")
+        def submit_grades():
+            if deck.pending:
+                study_system.grade_drill(deck.take_graded())
+        
+        card = st.session_state.get("drill_card")
+        if card is None:
+            card = st.session_state["drill_card"] = study_system.draw_flashcard(deck)
         
-        if selected_task:
-            task_index = int(selected_task.split('.')[0]) - 1
+        if card is None:
+            submit_grades()
+            st.success(f"🎉 本轮练习完成，共 {deck.position} 张卡片")
+        else:
+            st.progress(deck.position / len(deck), text=f"第 {deck.position} / {len(deck)} 张")
+            st.markdown(f'''
+            <div class="review-item">
+                <h3>❓ {card['cue']}</h3>
+                <p>📘 {card['task_name']}</p>
+            </div>
+            ''', unsafe_allow_html=True)
+            if not st.session_state.get("drill_revealed"):
+                if st.button("👀 显示答案"):
+                    st.session_state["drill_revealed"] = True
+                    st.rerun()
+            else:
+                st.info(card['answer'])
+                for col, outcome in zip(st.columns(3), ["能回忆起", "部分回忆", "无法回忆"]):
+                    with col:
+                        if st.button(outcome, use_container_width=True):
+                            deck.grade(card['card'], outcome)
+                            if deck.pending >= DRILL_BATCH_SIZE:
+                                submit_grades()
+                            st.session_state["drill_card"] = None
+                            st.session_state["drill_revealed"] = False
+                            st.rerun()
+        
+        if st.button("⏹️ 结束练习"):
+            submit_grades()
+            del st.session_state["drill_deck"]
+            st.rerun()
+    
+    elif page == "📝 实战检验":
+        st.header("📝 实战检验（做题+费曼验证）")
+        
+        # 选择任务（仅检索当前目标下的任务）
+        task_index = render_task_picker(study_system, "选择要检验的任务", "practice_task", "⚠️ 请先创建学习任务",
+                                        help="选择您要检验掌握程度的任务")
+        
+        if task_index is not None:
             
             # 输入得分
             score = st.number_input("请输入本次练习得分（0-100）", 
@@ -546,13 +831,19 @@ def modern_ui():
                                          help="记录您不理解或容易混淆的地方")
                 
                 if st.button("📌 记录薄弱点"):
-                    result = study_system.practice_testing(task_index, score, weak_point, blind_spot)
-                    st.success(result)
-                    st.rerun()
+                    try:
+                        result = study_system.practice_testing(task_index, score, weak_point, blind_spot)
+                    except QuotaExceededError as exc:
+                        st.error(str(exc))
+                    else:
+                        st.success(result)
+                        st.rerun()
             else:
                 if st.button("✅ 确认掌握"):
-                    result = study_system.practice_testing(task_index, score)
-                    st.success(result)
+                    try:
+                        st.success(study_system.practice_testing(task_index, score))
+                    except QuotaExceededError as exc:
+                        st.error(str(exc))
     
     elif page == "❌ 查看薄弱点":
         st.header("❌ 薄弱点记录（错题本）")
@@ -562,6 +853,19 @@ def modern_ui():
             st.info("🎉 目前没有记录的薄弱点，继续保持！")
             return
         
+        # 反复出现的问题（相似描述自动归为一组）
+        recurring = study_system.get_recurring_weak_points()
+        if recurring:
+            st.subheader(f"🔁 反复出现的问题（{len(recurring)} 组）")
+            for group in recurring:
+                task_names = "、".join(dict.fromkeys(point['task_name'] for point in group))
+                latest = group[-1]
+                with st.expander(f"🔁 {latest['weak_point'] or latest['blind_spot']}（出现 {len(group)} 次）"):
+                    st.caption(f"涉及任务：{task_names}")
+                    for point in group:
+                        st.markdown(f"- {point['record_time'].split('T')[0]}｜得分 {point['practice_score']}｜"
+                                    f"{point['weak_point']}｜{point['blind_spot']}")
+        
         st.subheader(f"📋 共 {len(weak_points)} 个薄弱点")
         for i, point in enumerate(weak_points, 1):
             st.markdown(f'''
@@ -577,26 +881,183 @@ def modern_ui():
     elif page == "📖 查看所有笔记":
         st.header("📖 所有学习笔记")
         
-        notes = study_system.get_notes()
         tasks = study_system.get_tasks()
         
-        if not notes:
+        if not study_system.get_note_count():
             st.info("📭 暂无学习笔记")
             return
         
-        st.subheader(f"📋 共 {len(notes)} 条笔记")
-        for note_id, note in notes.items():
+        similar_groups = study_system.get_similar_note_groups()
+        if similar_groups:
+            with st.expander(f"🔁 发现 {len(similar_groups)} 组内容相近的笔记"):
+                for group in similar_groups:
+                    st.markdown("- " + "、".join(group))
+        
+        scope = st.selectbox("按任务筛选", [None] + list(tasks),
+                             format_func=lambda i: "全部任务" if i is None else tasks[i]['name'])
+        st.subheader(f"📋 共 {study_system.get_note_count(scope)} 条笔记")
+        # 默认只列出笔记元数据；打开开关时显示当前页的正文预览（不记录访问，冷笔记不会因此被还原）
+        show_bodies = st.toggle("显示正文预览", value=False)
+        for note in render_note_page(study_system, "all_notes", scope):
+            note_id = note['note_id']
             task = tasks[note['task_id']]
+            if show_bodies:
+                note = study_system.peek_note(note_id)
+                preview = {field: note[field] if len(note[field]) <= NOTE_PREVIEW_CHARS
+                           else note[field][:NOTE_PREVIEW_CHARS] + "…"
+                           for field in ('main_notes', 'key_questions', 'summary')}
+                body_html = f'''
+                <p><strong>主笔记:</strong> {preview['main_notes']}</p>
+                <p><strong>关键问题:</strong> {preview['key_questions']}</p>
+                <p><strong>总结:</strong> {preview['summary'] or '未完成'}</p>'''
+            else:
+                body_html = ""
             st.markdown(f'''
             <div class="feature-card">
                 <h3>📘 笔记ID: {note_id}</h3>
-                <p><strong>任务:</strong> {task['name']}</p>
-                <p><strong>主笔记:</strong> {note['main_notes']}</p>
-                <p><strong>关键问题:</strong> {note['key_questions']}</p>
-                <p><strong>总结:</strong> {note.get('summary', '未完成')}</p>
+                <p><strong>任务:</strong> {task['name']}</p>{body_html}
                 <p><strong>创建时间:</strong> {note['created_at']}</p>
             </div>
             ''', unsafe_allow_html=True)
 
+    
+    elif page == "📅 学习热力图":
+        st.header("📅 学习热力图")
+        
+        # 最近一年的每日学习活动（按周排列，周一在上）
+        heatmap = study_system.get_cached_stats('study_heatmap')
+        first_date = datetime.date.fromisoformat(next(iter(heatmap)))
+        cells = ['<div class="heatmap-cell" style="visibility:hidden"></div>'] * first_date.weekday()
+        for date, count in heatmap.items():
+            level = 0 if count == 0 else 1 if count <= 1 else 2 if count <= 3 else 3 if count <= 6 else 4
+            level_class = f" heatmap-l{level}" if level else ""
+            cells.append(f'<div class="heatmap-cell{level_class}" title="{date}: {count} 次学习活动"></div>')
+        st.markdown(f'<div class="heatmap">{"".join(cells)}</div>', unsafe_allow_html=True)
+        st.caption(f"最近一年共 {sum(heatmap.values())} 次学习活动，"
+                   f"{len([c for c in heatmap.values() if c])} 天有学习记录")
+        
+        # 日期区间查询
+        st.subheader("🔍 按日期查询")
+        today_date = study_system.clock.now().date()
+        date_range = st.date_input("选择日期区间",
+                                 (today_date - datetime.timedelta(days=27), today_date))
+        if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+            start = date_range[0].isoformat()
+            end = (date_range[1] + datetime.timedelta(days=1)).isoformat()
+            range_notes = study_system.get_notes_between(start, end)
+            range_weak_points = study_system.get_weak_points_between(start, end)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("区间内笔记", len(range_notes))
+            with col2:
+                st.metric("区间内薄弱点", len(range_weak_points))
+            
+            st.markdown("**每周学习会话次数:**")
+            for week_start, count in study_system.count_sessions_per_week(start, end):
+                st.markdown(f"- {week_start} 起的一周：{count} 次")
+            
+            for note_id, note in range_notes.items():
+                st.markdown(f"- 📘 {study_system.minimal_tasks[note['task_id']]['name']}"
+                            f"（{note['created_at'].split('T')[0]}）")
+
+    
+    elif page == "📊 学习分析":
+        st.header("📊 学习分析")
+        
+        analytics = study_system.get_cached_stats('session_analytics')
+        if not analytics['sessions']:
+            st.info("📭 暂无学习会话记录")
+            return
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("累计学习", f"{analytics['total_minutes']} 分钟", f"{analytics['sessions']} 次会话",
+                      delta_color="off")
+        with col2:
+            st.metric("最近 7 天", f"{analytics['last_7_days']} 分钟")
+        with col3:
+            st.metric("最近 30 天", f"{analytics['last_30_days']} 分钟")
+        with col4:
+            st.metric("连续学习", f"{analytics['current_streak']} 天",
+                      f"最长 {analytics['longest_streak']} 天", delta_color="off")
+        
+        st.subheader("📈 滚动学习时长（最近 90 天）")
+        st.line_chart({
+            "7 天滚动": analytics['rolling_7'],
+            "30 天滚动": analytics['rolling_30']
+        })
+        
+        st.subheader("🕒 学习时段分布")
+        st.bar_chart({"学习时长（分钟）": analytics['hour_distribution']})
+        
+        st.subheader("📚 各任务学习时长")
+        for task_index, minutes in sorted(analytics['task_totals'].items(), key=lambda item: -item[1]):
+            st.markdown(f"- 📘 {study_system.minimal_tasks[task_index]['name']}：{minutes} 分钟")
+        
+        st.subheader("📰 学习周报")
+        week = st.radio("周报范围", ["本周", "上周"], horizontal=True, key="report_week")
+        if st.button("📝 生成周报"):
+            today = study_system.clock.now().date()
+            week_start = today - datetime.timedelta(days=today.weekday() + (7 if week == "上周" else 0))
+            st.session_state["weekly_report"] = submit_report(get_report_pool(), study_system,
+                                                              week_start.isoformat())
+        render_weekly_report()
+        
+        tiering = study_system.get_cached_stats('tiering')
+        with st.expander("💾 笔记存储"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("热笔记", tiering['hot_notes'])
+            with col2:
+                st.metric("冷笔记", tiering['cold_notes'], f"{tiering['cold_after_days']} 天未访问转冷",
+                          delta_color="off")
+            with col3:
+                st.metric("内存节省", f"{tiering['memory_saved_bytes'] / 1024:.1f} KB")
+            if 'disk' in tiering:
+                disk = tiering['disk']
+                st.caption(f"内容存储：{disk['blobs']} 个文件，占用 {disk['bytes'] / 1024:.1f} KB，"
+                           f"其中 {disk['compressed_blobs']} 个已压缩，节省 {disk['saved_bytes'] / 1024:.1f} KB")
+        
+        if study_system.scheduler is not None:
+            with st.expander("⚙️ 后台任务"):
+                for job in study_system.scheduler.status():
+                    state = "运行中" if job['running'] else f"最近 {job['last_run']}" if job['last_run'] else "等待中"
+                    error = f" · ⚠️ {job['last_error']}" if job['last_error'] else ""
+                    st.caption(f"{job['name']}：每 {job['interval']} 秒 · 已执行 {job['runs']} 次 · {state}{error}")
+    
+    elif page == "🗄️ 内存占用":
+        st.header("🗄️ 内存占用")
+        st.markdown("按学习目标统计笔记、会话、薄弱点和复习计划在内存中的占用；"
+                    "超过软配额时最久未访问的笔记正文转入冷存储，超过硬配额时拒绝新的笔记、导入和检验记录。")
+        
+        n = st.slider("显示占用最多的目标数", 1, 50, 10)
+        memory = study_system.get_memory_usage(n)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("总占用", f"{memory['total_bytes'] / 1048576:.2f} MB", f"{memory['workspace_count']} 个目标",
+                      delta_color="off")
+        with col2:
+            soft = memory['soft_quota_bytes']
+            st.metric("软配额", f"{soft / 1048576:.2f} MB" if soft is not None else "未设置")
+        with col3:
+            hard = memory['hard_quota_bytes']
+            st.metric("硬配额", f"{hard / 1048576:.2f} MB" if hard is not None else "未设置")
+        
+        if not memory['workspaces']:
+            st.info("📭 暂无数据")
+            return
+        
+        labels = {"notes": "笔记", "sessions": "会话", "weak_points": "薄弱点", "reviews": "复习计划"}
+        status_labels = {"ok": "✅ 正常", "soft": "🟡 超过软配额", "hard": "🔴 超过硬配额"}
+        st.dataframe([
+            {"目标": usage['name'], "总占用 (KB)": round(usage['total_bytes'] / 1024, 1),
+             **{f"{labels[name]} (KB)": round(usage[f"{name}_bytes"] / 1024, 1) for name in MEMORY_CATEGORIES},
+             **{f"{labels[name]}数": usage[f"{name}_count"] for name in MEMORY_CATEGORIES},
+             "状态": status_labels[usage['status']]}
+            for usage in memory['workspaces']
+        ], hide_index=True)
+        st.bar_chart({"占用 (KB)": {usage['name']: usage['total_bytes'] / 1024 for usage in memory['workspaces']}})
+
 if __name__ == "__main__":
     modern_ui()
\ No newline at end of file
@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional, Tuple
+
+from memory_accounting import deep_sizeof
+
+Delta = Tuple[int, int, str]  # (起点, 终点, 旧内容)：把新文本的 [起点, 终点) 换成旧内容即得到上一版本
+
+
+def make_delta(new: str, old: str) -> Delta:
+    """计算把 new 还原为 old 的反向增量（去掉公共前后缀，只保存改动区间的旧内容）"""
+    limit = min(len(new), len(old))
+    start = 0
+    while start < limit and new[start] == old[start]:
+        start += 1
+    suffix = 0
+    while suffix < limit - start and new[-1 - suffix] == old[-1 - suffix]:
+        suffix += 1
+    return (start, len(new) - suffix, old[start:len(old) - suffix])
+
+
+def apply_delta(text: str, delta: Delta) -> str:
+    start, end, old = delta
+    return text[:start] + old + text[end:]
+
+
+class NoteHistory:
+    """笔记修改历史：最新内容保存在笔记本身，历史版本以反向增量逐个链接，
+    每次修改的额外内存只与改动区间的大小成正比"""
+
+    def __init__(self):
+        self._versions: Dict[str, List[Tuple[str, Dict[str, Delta]]]] = {}  # note_id -> [(版本时间, {字段: 反向增量})]，按时间升序
+
+    def record(self, note_id: str, old_at: str, old_fields: Dict[str, str], new_fields: Dict[str, str]) -> bool:
+        """记录一次修改：old_at 为被替换版本的时间；没有字段变化时不记录"""
+        deltas = {field: make_delta(text, old_fields[field])
+                  for field, text in new_fields.items() if text != old_fields[field]}
+        if not deltas:
+            return False
+        self._versions.setdefault(note_id, []).append((old_at, deltas))
+        return True
+
+    def discard(self, note_id: str):
+        """删除笔记时丢弃其历史"""
+        self._versions.pop(note_id, None)
+
+    def size_of(self, note_id: str) -> int:
+        """某条笔记的历史版本占用的字节数"""
+        history = self._versions.get(note_id)
+        return deep_sizeof(history) if history else 0
+
+    def versions(self, note_id: str, current_at: str) -> List[Dict[str, object]]:
+        """版本列表（从新到旧）：版本号、时间、相对上一版本改动的字段；无需还原正文"""
+        history = self._versions.get(note_id, [])
+        result = [{'version': len(history), 'at': current_at,
+                   'changed': sorted(history[-1][1]) if history else []}]
+        for i in range(len(history) - 1, -1, -1):
+            result.append({'version': i, 'at': history[i][0],
+                           'changed': sorted(history[i - 1][1]) if i else []})
+        return result
+
+    def as_of(self, note_id: str, at: str, current_at: str,
+              current_fields: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """还原 at 时刻的笔记内容（从最新版本逐个应用反向增量）；笔记当时尚不存在时返回 None"""
+        fields = dict(current_fields)
+        version_at = current_at
+        history = self._versions.get(note_id, [])
+        for old_at, deltas in reversed(history):
+            if version_at <= at:
+                break
+            for field, delta in deltas.items():
+                fields[field] = apply_delta(fields[field], delta)
+            version_at = old_at
+        if version_at > at:
+            return None
+        fields['at'] = version_at
+        return fields
+
+    def version(self, note_id: str, version: int, current_fields: Dict[str, str]) -> Dict[str, str]:
+        """还原指定版本号的内容"""
+        fields = dict(current_fields)
+        history = self._versions.get(note_id, [])
+        for _, deltas in reversed(history[version:]):
+            for field, delta in deltas.items():
+                fields[field] = apply_delta(fields[field], delta)
+        return fields
+
+    def stats(self) -> Dict[str, int]:
+        """历史版本数和增量占用的字符数"""
+        versions = sum(len(history) for history in self._versions.values())
+        chars = sum(len(delta[2]) for history in self._versions.values()
+                    for _, deltas in history for delta in deltas.values())
+        return {'notes': len(self._versions), 'versions': versions, 'delta_chars': chars}
+
+    def to_dict(self) -> Dict[str, List]:
+        return {note_id: [[at, {field: list(delta) for field, delta in deltas.items()}] for at, deltas in history]
+                for note_id, history in self._versions.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List]) -> "NoteHistory":
+        history = cls()
+        history._versions = {note_id: [(at, {field: tuple(delta) for field, delta in deltas.items()})
+                                       for at, deltas in versions]
+                             for note_id, versions in data.items()}
+        return history
@@ -0,0 +1,107 @@
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RECALL_OUTCOMES = ["能回忆起", "部分回忆", "无法回忆"]  # 下标即事件编码
+RECALL_CODES = {outcome: code for code, outcome in enumerate(RECALL_OUTCOMES)}
+RECALL_RETENTION = np.array([1.0, 0.5, 0.0])  # 各编码对应的记忆保持率
+
+
+class RecallLog:
+    """只追加的回忆结果事件日志：每个事件以若干定长整数存放在 array 中"""
+    
+    def __init__(self):
+        self._codes = array('B')  # 回忆结果编码
+        self._notes = array('I')  # 笔记槽位
+        self._tasks = array('i')  # 任务索引
+        self._ages = array('i')  # 复习时距笔记创建的天数
+        self._days = array('i')  # 复习日期（自 1970 年起的天数）
+        self._note_ids = []  # 槽位 -> note_id
+        self._note_slots = {}  # note_id -> 槽位
+        self._cache_size = -1  # 以下缓存对应的事件数
+        self._note_retention = None
+    
+    def __len__(self):
+        return len(self._codes)
+    
+    def append(self, note_id: str, task_index: int, code: int, age_days: int, day: int):
+        """追加一条回忆事件"""
+        slot = self._note_slots.get(note_id)
+        if slot is None:
+            slot = self._note_slots[note_id] = len(self._note_ids)
+            self._note_ids.append(note_id)
+        self._codes.append(code)
+        self._notes.append(slot)
+        self._tasks.append(task_index)
+        self._ages.append(max(age_days, 0))
+        self._days.append(day)
+    
+    def to_dict(self) -> Dict[str, List]:
+        """导出为可 JSON 序列化的列数据"""
+        return {
+            'note_ids': list(self._note_ids),
+            'codes': self._codes.tolist(),
+            'notes': self._notes.tolist(),
+            'tasks': self._tasks.tolist(),
+            'ages': self._ages.tolist(),
+            'days': self._days.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, List]) -> 'RecallLog':
+        """从 to_dict 的结果恢复日志"""
+        log = cls()
+        log._note_ids = list(data['note_ids'])
+        log._note_slots = {note_id: slot for slot, note_id in enumerate(log._note_ids)}
+        for name in ('codes', 'notes', 'tasks', 'ages', 'days'):
+            getattr(log, f"_{name}").extend(data[name])
+        return log
+    
+    def _column(self, column: array) -> np.ndarray:
+        return np.frombuffer(column, dtype=column.typecode) if len(column) else np.zeros(0, dtype=column.typecode)
+    
+    def note_retention(self) -> Dict[str, float]:
+        """每条笔记的平均记忆保持率（一次向量化计算，日志不变时复用结果）"""
+        if self._cache_size != len(self._codes):
+            notes = self._column(self._notes)
+            retention = RECALL_RETENTION[self._column(self._codes)]
+            counts = np.bincount(notes, minlength=len(self._note_ids))
+            sums = np.bincount(notes, weights=retention, minlength=len(self._note_ids))
+            with np.errstate(invalid='ignore'):
+                self._note_retention = sums / counts
+            self._cache_size = len(self._codes)
+        return {note_id: float(self._note_retention[slot])
+                for slot, note_id in enumerate(self._note_ids) if not np.isnan(self._note_retention[slot])}
+    
+    def note_history(self, note_id: str) -> List[str]:
+        """某条笔记按时间顺序的回忆结果"""
+        slot = self._note_slots.get(note_id)
+        if slot is None:
+            return []
+        codes = self._column(self._codes)[self._column(self._notes) == slot]
+        return [RECALL_OUTCOMES[code] for code in codes]
+    
+    def retention_curve(self, task_index: Optional[int] = None, max_age: int = 30) -> np.ndarray:
+        """遗忘曲线：按“距笔记创建天数”分组的平均保持率，无数据的天为 nan"""
+        ages = self._column(self._ages)
+        retention = RECALL_RETENTION[self._column(self._codes)]
+        mask = ages <= max_age
+        if task_index is not None:
+            mask &= self._column(self._tasks) == task_index
+        counts = np.bincount(ages[mask], minlength=max_age + 1)
+        sums = np.bincount(ages[mask], weights=retention[mask], minlength=max_age + 1)
+        with np.errstate(invalid='ignore'):
+            return sums / counts
+    
+    def outcome_counts(self, start_day: Optional[int] = None, end_day: Optional[int] = None) -> Dict[str, int]:
+        """统计 start_day <= 复习日期 < end_day 的各类回忆结果次数"""
+        codes = self._column(self._codes)
+        days = self._column(self._days)
+        mask = np.ones(len(codes), dtype=bool)
+        if start_day is not None:
+            mask &= days >= start_day
+        if end_day is not None:
+            mask &= days < end_day
+        counts = np.bincount(codes[mask], minlength=len(RECALL_OUTCOMES))
+        return dict(zip(RECALL_OUTCOMES, counts.tolist()))
@@ -0,0 +1,52 @@
+import heapq
+import itertools
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class RecommendationQueue:
+    """下一步行动的优先队列：按得分从高到低取出，更新时惰性淘汰旧条目"""
+    
+    def __init__(self):
+        self._heap = []  # (-得分, 序号, 键)
+        self._entries = {}  # 键 -> (得分, 序号, 行动)
+        self._counter = itertools.count()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def update(self, key: Hashable, score: float, action: Dict[str, Any]):
+        """新增或更新一条行动建议"""
+        seq = next(self._counter)
+        self._entries[key] = (score, seq, action)
+        heapq.heappush(self._heap, (-score, seq, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+    
+    def remove(self, key: Hashable):
+        """移除一条行动建议（堆中的旧条目在读取时跳过）"""
+        self._entries.pop(key, None)
+    
+    def _is_live(self, item) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[1] == item[1]
+    
+    def _compact(self):
+        """内部方法：丢弃堆中已失效的条目"""
+        self._heap = [item for item in self._heap if self._is_live(item)]
+        heapq.heapify(self._heap)
+    
+    def top(self, n: int = 3, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """获取得分最高的 n 条（满足 predicate 的）行动建议；只读遍历堆，不修改队列"""
+        result = []
+        heap = self._heap
+        frontier = [(heap[0], 0)] if heap else []  # 按堆序展开的候选：(堆条目, 下标)
+        while frontier and len(result) < n:
+            item, i = heapq.heappop(frontier)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+            if self._is_live(item):
+                score, _, action = self._entries[item[2]]
+                if predicate is None or predicate(action):
+                    result.append(dict(action, score=score))
+        return result
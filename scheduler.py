@@ -0,0 +1,109 @@
+"""进程内后台任务：调度线程按到期时间把周期任务交给有界线程池执行，页面重跑时只读取已算好的结果"""
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from clock import Clock, SystemClock
+
+JOB_WORKERS = 2  # 后台线程池大小
+COMPACT_MIN_OPS = 500  # 快照之后积累这么多操作才压缩共享状态库
+
+
+class JobScheduler:
+    """周期任务调度器：同一任务不会重叠运行（上一次未结束时跳过本轮），
+    因此线程池排队的任务数不超过登记的任务数"""
+
+    def __init__(self, workers: int = JOB_WORKERS, clock: Optional[Clock] = None):
+        self.clock = clock or SystemClock()  # 只用于记录 last_run；调度间隔按真实的单调时间计算
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="studyfast-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._due: List[Tuple[float, str]] = []  # (到期时间, 任务名) 小顶堆
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def add_job(self, name: str, func: Callable[[], Any], interval: float, delay: float = 0.0):
+        """登记周期任务：delay 秒后首次执行，之后每 interval 秒执行一次"""
+        with self._lock:
+            self._jobs[name] = {'func': func, 'interval': interval, 'running': False, 'runs': 0, 'errors': 0,
+                                'last_run': None, 'last_seconds': None, 'last_result': None, 'last_error': None}
+            heapq.heappush(self._due, (time.monotonic() + delay, name))
+            self._wakeup.notify()
+
+    def start(self) -> "JobScheduler":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="studyfast-scheduler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        """停止调度；wait 时等待正在执行的任务结束"""
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self._pool.shutdown(wait=wait)
+
+    def run_now(self, name: str) -> bool:
+        """立即执行一次任务（正在运行时返回 False）"""
+        with self._lock:
+            return self._submit(name)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """各任务的运行状态：次数、出错次数、最近一次的时间、耗时、结果和错误"""
+        with self._lock:
+            return [{'name': name, **{key: value for key, value in job.items() if key != 'func'}}
+                    for name, job in self._jobs.items()]
+
+    def _loop(self):
+        with self._lock:
+            while not self._stopped:
+                now = time.monotonic()
+                while self._due and self._due[0][0] <= now:
+                    _, name = heapq.heappop(self._due)
+                    try:
+                        self._submit(name)
+                    except RuntimeError:
+                        return  # 解释器退出时线程池已关闭
+                    heapq.heappush(self._due, (now + self._jobs[name]['interval'], name))
+                self._wakeup.wait(self._due[0][0] - now if self._due else None)
+
+    def _submit(self, name: str) -> bool:
+        job = self._jobs[name]
+        if job['running']:
+            return False
+        self._pool.submit(self._run, job)
+        job['running'] = True
+        return True
+
+    def _run(self, job: Dict[str, Any]):
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            result = job['func']()
+        except Exception as exc:  # 后台任务出错只记录，不影响调度
+            error = f"{type(exc).__name__}: {exc}"
+        with self._lock:
+            job['running'] = False
+            job['runs'] += 1
+            job['errors'] += error is not None
+            job['last_run'] = self.clock.now().isoformat(timespec='seconds')
+            job['last_seconds'] = time.perf_counter() - started
+            job['last_result'] = result
+            job['last_error'] = error
+
+
+def start_background_jobs(study_system, workers: int = JOB_WORKERS) -> JobScheduler:
+    """为学习系统启动后台任务：拉取共享状态、刷新统计、整理索引、预先清理复习计划、压缩快照"""
+    scheduler = JobScheduler(workers, clock=study_system.clock)
+    scheduler.add_job('sync_store', study_system.sync, 2)
+    scheduler.add_job('refresh_stats', study_system.refresh_stats, 2)
+    scheduler.add_job('refresh_indexes', study_system.refresh_indexes, 30, delay=5)
+    scheduler.add_job('precompute_reviews', study_system.precompute_reviews, 300)
+    scheduler.add_job('compact_store', lambda: study_system.compact_store(min_ops=COMPACT_MIN_OPS), 600, delay=60)
+    return scheduler.start()
@@ -0,0 +1,115 @@
+import bisect
+import re
+from typing import Callable, Dict, FrozenSet, Hashable, List, Optional, Set
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+|[一-鿿]+")
+_MAX_CHAR = chr(0x10ffff)  # 前缀区间的上界
+CJK_SUFFIXES = 4  # 中文词段额外索引的后缀数，输入词中间的字也能匹配
+
+
+def search_terms(*texts: str) -> FrozenSet[str]:
+    """把文本切成可前缀匹配的检索词：英文/数字按词，中文按连续词段及其前几个后缀"""
+    terms = set(_TOKEN_RE.findall(" ".join(texts).lower()))
+    for token in [token for token in terms if token[0] >= '一' and len(token) > 1]:
+        terms.update(token[i:] for i in range(1, min(len(token), CJK_SUFFIXES + 1)))
+    return frozenset(terms)
+
+
+class PrefixIndex:
+    """前缀检索索引：检索词 -> 键集合的倒排表，另维护有序的检索词列表供二分定位前缀；
+    新检索词先进入待合并区，检索时再并入有序列表"""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[Hashable]] = {}  # 检索词 -> 键集合
+        self._sorted_terms: List[str] = []  # 有序检索词（可能含已无键的作废词）
+        self._pending: List[str] = []  # 尚未合并的新检索词
+        self._stale: Set[str] = set()  # 已无键但仍留在列表中的检索词
+        self._terms: Dict[Hashable, FrozenSet[str]] = {}  # 键 -> 当前检索词
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, key: Hashable, terms: FrozenSet[str]):
+        """登记或更新一个键的检索词"""
+        old = self._terms.get(key, frozenset())
+        if old == terms:
+            return
+        self._discard(key, old - terms)
+        self._terms[key] = terms
+        for term in terms:
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.add(key)
+                continue
+            self._postings[term] = {key}
+            if term in self._stale:
+                self._stale.discard(term)  # 仍在列表中，直接复用
+            else:
+                self._pending.append(term)
+
+    def remove(self, key: Hashable):
+        self._discard(key, self._terms.pop(key, ()))
+
+    def _discard(self, key: Hashable, terms):
+        for term in terms:
+            keys = self._postings[term]
+            keys.discard(key)
+            if not keys:
+                del self._postings[term]
+                self._stale.add(term)
+
+    def merge(self):
+        """把待合并的新检索词并入有序列表（检索前自动进行）"""
+        if len(self._stale) > len(self._sorted_terms) // 2 + 1024:
+            self._sorted_terms = sorted(self._postings)
+            self._pending = []
+            self._stale = set()
+        elif len(self._pending) <= 64:
+            for term in self._pending:
+                bisect.insort(self._sorted_terms, term)
+            self._pending = []
+        else:
+            # 已排序的旧检索词与新检索词合并，Timsort 对两段有序数据接近线性
+            self._pending.sort()
+            self._sorted_terms.extend(self._pending)
+            self._sorted_terms.sort()
+            self._pending = []
+
+    def _matching_terms(self, word: str) -> List[str]:
+        lo = bisect.bisect_left(self._sorted_terms, word)
+        hi = bisect.bisect_left(self._sorted_terms, word + _MAX_CHAR, lo)
+        return [term for term in self._sorted_terms[lo:hi] if term in self._postings]
+
+    def search(self, query: str, limit: int = 20,
+               predicate: Optional[Callable[[Hashable], bool]] = None) -> List[Hashable]:
+        """返回检索词以查询词开头的键（多个查询词时需全部命中），最多 limit 个"""
+        words = set(_TOKEN_RE.findall(query.lower()))
+        if not words:
+            return []
+        self.merge()
+        # 用命中键最少的查询词驱动遍历，其余查询词在候选上校验
+        best_terms, best_count, first = None, None, None
+        for word in sorted(words, key=len, reverse=True):
+            terms = self._matching_terms(word)
+            count = 0
+            for term in terms:
+                count += len(self._postings[term])
+                if best_count is not None and count >= best_count:
+                    break
+            if best_count is None or count < best_count:
+                best_terms, best_count, first = terms, count, word
+        others = [word for word in words if word != first]
+        results = []
+        seen = set()
+        for term in best_terms:
+            for key in self._postings[term]:
+                if key in seen:
+                    continue
+                seen.add(key)
+                terms = self._terms[key]
+                if all(any(other_term.startswith(word) for other_term in terms) for word in others) \
+                        and (predicate is None or predicate(key)):
+                    results.append(key)
+                    if len(results) >= limit:
+                        return results
+        return results
@@ -0,0 +1,149 @@
+import numpy as np
+from typing import Any, Dict, Iterable, Tuple
+
+
+class SessionAnalytics:
+    """学习会话统计：列式数组存储会话，追加时增量更新聚合结果"""
+    
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._minutes = np.empty(capacity, dtype=np.int64)  # 会话开始时间（自 1970 年起的分钟数）
+        self._tasks = np.empty(capacity, dtype=np.int32)  # 任务索引
+        self._durations = np.empty(capacity, dtype=np.int32)  # 学习时长（分钟）
+        # 增量聚合
+        self._task_minutes = np.zeros(16, dtype=np.int64)  # 每个任务的累计学习时长
+        self._hour_minutes = np.zeros(24, dtype=np.int64)  # 每个小时段的累计学习时长
+        self._first_day = None  # 最早学习日（自 1970 年起的天数）
+        self._day_minutes = np.zeros(0, dtype=np.int64)  # 每天的累计学习时长，下标为距最早学习日的天数
+    
+    def __len__(self):
+        return self._size
+    
+    @staticmethod
+    def _parse_minutes(timestamps: Iterable[str]) -> np.ndarray:
+        return np.array(list(timestamps), dtype='datetime64[m]').astype(np.int64)
+    
+    def _reserve(self, extra: int):
+        """内部方法：按倍增策略扩容列数组"""
+        needed = self._size + extra
+        if needed <= len(self._minutes):
+            return
+        capacity = max(needed, len(self._minutes) * 2)
+        for name in ('_minutes', '_tasks', '_durations'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+    
+    def _accumulate(self, minutes: np.ndarray, tasks: np.ndarray, durations: np.ndarray):
+        """内部方法：把一批会话累加到各项聚合中"""
+        if len(tasks) and tasks.max() >= len(self._task_minutes):
+            grown = np.zeros(max(int(tasks.max()) + 1, len(self._task_minutes) * 2), dtype=np.int64)
+            grown[:len(self._task_minutes)] = self._task_minutes
+            self._task_minutes = grown
+        np.add.at(self._task_minutes, tasks, durations)
+        np.add.at(self._hour_minutes, (minutes % 1440) // 60, durations)
+        
+        days = minutes // 1440
+        first_day = int(days.min()) if self._first_day is None else min(self._first_day, int(days.min()))
+        last_day = int(days.max()) if not len(self._day_minutes) else max(
+            self._first_day + len(self._day_minutes) - 1, int(days.max()))
+        if self._first_day != first_day or len(self._day_minutes) != last_day - first_day + 1:
+            grown = np.zeros(last_day - first_day + 1, dtype=np.int64)
+            if self._first_day is not None:
+                offset = self._first_day - first_day
+                grown[offset:offset + len(self._day_minutes)] = self._day_minutes
+            self._first_day, self._day_minutes = first_day, grown
+        np.add.at(self._day_minutes, days - first_day, durations)
+    
+    def append(self, timestamp: str, task_index: int, duration: int):
+        """追加一次学习会话"""
+        self.extend([timestamp], [task_index], [duration])
+    
+    def extend(self, timestamps: Iterable[str], task_indexes: Iterable[int], durations: Iterable[int]):
+        """批量追加学习会话"""
+        minutes = self._parse_minutes(timestamps)
+        tasks = np.asarray(list(task_indexes), dtype=np.int32)
+        durations = np.asarray(list(durations), dtype=np.int32)
+        if not len(minutes):
+            return
+        self._reserve(len(minutes))
+        end = self._size + len(minutes)
+        self._minutes[self._size:end] = minutes
+        self._tasks[self._size:end] = tasks
+        self._durations[self._size:end] = durations
+        self._size = end
+        self._accumulate(minutes, tasks, durations)
+    
+    def remove(self, positions: Iterable[int]):
+        """删除若干会话（按追加顺序的位置），从聚合中扣除，其余会话依次前移"""
+        positions = np.unique(np.fromiter(positions, dtype=np.int64))
+        if not len(positions):
+            return
+        self._accumulate(self._minutes[positions], self._tasks[positions], -self._durations[positions])
+        keep = np.ones(self._size, dtype=bool)
+        keep[positions] = False
+        size = int(keep.sum())
+        for name in ('_minutes', '_tasks', '_durations'):
+            column = getattr(self, name)
+            column[:size] = column[:self._size][keep]
+        self._size = size
+    
+    def task_totals(self) -> Dict[int, int]:
+        """每个任务的累计学习时长（分钟）"""
+        task_ids = np.flatnonzero(self._task_minutes)
+        return dict(zip(task_ids.tolist(), self._task_minutes[task_ids].tolist()))
+    
+    def hour_distribution(self) -> np.ndarray:
+        """一天 24 个小时段的学习时长分布"""
+        return self._hour_minutes.copy()
+    
+    def _daily_series(self, end_day: int, days: int) -> np.ndarray:
+        """内部方法：截至 end_day（含）的连续 days 天每日学习时长"""
+        series = np.zeros(days, dtype=np.int64)
+        if self._first_day is None:
+            return series
+        start_day = end_day - days + 1
+        lo = max(start_day, self._first_day)
+        hi = min(end_day, self._first_day + len(self._day_minutes) - 1)
+        if lo <= hi:
+            series[lo - start_day:hi - start_day + 1] = self._day_minutes[lo - self._first_day:hi - self._first_day + 1]
+        return series
+    
+    def rolling(self, window: int, end_day: int, days: int = 90) -> np.ndarray:
+        """截至 end_day 的最近 days 天中，每天向前 window 天的滚动学习时长"""
+        series = self._daily_series(end_day, days + window - 1)
+        totals = np.concatenate(([0], np.cumsum(series)))
+        return totals[window:] - totals[:-window]
+    
+    def streaks(self, end_day: int) -> Tuple[int, int]:
+        """连续学习天数：(截至 end_day 的当前连续天数, 历史最长连续天数)"""
+        if self._first_day is None:
+            return 0, 0
+        series = self._daily_series(end_day, max(end_day - self._first_day + 1, 1))
+        active = np.concatenate(([False], series > 0, [False]))
+        edges = np.flatnonzero(np.diff(active.astype(np.int8)))
+        runs = edges[1::2] - edges[::2]
+        longest = int(runs.max()) if len(runs) else 0
+        current = int(runs[-1]) if len(runs) and edges[-1] == len(series) else 0
+        return current, longest
+    
+    def summary(self, today: str) -> Dict[str, Any]:
+        """汇总统计：总时长、最近 7/30 天时长、连续学习天数、每日滚动曲线和时段分布；
+        today 由调用方按学习系统的时钟给出"""
+        end_day = int(np.datetime64(today, 'D').astype(np.int64))
+        rolling_7 = self.rolling(7, end_day)
+        rolling_30 = self.rolling(30, end_day)
+        current_streak, longest_streak = self.streaks(end_day)
+        return {
+            'sessions': self._size,
+            'total_minutes': int(self._task_minutes.sum()),
+            'last_7_days': int(rolling_7[-1]),
+            'last_30_days': int(rolling_30[-1]),
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+            'rolling_7': rolling_7,
+            'rolling_30': rolling_30,
+            'hour_distribution': self.hour_distribution(),
+            'task_totals': self.task_totals()
+        }
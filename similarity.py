@@ -0,0 +1,173 @@
+import re
+import zlib
+from typing import Dict, Hashable, Iterable, List, Set
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_TOKEN_RE = re.compile(r'[㐀-鿿豈-﫿]+|[0-9a-zA-Z]+')
+_CJK_RE = re.compile(r'[㐀-鿿豈-﫿]')
+
+
+def shingles(text: str) -> Set[str]:
+    """切分文本：中日韩文字取相邻两字，英文和数字取整个单词"""
+    result = set()
+    for token in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(token) and len(token) > 1:
+            result.update(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            result.add(token)
+    return result
+
+
+class MinHashLSH:
+    """MinHash 签名 + LSH 分桶的近似重复检测，增量聚类相似文本"""
+    
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.5,
+                 max_candidates: int = 8, seed: int = 1):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_candidates = max_candidates  # 每个桶最多比较的已有记录数，防止热门桶退化为平方复杂度
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self._signatures = {}  # 记录键 -> MinHash 签名
+        self._buckets = {}  # (分段, 分段签名) -> 记录键列表
+        self._parent = {}  # 并查集：记录键 -> 父节点
+        self._members = {}  # 并查集根 -> 该组所有记录键
+        self._groups = set()  # 成员数 >= 2 的组的根
+    
+    def __len__(self):
+        return len(self._signatures)
+    
+    def __contains__(self, key: Hashable):
+        return key in self._signatures
+    
+    def signature(self, text: str):
+        """计算文本的 MinHash 签名，无有效内容时返回 None"""
+        tokens = shingles(text)
+        if not tokens:
+            return None
+        hashes = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokens), dtype=np.uint64, count=len(tokens))
+        return ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME).min(axis=0)
+    
+    def _find(self, key: Hashable) -> Hashable:
+        root = key
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[key] != root:
+            self._parent[key], key = root, self._parent[key]
+        return root
+    
+    def _union(self, left: Hashable, right: Hashable):
+        left, right = self._find(left), self._find(right)
+        if left == right:
+            return
+        if len(self._members[left]) < len(self._members[right]):
+            left, right = right, left
+        self._parent[right] = left
+        self._members[left].extend(self._members.pop(right))
+        self._groups.discard(right)
+        self._groups.add(left)
+    
+    def add(self, key: Hashable, text: str) -> bool:
+        """加入一条文本并与相似记录合并为一组；键已存在或文本为空时返回 False"""
+        if key in self._signatures:
+            return False
+        sig = self.signature(text)
+        if sig is None:
+            return False
+        self._insert(key, sig)
+        return True
+    
+    def update(self, key: Hashable, text: str) -> bool:
+        """文本变化后重新聚类：先移除旧记录再加入；文本为空时只移除"""
+        sig = self.signature(text)
+        if key in self._signatures:
+            if sig is not None and np.array_equal(sig, self._signatures[key]):
+                return True
+            self.remove(key)
+        if sig is None:
+            return False
+        self._insert(key, sig)
+        return True
+    
+    def remove(self, key: Hashable) -> bool:
+        """移除一条记录"""
+        return self.remove_many([key]) == 1
+    
+    def remove_many(self, keys: Iterable[Hashable]) -> int:
+        """批量移除记录，返回移除的条数；并查集无法拆分，同组的其余记录仍为一组"""
+        removed = {key for key in keys if key in self._signatures}
+        if not removed:
+            return 0
+        by_root = {}
+        band_keys = set()
+        for key in removed:
+            by_root.setdefault(self._find(key), set()).add(key)
+            sig = self._signatures.pop(key)
+            band_keys.update((band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                             for band in range(self.bands))
+        for band_key in band_keys:
+            bucket = [key for key in self._buckets[band_key] if key not in removed]
+            if bucket:
+                self._buckets[band_key] = bucket
+            else:
+                del self._buckets[band_key]
+        # 组内其余记录直接挂到新的根上（被移除的记录可能是路径上的中间节点）
+        for root, group_removed in by_root.items():
+            members = [key for key in self._members.pop(root) if key not in group_removed]
+            self._groups.discard(root)
+            for key in group_removed:
+                del self._parent[key]
+            if members:
+                for key in members:
+                    self._parent[key] = members[0]
+                self._members[members[0]] = members
+                if len(members) >= 2:
+                    self._groups.add(members[0])
+        return len(removed)
+    
+    def rekey(self, mapping: Dict[Hashable, Hashable]):
+        """记录键整体变化时（如列表删除元素后下标前移）按 旧键 -> 新键 更新，分组不变"""
+        if not mapping:
+            return
+        new_key = lambda key: mapping.get(key, key)
+        self._signatures = {new_key(key): sig for key, sig in self._signatures.items()}
+        self._parent = {new_key(key): new_key(parent) for key, parent in self._parent.items()}
+        self._members = {new_key(root): [new_key(key) for key in members] for root, members in self._members.items()}
+        self._groups = {new_key(root) for root in self._groups}
+        for bucket in self._buckets.values():
+            bucket[:] = [new_key(key) for key in bucket]
+    
+    def _insert(self, key: Hashable, sig):
+        self._signatures[key] = sig
+        self._parent[key] = key
+        self._members[key] = [key]
+        # 同一组只需比较一个代表，避免重复计算相似度
+        candidates = {}
+        for band in range(self.bands):
+            band_key = (band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+            bucket = self._buckets.setdefault(band_key, [])
+            for other in bucket[:1] + bucket[-self.max_candidates:]:
+                candidates.setdefault(self._find(other), other)
+            bucket.append(key)
+        if candidates:
+            others = list(candidates.values())
+            matches = (np.stack([self._signatures[other] for other in others]) == sig).mean(axis=1)
+            for other, score in zip(others, matches):
+                if score >= self.threshold:
+                    self._union(key, other)
+    
+    def similar(self, key: Hashable) -> List[Hashable]:
+        """获取与某条记录同组的其他记录"""
+        if key not in self._parent:
+            return []
+        return [other for other in self._members[self._find(key)] if other != key]
+    
+    def groups(self, min_size: int = 2) -> List[List[Hashable]]:
+        """获取所有相似组，按组大小降序"""
+        groups = [self._members[root] for root in self._groups if len(self._members[root]) >= min_size]
+        return sorted(groups, key=len, reverse=True)
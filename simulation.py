@@ -0,0 +1,214 @@
+"""快进模拟：为多个虚拟学习者注入手动时钟，在几秒内跑完数月的学习、复习和实战检验循环，
+用于调整复习调度参数并观察状态随时间的增长
+
+用法：
+    python3 simulation.py --learners 20 --days 90
+    python3 simulation.py --learners 200 --days 180 --workers 8 --expiry-days 3 --json sim.json
+"""
+import argparse
+import datetime
+import json
+import math
+import random
+import time
+from concurrent.futures import as_completed
+from typing import Any, Dict, List, Optional
+
+from clock import MANUAL_CLOCK_EPOCH, ManualClock
+
+RECALL_OUTCOMES = ("能回忆起", "部分回忆", "无法回忆")
+DEFAULT_PROFILE = {
+    'tasks': 12,  # 学习目标拆出的任务数
+    'study_days_per_week': 5,  # 平均每周学习天数
+    'sessions_per_day': 2,  # 学习日的番茄钟数
+    'summary_rate': 0.6,  # 当天补写总结的概率
+    'review_rate': 0.8,  # 完成睡前/晨间复习的概率
+    'practice_rate': 0.3,  # 学习日做一次实战检验的概率
+    'stability_days': 2.0,  # 新笔记的记忆稳定性（天），每次复习后增长
+}
+
+
+def _recall(rng: random.Random, age_days: float, stability: float) -> str:
+    """遗忘曲线 R = exp(-t / S) 抽样回忆结果"""
+    retention = math.exp(-age_days / stability)
+    draw = rng.random()
+    if draw < retention:
+        return RECALL_OUTCOMES[0]
+    return RECALL_OUTCOMES[1] if draw < retention + (1 - retention) / 2 else RECALL_OUTCOMES[2]
+
+
+def _state_bytes(study_system) -> int:
+    return len(json.dumps(study_system.export_state(), ensure_ascii=False).encode('utf-8'))
+
+
+def simulate_learner(learner_id: int, days: int, seed: int = 0, start: Optional[str] = None,
+                     profile: Optional[Dict[str, float]] = None, sample_every: int = 7,
+                     expiry_days: Optional[int] = None, cold_after_days: Optional[int] = None) -> Dict[str, Any]:
+    """模拟一个学习者 days 天的学习循环，返回每日指标和按 sample_every 天采样的状态大小"""
+    from app import DeepLearningSystem
+
+    profile = {**DEFAULT_PROFILE, **(profile or {})}
+    rng = random.Random(seed * 1_000_003 + learner_id)
+    start_day = datetime.date.fromisoformat(start) if start else MANUAL_CLOCK_EPOCH.date()
+    clock = ManualClock(datetime.datetime.combine(start_day, datetime.time(7)))
+    study_system = DeepLearningSystem(cold_after_days=cold_after_days, clock=clock)
+    if expiry_days is not None:
+        study_system.REVIEW_EXPIRY_DAYS = expiry_days
+
+    study_system.set_learning_goal(f"虚拟学习者{learner_id}的目标")
+    modules = [f"模块{i}" for i in range(max(1, int(profile['tasks']) // 4))]
+    study_system.break_down_modules(modules)
+    study_system.create_minimal_tasks([{'name': f"任务{i}", 'description': f"第 {i} 个最小学习单元",
+                                        'module': modules[i % len(modules)]} for i in range(int(profile['tasks']))])
+    task_ids = [task_index for task_index, _ in study_system.get_goal_tasks()]
+    stability: Dict[str, float] = {}  # note_id -> 记忆稳定性（天）
+    created: Dict[str, datetime.datetime] = {}
+
+    daily = []
+    samples = []
+    for day in range(days):
+        today = start_day + datetime.timedelta(days=day)
+        day_stats = {'day': day, 'sessions': 0, 'notes': 0, 'morning_reviews': 0, 'recalls': 0,
+                     'recalled': 0, 'practices': 0, 'weak_points': 0}
+
+        # 07:00 晨间复习
+        clock.set(datetime.datetime.combine(today, datetime.time(7)))
+        queue = study_system.get_review_queue(today.isoformat())
+        if queue and rng.random() < profile['review_rate']:
+            study_system.morning_review()
+            day_stats['morning_reviews'] = len(queue)
+            for entry in queue:
+                stability[entry['note_id']] = stability.get(entry['note_id'], profile['stability_days']) * 1.5
+
+        # 09:00 起按番茄钟学习
+        studying = rng.random() < profile['study_days_per_week'] / 7
+        today_notes = []
+        if studying:
+            for session in range(int(profile['sessions_per_day'])):
+                clock.set(datetime.datetime.combine(today, datetime.time(9 + session)))
+                task_index = task_ids[rng.randrange(len(task_ids))]
+                note_id, _ = study_system.start_study_session(task_index)
+                study_system.save_note(note_id, f"第 {day} 天第 {session} 个番茄钟的主笔记：" + "要点；" * rng.randint(5, 40),
+                                       "\n".join(f"问题{q}？" for q in range(rng.randint(1, 5))), "")
+                if rng.random() < profile['summary_rate']:
+                    study_system.review_and_summarize(note_id, f"第 {day} 天的总结")
+                stability[note_id] = profile['stability_days']
+                created[note_id] = clock.now()
+                today_notes.append(note_id)
+                day_stats['sessions'] += 1
+                day_stats['notes'] += 1
+
+            # 20:00 实战检验：得分取决于该任务笔记的平均记忆保持率
+            if rng.random() < profile['practice_rate']:
+                clock.set(datetime.datetime.combine(today, datetime.time(20)))
+                task_index = task_ids[rng.randrange(len(task_ids))]
+                notes = study_system.get_task_notes(task_index)
+                retention = (sum(math.exp(-(clock.now() - created[n]).total_seconds() / 86400 / stability[n])
+                                 for n in notes) / len(notes)) if notes else 0.3
+                score = max(0, min(100, int(rng.gauss(50 + 50 * retention, 10))))
+                study_system.practice_testing(task_index, score, f"任务{task_index}的薄弱环节",
+                                              "记不清关键步骤" if score < 60 else "")
+                day_stats['practices'] += 1
+                day_stats['weak_points'] += score < 80
+
+        # 22:30 睡前复习：回忆当天的笔记，没完全记住的安排次日晨间复习
+        if today_notes and rng.random() < profile['review_rate']:
+            clock.set(datetime.datetime.combine(today, datetime.time(22, 30)))
+            results = {note_id: _recall(rng, 0.5, stability[note_id]) for note_id in today_notes}
+            focus = {note_id: "重点公式和定义" for note_id, outcome in results.items() if outcome != RECALL_OUTCOMES[0]}
+            study_system.evening_review(results, focus)
+            day_stats['recalls'] = len(results)
+            day_stats['recalled'] = sum(outcome == RECALL_OUTCOMES[0] for outcome in results.values())
+
+        daily.append(day_stats)
+        if (sample_every and (day + 1) % sample_every == 0) or day == days - 1:
+            samples.append({'day': day, 'notes': len(study_system.notes),
+                            'state_bytes': _state_bytes(study_system),
+                            'memory_bytes': study_system.get_memory_usage(1)['total_bytes'],
+                            'cold_notes': study_system.get_tiering_stats()['cold_notes'],
+                            'pending_reviews': sum(len(reviews) for reviews in study_system.review_schedule.values())})
+
+    return {'learner': learner_id, 'daily': daily, 'samples': samples,
+            'recall_counts': study_system.get_recall_counts(),
+            'progress': study_system.get_goal_progress()}
+
+
+def aggregate(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总所有学习者：每日合计指标、各采样点的平均状态大小和总体回忆率"""
+    days = len(results[0]['daily']) if results else 0
+    daily = []
+    for day in range(days):
+        rows = [result['daily'][day] for result in results]
+        totals = {key: sum(row[key] for row in rows) for key in rows[0] if key != 'day'}
+        totals['day'] = day
+        totals['recall_rate'] = totals['recalled'] / totals['recalls'] if totals['recalls'] else None
+        daily.append(totals)
+    samples = []
+    for i in range(len(results[0]['samples']) if results else 0):
+        rows = [result['samples'][i] for result in results]
+        samples.append({'day': rows[0]['day'],
+                        **{key: sum(row[key] for row in rows) / len(rows) for key in rows[0] if key != 'day'}})
+    recall_counts = {outcome: sum(result['recall_counts'].get(outcome, 0) for result in results)
+                     for outcome in RECALL_OUTCOMES}
+    recalls = sum(recall_counts.values())
+    scores = [result['progress']['avg_score'] for result in results if result['progress']['avg_score'] is not None]
+    return {
+        'learners': len(results),
+        'days': days,
+        'daily': daily,
+        'samples': samples,
+        'recall_counts': recall_counts,
+        'recall_rate': recall_counts[RECALL_OUTCOMES[0]] / recalls if recalls else None,
+        'avg_score': sum(scores) / len(scores) if scores else None
+    }
+
+
+def run_simulation(learners: int, days: int, seed: int = 0, workers: int = 1, **options) -> Dict[str, Any]:
+    """模拟 learners 个学习者；workers > 1 时在进程池中并行"""
+    started = time.perf_counter()
+    if workers > 1:
+        from weekly_report import make_pool
+        with make_pool(workers) as pool:
+            futures = [pool.submit(simulate_learner, i, days, seed, **options) for i in range(learners)]
+            results = sorted((future.result() for future in as_completed(futures)), key=lambda r: r['learner'])
+    else:
+        results = [simulate_learner(i, days, seed, **options) for i in range(learners)]
+    summary = aggregate(results)
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="快进模拟虚拟学习者的学习与复习循环")
+    parser.add_argument("--learners", type=int, default=10, help="虚拟学习者人数")
+    parser.add_argument("--days", type=int, default=90, help="模拟天数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（相同参数结果可重复）")
+    parser.add_argument("--start", help=f"模拟起始日期 YYYY-MM-DD（默认 {MANUAL_CLOCK_EPOCH.date()}）")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数")
+    parser.add_argument("--sample-every", type=int, default=7, help="每隔多少天采样一次状态大小")
+    parser.add_argument("--expiry-days", type=int, help="覆盖逾期晨间复习的顺延天数（REVIEW_EXPIRY_DAYS）")
+    parser.add_argument("--cold-after-days", type=int, help="覆盖笔记转冷的天数")
+    parser.add_argument("--review-rate", type=float, help="完成复习的概率（0~1）")
+    parser.add_argument("--json", help="把完整结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    profile = {'review_rate': args.review_rate} if args.review_rate is not None else None
+    summary = run_simulation(args.learners, args.days, args.seed, args.workers, start=args.start,
+                             profile=profile, sample_every=args.sample_every, expiry_days=args.expiry_days,
+                             cold_after_days=args.cold_after_days)
+
+    print(f"模拟 {summary['learners']} 名学习者 × {summary['days']} 天，用时 {summary['seconds']:.1f} 秒")
+    rate = f"{summary['recall_rate']:.1%}" if summary['recall_rate'] is not None else "-"
+    score = f"{summary['avg_score']:.1f}" if summary['avg_score'] is not None else "-"
+    print(f"睡前回忆率 {rate}，实战检验平均分 {score}\n")
+    print(f"{'天':>5} {'人均笔记':>8} {'状态快照(KB)':>12} {'内存占用(KB)':>12} {'冷笔记':>8} {'待复习':>8}")
+    for sample in summary['samples']:
+        print(f"{sample['day'] + 1:>5} {sample['notes']:>8.1f} {sample['state_bytes'] / 1024:>12.1f} "
+              f"{sample['memory_bytes'] / 1024:>12.1f} {sample['cold_notes']:>8.1f} {sample['pending_reviews']:>8.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
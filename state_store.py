@@ -0,0 +1,122 @@
+import contextlib
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class SQLiteStateStore:
+    """多进程共享的状态库：SQLite WAL 模式下的操作日志 + 快照，seq 为单调递增的变更序号"""
+    
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._in_transaction = False
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ops ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, method TEXT NOT NULL, "
+                "args TEXT NOT NULL, kwargs TEXT NOT NULL, at TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "seq INTEGER NOT NULL, state TEXT NOT NULL)")
+            # 与快照同时保存的 Merkle 叶子摘要，载入快照时不必重新计算
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS merkle (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "seq INTEGER NOT NULL, leaves TEXT NOT NULL)")
+            # 与其他状态库上次同步完成时两边的变更序号
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_peers (peer TEXT PRIMARY KEY, "
+                "local_seq INTEGER NOT NULL, peer_seq INTEGER NOT NULL)")
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """写事务：BEGIN IMMEDIATE 保证同一时间只有一个进程在追加操作"""
+        with self._lock:
+            if self._in_transaction:
+                yield
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._in_transaction = True
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+    
+    def latest_seq(self) -> int:
+        """最新的变更序号（快照压缩后依然单调递增）"""
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ops'").fetchone()
+            return row[0] if row else 0
+    
+    def append_op(self, method: str, args: Tuple, kwargs: Dict[str, Any], at: str) -> int:
+        """追加一条操作，返回其变更序号"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO ops (method, args, kwargs, at) VALUES (?, ?, ?, ?)",
+                (method, json.dumps(list(args), ensure_ascii=False),
+                 json.dumps(kwargs, ensure_ascii=False), at))
+            return cursor.lastrowid
+    
+    def read_ops(self, after_seq: int) -> List[Tuple[int, str, List, Dict[str, Any], str]]:
+        """读取 after_seq 之后的所有操作"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, method, args, kwargs, at FROM ops WHERE seq > ? ORDER BY seq", (after_seq,)).fetchall()
+        return [(seq, method, json.loads(args), json.loads(kwargs), at) for seq, method, args, kwargs, at in rows]
+    
+    def snapshot_seq(self) -> int:
+        """当前快照对应的变更序号，没有快照时为 0"""
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM snapshot WHERE id = 0").fetchone()
+            return row[0] if row else 0
+    
+    def load_snapshot(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """读取快照，返回 (变更序号, 状态)"""
+        with self._lock:
+            row = self._conn.execute("SELECT seq, state FROM snapshot WHERE id = 0").fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+    
+    def save_snapshot(self, seq: int, state: Dict[str, Any], merkle: Optional[Dict[str, Dict[str, str]]] = None):
+        """保存 seq 时刻的完整状态（可附带各类数据的 Merkle 叶子摘要），并删除已被快照覆盖的操作"""
+        with self.transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshot (id, seq, state) VALUES (0, ?, ?)",
+                (seq, json.dumps(state, ensure_ascii=False)))
+            if merkle is None:
+                self._conn.execute("DELETE FROM merkle")
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO merkle (id, seq, leaves) VALUES (0, ?, ?)",
+                    (seq, json.dumps(merkle, ensure_ascii=False)))
+            self._conn.execute("DELETE FROM ops WHERE seq <= ?", (seq,))
+    
+    def load_merkle(self) -> Optional[Tuple[int, Dict[str, Dict[str, str]]]]:
+        """读取与快照一同保存的 Merkle 叶子摘要，返回 (变更序号, {数据类别: {键: 摘要}})"""
+        with self._lock:
+            row = self._conn.execute("SELECT seq, leaves FROM merkle WHERE id = 0").fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+    
+    def peer_seqs(self, peer: str) -> Optional[Tuple[int, int]]:
+        """与 peer 上次同步完成时的 (本库变更序号, 对方变更序号)，从未同步过时为 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT local_seq, peer_seq FROM sync_peers WHERE peer = ?", (peer,)).fetchone()
+        return tuple(row) if row else None
+    
+    def set_peer_seqs(self, peer: str, local_seq: int, peer_seq: int):
+        """记录与 peer 同步完成时两边的变更序号"""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sync_peers (peer, local_seq, peer_seq) VALUES (?, ?, ?)",
+                               (peer, local_seq, peer_seq))
@@ -0,0 +1,77 @@
+import bisect
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class TimestampIndex:
+    """按 ISO 时间戳排序的索引，支持基于二分查找的区间查询"""
+    
+    def __init__(self):
+        self._timestamps = []  # 已排序的 ISO 时间戳
+        self._keys = []  # 与时间戳一一对应的记录键
+    
+    def __len__(self):
+        return len(self._timestamps)
+    
+    def add(self, timestamp: str, key: Any):
+        """插入一条记录（按时间顺序追加时为 O(1)）"""
+        if not self._timestamps or timestamp >= self._timestamps[-1]:
+            self._timestamps.append(timestamp)
+            self._keys.append(key)
+            return
+        pos = bisect.bisect_right(self._timestamps, timestamp)
+        self._timestamps.insert(pos, timestamp)
+        self._keys.insert(pos, key)
+    
+    def remove(self, timestamp: str, key: Any) -> bool:
+        """删除一条记录"""
+        lo = bisect.bisect_left(self._timestamps, timestamp)
+        hi = bisect.bisect_right(self._timestamps, timestamp)
+        for pos in range(lo, hi):
+            if self._keys[pos] == key:
+                del self._timestamps[pos]
+                del self._keys[pos]
+                return True
+        return False
+    
+    def remap(self, mapping: Dict[Any, Any]):
+        """记录键整体变化时（如列表删除元素后下标前移）按 旧键 -> 新键 更新，时间顺序不变"""
+        self._keys = [mapping.get(key, key) for key in self._keys]
+    
+    def _bounds(self, start: str, end: str) -> Tuple[int, int]:
+        return bisect.bisect_left(self._timestamps, start), bisect.bisect_left(self._timestamps, end)
+    
+    def range(self, start: str, end: str) -> List[Any]:
+        """获取 start <= 时间戳 < end 的记录键（可直接传入 YYYY-MM-DD 日期）"""
+        lo, hi = self._bounds(start, end)
+        return self._keys[lo:hi]
+    
+    def count(self, start: str, end: str) -> int:
+        """统计 start <= 时间戳 < end 的记录数"""
+        lo, hi = self._bounds(start, end)
+        return hi - lo
+    
+    def page(self, after: Optional[Tuple[str, Any, int]], limit: int) -> Tuple[List[Any], Optional[Tuple[str, Any, int]]]:
+        """按时间顺序分页：after 为上一页返回的游标 (时间戳, 记录键, 位置)，返回 (记录键, 下一页游标)；
+        期间有插入或删除时按时间戳和记录键重新定位"""
+        pos = 0
+        if after is not None:
+            timestamp, key, hint = after
+            if 0 <= hint < len(self._keys) and self._timestamps[hint] == timestamp and self._keys[hint] == key:
+                pos = hint + 1
+            else:
+                lo = bisect.bisect_left(self._timestamps, timestamp)
+                hi = bisect.bisect_right(self._timestamps, timestamp)
+                pos = next((p + 1 for p in range(lo, hi) if self._keys[p] == key), min(max(hint, lo), hi))
+        keys = self._keys[pos:pos + limit]
+        end = pos + len(keys)
+        cursor = (self._timestamps[end - 1], self._keys[end - 1], end - 1) if keys and end < len(self._keys) else None
+        return keys, cursor
+    
+    def latest(self, n: int) -> List[Any]:
+        """获取最近的 n 条记录键（从新到旧）"""
+        return self._keys[:-n - 1:-1] if n > 0 else []
+    
+    def count_buckets(self, boundaries: List[str]) -> List[int]:
+        """按相邻边界统计每个区间的记录数，边界需升序排列"""
+        positions = [bisect.bisect_left(self._timestamps, b) for b in boundaries]
+        return [hi - lo for lo, hi in zip(positions, positions[1:])]
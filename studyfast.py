@@ -1,12 +1,17 @@
+import atexit
 import json
 import datetime
+import os
 import time
 from typing import Dict, List, Any, Optional
 
+from clock import Clock, ManualClock, SystemClock
+
 class DeepLearningSystem:
     """目标导向的深度学习循环系统"""
     
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None):
+        self.clock = clock or SystemClock()  # 当前时间的来源（注入手动时钟即可快进到次日）
         self.current_goal = None
         self.knowledge_modules = []
         self.minimal_tasks = []
@@ -15,6 +20,10 @@ class DeepLearningSystem:
         self.study_sessions = []  # 学习会话记录
         self.review_schedule = {}  # 复习计划
         
+    def _now(self) -> datetime.datetime:
+        """内部方法：当前时间"""
+        return self.clock.now()
+        
     def set_learning_goal(self, goal: str):
         """第一阶段：设定学习目标"""
         self.current_goal = goal
@@ -52,20 +61,20 @@ class DeepLearningSystem:
         time.sleep(2)  # 仅模拟等待，实际学习时可删除
         
         # 创建康奈尔笔记（交互输入）
-        note_id = f"note_{task_index}_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}"
+        note_id = f"note_{task_index}_{self._now().strftime('%Y%m%d_%H%M')}"
         self.notes[note_id] = {
             'task_id': task_index,
             'main_notes': input("📝 请在主笔记区记录核心内容: "),
             'key_questions': input("❓ 请在左侧线索栏记录关键问题: "),
             'summary': "",
-            'created_at': datetime.datetime.now().isoformat()
+            'created_at': self._now().isoformat()
         }
         
         print("✅ 学习会话完成，笔记已保存")
         self.study_sessions.append({
             'task_index': task_index,
             'duration': duration_minutes,
-            'timestamp': datetime.datetime.now().isoformat()
+            'timestamp': self._now().isoformat()
         })
         
         return self
@@ -82,7 +91,7 @@ class DeepLearningSystem:
     
     def _get_today_notes(self):
         """内部方法：获取今日创建的笔记"""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        today = self._now().strftime("%Y-%m-%d")
         return {
             note_id: note 
             for note_id, note in self.notes.items() 
@@ -91,7 +100,7 @@ class DeepLearningSystem:
     
     def _schedule_morning_review(self, note_id: str, focus_point: str):
         """内部方法：添加晨间复习计划"""
-        tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
+        tomorrow = self._now() + datetime.timedelta(days=1)
         tomorrow_date = tomorrow.strftime("%Y-%m-%d")
         if tomorrow_date not in self.review_schedule:
             self.review_schedule[tomorrow_date] = {}
@@ -99,7 +108,7 @@ class DeepLearningSystem:
     
     def _get_today_morning_reviews(self):
         """内部方法：获取今日的晨间复习任务"""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        today = self._now().strftime("%Y-%m-%d")
         return self.review_schedule.get(today, {})
     
     def evening_review(self):
@@ -144,7 +153,7 @@ class DeepLearningSystem:
             input("💪 快速回顾并背诵重点内容，完成后按回车: ")
         
         # 完成后清空今日晨间复习记录
-        today_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        today_date = self._now().strftime("%Y-%m-%d")
         if today_date in self.review_schedule:
             del self.review_schedule[today_date]
         
@@ -187,7 +196,7 @@ class DeepLearningSystem:
                     'weak_point': weak_point,
                     'blind_spot': blind_spot,
                     'practice_score': score,
-                    'record_time': datetime.datetime.now().isoformat()
+                    'record_time': self._now().isoformat()
                 })
                 print("\n✅ 薄弱点已记录！建议重新执行“学习会话+复习”流程攻克")
         else:
@@ -217,8 +226,16 @@ if __name__ == "__main__":
     print("🎯 目标导向的深度学习循环系统 启动")
     print("="*50)
     
-    # 1. 初始化系统
-    study_system = DeepLearningSystem()
+    # 1. 初始化系统（使用手动时钟，演示中可直接快进到次日；
+    #    设置 STUDYFAST_TRACE 时录制本次操作，可用 action_trace.py 重放）
+    clock = ManualClock()
+    study_system = DeepLearningSystem(clock=clock)
+    trace_path = os.environ.get("STUDYFAST_TRACE")
+    if trace_path:
+        from action_trace import TraceRecorder, TracedSystem
+        recorder = TraceRecorder(trace_path, target="studyfast.DeepLearningSystem")
+        atexit.register(recorder.close)
+        study_system = TracedSystem(study_system, recorder, capture_input=True)
     
     # 2. 第一阶段：设定目标+拆解模块+创建任务（示例：学习Python基础）
     study_system.set_learning_goal("3天掌握Python基础语法")
@@ -258,9 +275,10 @@ if __name__ == "__main__":
     print("-"*30)
     study_system.evening_review()
     
-    # 6. 第三阶段：晨间复习（模拟次日操作，需手动切换日期测试，此处仅演示流程）
+    # 6. 第三阶段：晨间复习（时钟快进到次日早上 7 点）
+    clock.set(datetime.datetime.combine(clock.now().date() + datetime.timedelta(days=1), datetime.time(7)))
     print("\n" + "-"*30)
-    print("🌅 模拟次日晨间复习（强化记忆）")
+    print(f"🌅 次日晨间复习（时钟已快进到 {clock.now():%Y-%m-%d %H:%M}）")
     print("-"*30)
     study_system.morning_review()
     
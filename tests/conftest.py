@@ -0,0 +1,19 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clock import ManualClock  # noqa: E402
+
+
+@pytest.fixture
+def clock():
+    return ManualClock(datetime.datetime(2030, 1, 7, 9))
+
+
+@pytest.fixture
+def state_db(tmp_path):
+    return str(tmp_path / "state.db")
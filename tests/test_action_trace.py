@@ -0,0 +1,40 @@
+import pytest
+
+from action_trace import TraceRecorder, TracedSystem, read_trace, replay
+from app import DeepLearningSystem
+
+
+def _record(path):
+    recorder = TraceRecorder(str(path))
+    system = TracedSystem(DeepLearningSystem(), recorder)
+    system.set_learning_goal("目标")
+    task = system.add_task("任务", "描述")
+    system.save_note(f"note_{task}_0", "答案", "问题一？\n问题二？", "")
+    deck = system.build_drill_deck(None, seed=7)
+    card = system.draw_flashcard(deck)
+    deck.grade(card['card'], "能回忆起")
+    system.draw_flashcard(deck)
+    system.grade_drill(deck.take_graded())
+    return recorder, system
+
+
+def test_drill_deck_round_trip(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    recorder, _ = _record(path)
+    recorder.close()
+
+    _, events = read_trace(str(path))
+    build = next(event for event in events if event[2] == 'build_drill_deck')
+    draws = [event for event in events if event[2] == 'draw_flashcard']
+    assert draws and all(event[3] == [{'__ref__': build[8]}] for event in draws)
+
+    result = replay(str(path), users=2)
+    assert result['errors'] == 0, result['error_samples']
+    assert result['calls'] == 2 * len(events)
+
+
+def test_unserializable_argument_fails_loudly(tmp_path):
+    recorder, system = _record(tmp_path / "trace.jsonl.gz")
+    with pytest.raises(TypeError):
+        system.get_flashcard_count(object())
+    recorder.close()
@@ -0,0 +1,110 @@
+import pytest
+
+from app import DeepLearningSystem
+from http_api import ApiError, StudyApi
+from state_store import SQLiteStateStore
+
+
+def _replicas(state_db, clock):
+    first = DeepLearningSystem(clock=clock).attach_store(SQLiteStateStore(state_db))
+    second = DeepLearningSystem(clock=clock).attach_store(SQLiteStateStore(state_db))
+    return first, second
+
+
+def test_failed_batch_restores_memory_and_store_seq(state_db, clock):
+    a, b = _replicas(state_db, clock)
+    a.set_learning_goal("目标")
+    task = a.add_task("任务", "描述")
+    a.save_note(f"note_{task}_0", "主笔记", "问题？", "")
+    before, tag = a.export_state(), a.state_tag()
+
+    with pytest.raises(RuntimeError):
+        with a.batch():
+            a.save_note(f"note_{task}_1", "主笔记", "问题？", "")
+            a.practice_testing(task, 40, "薄弱点", "")
+            raise RuntimeError("中途失败")
+
+    assert a.export_state() == before
+    assert a.state_tag() == tag
+    assert [note_id for note_id, _ in a.search_notes()] == [f"note_{task}_0"]
+    assert a.get_recurring_weak_points() == []
+    b.sync()
+    assert b.export_state() == a.export_state()
+
+    # 回滚之后两端继续正常写入和同步
+    a.save_note(f"note_{task}_2", "主笔记", "问题？", "")
+    b.sync()
+    assert b.export_state() == a.export_state()
+    assert a.state_tag() == b.state_tag()
+
+
+def test_failed_batch_without_store_keeps_completed_writes(clock):
+    system = DeepLearningSystem(clock=clock)
+    system.set_learning_goal("目标")
+    system.add_task("任务", "描述")
+
+    with pytest.raises(ValueError):
+        with system.batch():
+            system.add_task("新任务", "描述")
+            raise ValueError
+
+    assert [name for _, name in system.search_tasks("新任务")] == ["新任务"]
+    rebuilt = DeepLearningSystem(clock=clock).load_state(system.export_state())
+    assert rebuilt.search_tasks("") == system.search_tasks("")
+
+
+def test_batch_does_not_snapshot_state(state_db, clock, monkeypatch):
+    system = DeepLearningSystem(clock=clock).attach_store(SQLiteStateStore(state_db))
+    system.set_learning_goal("目标")
+    task = system.add_task("任务", "描述")
+
+    def fail():
+        raise AssertionError("batch 不应导出完整状态")
+
+    monkeypatch.setattr(system, "export_state", fail)
+    with system.batch():
+        system.practice_testing(task, 90)
+    assert system.get_task_progress(task)['score_count'] == 1
+
+
+def test_api_batch_error_rolls_back_every_item(state_db, clock, monkeypatch):
+    a, b = _replicas(state_db, clock)
+    a.set_learning_goal("目标")
+    task = a.add_task("任务", "描述")
+    api = StudyApi(a)
+
+    record_recall = a.record_recall
+    calls = []
+
+    def fail_second(*args, **kwargs):
+        # 第一条正常写入，第二条出现意外错误
+        calls.append(args)
+        if len(calls) > 1:
+            raise RuntimeError("磁盘错误")
+        return record_recall(*args, **kwargs)
+
+    monkeypatch.setattr(a, "record_recall", fail_second)
+    saved = api.dispatch("POST", "/api/notes/batch", {}, {'items': [{'task_id': task, 'main_notes': "笔记"}]})
+    note_id = saved['results'][0]['result']['note_id']
+    with pytest.raises(ApiError) as error:
+        api.dispatch("POST", "/api/recalls/batch", {}, {'items': [{'note_id': note_id, 'outcome': "能回忆起"}] * 2})
+    assert error.value.status == 500
+    assert len(calls) == 2
+    assert a.get_recall_history(note_id) == []
+    b.sync()
+    assert b.export_state() == a.export_state()
+
+
+def test_etag_matches_across_replicas(state_db, clock):
+    a, b = _replicas(state_db, clock)
+    a.set_learning_goal("目标")
+    a.add_task("任务", "描述")
+    b.get_review_queue(clock.now().date().isoformat())  # 只读调用可能改变本地版本
+    assert StudyApi(a).version() == StudyApi(b).version()
+    b.add_task("另一个任务", "描述")
+    assert StudyApi(a).version() == StudyApi(b).version()
+
+
+def test_etag_differs_between_unshared_instances(clock):
+    a, b = DeepLearningSystem(clock=clock), DeepLearningSystem(clock=clock)
+    assert a.state_tag() != b.state_tag()
@@ -0,0 +1,49 @@
+import datetime
+import threading
+
+from app import DeepLearningSystem
+from state_store import SQLiteStateStore
+
+
+def test_readers_during_sweeps_keep_replicas_consistent(state_db, clock):
+    system = DeepLearningSystem(clock=clock).attach_store(SQLiteStateStore(state_db))
+    system.set_learning_goal("目标")
+    system.create_minimal_tasks([{'name': f"任务{i}", 'description': ""} for i in range(5)])
+    note_ids = []
+    for i in range(200):
+        note_id = f"note_{i % 5}_{i}"
+        system.save_note(note_id, "主笔记", "问题？", "")
+        note_ids.append(note_id)
+    system.evening_review({note_id: "无法回忆" for note_id in note_ids}, {note_id: "重点" for note_id in note_ids})
+
+    errors = []
+    stop = threading.Event()
+    start = clock.now().date()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                for offset in range(10):
+                    system.get_review_queue((start + datetime.timedelta(days=offset)).isoformat())
+                system.get_next_actions()
+            except Exception as exc:
+                errors.append(exc)
+                stop.set()
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        for day in range(12):
+            clock.advance(days=1)
+            batch = note_ids[day::12]
+            system.evening_review({note_id: "部分回忆" for note_id in batch}, {note_id: "重点" for note_id in batch})
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert not errors
+    replica = DeepLearningSystem(clock=clock).attach_store(SQLiteStateStore(state_db))
+    assert replica.review_schedule == system.review_schedule
+    assert replica.export_state() == system.export_state()
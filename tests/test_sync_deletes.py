@@ -0,0 +1,56 @@
+from app import DeepLearningSystem
+from merkle_sync import SYNC_COLLECTIONS, sync_systems
+
+
+def _populate(system):
+    system.set_learning_goal("目标")
+    tasks = [system.add_task(f"任务{i}", "描述") for i in range(4)]
+    for task in tasks:
+        for j in range(3):
+            system.save_note(f"note_{task}_{j}", f"主笔记 变量 类型 {task} {j}", f"问题{j}？", "")
+            system.practice_testing(task, 40 + j, f"薄弱点{task}{j} 类型转换", "盲区")
+    system.evening_review({}, {f"note_{task}_0": "重点" for task in tasks})
+    return tasks
+
+
+def _view(system):
+    """通过公开接口读取的派生数据"""
+    return {
+        'progress': system.get_goal_progress(),
+        'tasks': sorted(system.search_tasks("", 100, goal_only=False)),
+        'notes': sorted(system.search_notes("问题", 100)),
+        'weak_groups': sorted(sorted(point['weak_point'] for point in group)
+                              for group in system.get_recurring_weak_points()),
+        'note_groups': sorted(map(sorted, system.get_similar_note_groups())),
+        'next_actions': system.get_next_actions(10),
+        'merkle': {collection: system.merkle_root(collection) for collection in SYNC_COLLECTIONS},
+    }
+
+
+def test_delete_task_matches_full_rebuild(clock):
+    system = DeepLearningSystem(clock=clock)
+    tasks = _populate(system)
+    system.delete_task(tasks[1])
+    rebuilt = DeepLearningSystem(clock=clock).load_state(system.export_state())
+    assert _view(system) == _view(rebuilt)
+
+
+def test_sync_does_not_recreate_deleted_task_content(clock):
+    local, remote = DeepLearningSystem(clock=clock), DeepLearningSystem(clock=clock)
+    tasks = _populate(local)
+    sync_systems(local, remote)
+    assert len(remote.notes) == 12
+
+    clock.advance(minutes=5)
+    local.delete_task(tasks[1])
+    sync_systems(local, remote)
+    sync_systems(local, remote)
+
+    for system in (local, remote):
+        assert len(system.notes) == 9
+        assert len(system.weak_points) == 9
+        assert not any(note_id.startswith(f"note_{tasks[1]}_") for note_id in system.notes)
+    assert all(local.merkle_root(collection) == remote.merkle_root(collection) for collection in SYNC_COLLECTIONS)
+    # 再次同步没有差异
+    stats = sync_systems(local, remote)
+    assert stats['sent_to_local'] == stats['sent_to_remote'] == 0
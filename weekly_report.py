@@ -0,0 +1,266 @@
+"""学习周报：在进程池中基于 export_state 导出的状态快照生成，输出自包含的 HTML 和 JSON
+
+用法（例如每晚定时为所有用户的状态库批量生成上周周报）：
+    python3 weekly_report.py --out reports/ alice.db bob.db
+"""
+import argparse
+import collections
+import datetime
+import html
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from clock import SystemClock
+from recall_log import RECALL_OUTCOMES, RECALL_RETENTION
+
+TOP_WEAK_POINTS = 5  # 周报中列出的高频薄弱点数
+
+
+def week_bounds(week_start: Optional[str] = None,
+                today: Optional[datetime.date] = None) -> Tuple[datetime.date, datetime.date]:
+    """周报覆盖的 [周一, 下周一)；默认为 today（学习系统时钟的日期）之前一个完整的自然周"""
+    if week_start:
+        start = datetime.date.fromisoformat(week_start)
+    else:
+        today = today or SystemClock().now().date()
+        start = today - datetime.timedelta(days=today.weekday() + 7)
+    start -= datetime.timedelta(days=start.weekday())
+    return start, start + datetime.timedelta(days=7)
+
+
+def _has_summary(note: Dict[str, Any]) -> bool:
+    """总结栏是否已填写（正文在内容存储中时看引用里的大小）"""
+    if 'summary' in note:
+        return bool(note['summary'])
+    return bool(note.get('bodies', {}).get('summary', {}).get('size'))
+
+
+def _period_stats(state: Dict[str, Any], start: str, end: str, recall_days: Tuple[int, int]) -> Dict[str, Any]:
+    """统计 [start, end) 内的学习时长、笔记、总结、薄弱点和回忆结果"""
+    sessions = [s for s in state['study_sessions'] if start <= s['timestamp'] < end]
+    notes = [n for n in state['notes'].values() if start <= n['created_at'] < end and 'source' not in n]
+    weak_points = [p for p in state['weak_points'] if start <= p['record_time'] < end]
+    log = state['recall_log']
+    codes = [code for code, day in zip(log['codes'], log['days']) if recall_days[0] <= day < recall_days[1]]
+    return {
+        'minutes': sum(s['duration'] for s in sessions),
+        'sessions': len(sessions),
+        'notes': len(notes),
+        'summaries': sum(_has_summary(n) for n in notes),
+        'weak_points': len(weak_points),
+        'recalls': len(codes),
+        'recall_rate': float(RECALL_RETENTION[codes].mean()) if codes else None
+    }
+
+
+def build_report(state: Dict[str, Any], week_start: Optional[str] = None,
+                 now: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+    """根据状态快照生成周报数据（只读取快照，可在任意进程中运行）；
+    now 为学习系统时钟的当前时间，决定默认的周报范围和生成时间"""
+    now = now or SystemClock().now()
+    start, end = week_bounds(week_start, now.date())
+    prev = start - datetime.timedelta(days=7)
+    epoch = datetime.date(1970, 1, 1)
+    start_day, end_day = (start - epoch).days, (end - epoch).days
+    tasks = state['minimal_tasks']
+    if isinstance(tasks, list):
+        tasks = dict(enumerate(tasks))
+    task_names = {int(task_index): task['name'] for task_index, task in tasks.items()}
+    goal = state['goals'].get(state.get('current_goal_id') or "", {}).get('goal')
+
+    this_week = _period_stats(state, start.isoformat(), end.isoformat(), (start_day, end_day))
+    last_week = _period_stats(state, prev.isoformat(), start.isoformat(), (start_day - 7, start_day))
+
+    daily = {(start + datetime.timedelta(days=i)).isoformat(): 0 for i in range(7)}
+    per_task = collections.defaultdict(lambda: {'minutes': 0, 'sessions': 0, 'notes': 0, 'summaries': 0,
+                                                'weak_points': 0, 'scores': []})
+    for session in state['study_sessions']:
+        if start.isoformat() <= session['timestamp'] < end.isoformat():
+            daily[session['timestamp'][:10]] += session['duration']
+            row = per_task[session['task_index']]
+            row['minutes'] += session['duration']
+            row['sessions'] += 1
+    for note in state['notes'].values():
+        # 导入的卡片不算本周的学习产出
+        if start.isoformat() <= note['created_at'] < end.isoformat() and 'source' not in note:
+            row = per_task[note['task_id']]
+            row['notes'] += 1
+            row['summaries'] += _has_summary(note)
+    weak_texts = collections.Counter()
+    for point in state['weak_points']:
+        if start.isoformat() <= point['record_time'] < end.isoformat():
+            row = per_task[point['task_index']]
+            row['weak_points'] += 1
+            row['scores'].append(point['practice_score'])
+            if point['weak_point']:
+                weak_texts[point['weak_point']] += 1
+
+    log = state['recall_log']
+    recall_counts = dict.fromkeys(RECALL_OUTCOMES, 0)
+    for code, day in zip(log['codes'], log['days']):
+        if start_day <= day < end_day:
+            recall_counts[RECALL_OUTCOMES[code]] += 1
+
+    task_rows = []
+    for task_index, row in per_task.items():
+        scores = row.pop('scores')
+        task_rows.append({'task_id': task_index, 'task': task_names.get(task_index, f"已删除的任务 {task_index}"),
+                          **row, 'avg_weak_score': sum(scores) / len(scores) if scores else None})
+    task_rows.sort(key=lambda row: (-row['minutes'], -row['notes'], row['task']))
+    return {
+        'goal': goal,
+        'week_start': start.isoformat(),
+        'week_end': (end - datetime.timedelta(days=1)).isoformat(),
+        'generated_at': now.isoformat(timespec='seconds'),
+        'totals': this_week,
+        'previous': last_week,
+        'daily_minutes': daily,
+        'tasks': task_rows,
+        'recall_counts': recall_counts,
+        'top_weak_points': weak_texts.most_common(TOP_WEAK_POINTS)
+    }
+
+
+def _change(current: Optional[float], previous: Optional[float], percent: bool = False) -> str:
+    if current is None or previous is None:
+        return ""
+    delta = current - previous
+    if not delta:
+        return '<span class="flat">持平</span>'
+    text = f"{delta:+.0%}" if percent else f"{delta:+g}"
+    return f'<span class="{"up" if delta > 0 else "down"}">较上周 {text}</span>'
+
+
+def render_html(report: Dict[str, Any]) -> str:
+    """把周报数据渲染成单个自包含的 HTML 页面（内联样式，无外部资源）"""
+    esc = html.escape
+    totals, previous = report['totals'], report['previous']
+    rate = totals['recall_rate']
+    cards = [
+        ("学习时长", f"{totals['minutes']} 分钟", _change(totals['minutes'], previous['minutes'])),
+        ("学习会话", totals['sessions'], _change(totals['sessions'], previous['sessions'])),
+        ("新笔记", totals['notes'], _change(totals['notes'], previous['notes'])),
+        ("完成总结", f"{totals['summaries']}/{totals['notes']}", ""),
+        ("记忆保持率", f"{rate:.0%}" if rate is not None else "暂无",
+         _change(rate, previous['recall_rate'], percent=True)),
+        ("新增薄弱点", totals['weak_points'], _change(totals['weak_points'], previous['weak_points']))
+    ]
+    card_html = "".join(f'<div class="card"><div class="label">{label}</div><div class="value">{esc(str(value))}</div>'
+                        f'<div class="change">{change}</div></div>' for label, value, change in cards)
+    peak = max(report['daily_minutes'].values()) or 1
+    bars = "".join(f'<div class="bar-row"><span>{day[5:]}</span><div class="bar" style="width:{minutes / peak * 100:.0f}%">'
+                   f'</div><span>{minutes} 分钟</span></div>' for day, minutes in report['daily_minutes'].items())
+    rows = "".join(
+        f"<tr><td>{esc(row['task'])}</td><td>{row['minutes']}</td><td>{row['sessions']}</td><td>{row['notes']}</td>"
+        f"<td>{row['summaries']}</td><td>{row['weak_points']}</td>"
+        f"<td>{'' if row['avg_weak_score'] is None else round(row['avg_weak_score'])}</td></tr>"
+        for row in report['tasks']) or '<tr><td colspan="7">本周没有学习记录</td></tr>'
+    recalls = "、".join(f"{outcome} {count} 次" for outcome, count in report['recall_counts'].items())
+    weak = "".join(f"<li>{esc(text)}（{count} 次）</li>" for text, count in report['top_weak_points']) or "<li>无</li>"
+    title = f"学习周报 {report['week_start']} ~ {report['week_end']}"
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>{esc(title)}</title>
+<style>
+body {{ font-family: -apple-system, "PingFang SC", "Microsoft YaHei", sans-serif; max-width: 960px; margin: 2rem auto; color: #333; }}
+h1 {{ color: #667eea; }}
+.cards {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem; }}
+.card {{ background: #f5f7ff; border-radius: 10px; padding: 1rem; }}
+.label {{ color: #666; font-size: 0.9rem; }}
+.value {{ font-size: 1.6rem; font-weight: bold; }}
+.change {{ font-size: 0.8rem; }}
+.up {{ color: #2e7d32; }} .down {{ color: #c62828; }} .flat {{ color: #888; }}
+.bar-row {{ display: flex; align-items: center; gap: 0.5rem; margin: 0.2rem 0; }}
+.bar-row span:first-child {{ width: 3rem; }}
+.bar {{ background: linear-gradient(90deg, #667eea, #764ba2); height: 14px; border-radius: 7px; min-width: 2px; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ border-bottom: 1px solid #eee; padding: 0.4rem; text-align: left; }}
+</style></head><body>
+<h1>📰 {esc(title)}</h1>
+<p>学习目标：{esc(report['goal'] or '未设定')} · 生成时间：{esc(report['generated_at'])}</p>
+<div class="cards">{card_html}</div>
+<h2>每日学习时长</h2>{bars}
+<h2>各任务</h2>
+<table><tr><th>任务</th><th>时长（分钟）</th><th>会话</th><th>笔记</th><th>总结</th><th>薄弱点</th><th>薄弱点平均分</th></tr>{rows}</table>
+<h2>回忆结果</h2><p>{esc(recalls)}</p>
+<h2>高频薄弱点</h2><ul>{weak}</ul>
+</body></html>
+"""
+
+
+def render_report(state: Dict[str, Any], week_start: Optional[str] = None,
+                  now: Optional[datetime.datetime] = None) -> Tuple[Dict[str, Any], str]:
+    """进程池任务：生成周报数据和 HTML"""
+    report = build_report(state, week_start, now)
+    return report, render_html(report)
+
+
+def write_report(report: Dict[str, Any], page: str, out_dir: str, name: str) -> Dict[str, str]:
+    """把周报写成 <name>-<周一日期>.json / .html，返回文件路径"""
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, f"{name}-{report['week_start']}")
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(f"{base}.html", "w", encoding="utf-8") as f:
+        f.write(page)
+    return {'json': f"{base}.json", 'html': f"{base}.html"}
+
+
+def make_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """周报进程池（spawn 启动，不继承 Streamlit 进程中的线程和锁）"""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def submit_report(pool: ProcessPoolExecutor, study_system, week_start: Optional[str] = None) -> Future:
+    """调用线程只导出状态快照，统计和渲染在进程池中进行；Future 的结果为 (周报数据, HTML)"""
+    return pool.submit(render_report, study_system.export_state(), week_start, study_system.clock.now())
+
+
+def _generate_for_store(state_db: str, out_dir: str, week_start: Optional[str]) -> Dict[str, str]:
+    """批量任务：在子进程中载入一个共享状态库并写出周报"""
+    from app import DeepLearningSystem
+    from state_store import SQLiteStateStore
+    study_system = DeepLearningSystem().attach_store(SQLiteStateStore(state_db))
+    report, page = render_report(study_system.export_state(), week_start, study_system.clock.now())
+    return write_report(report, page, out_dir, os.path.splitext(os.path.basename(state_db))[0])
+
+
+def generate_all(state_dbs: List[str], out_dir: str, week_start: Optional[str] = None,
+                 workers: Optional[int] = None) -> Dict[str, Any]:
+    """为多个用户的状态库并行生成周报，返回 {状态库: 文件路径或错误信息}"""
+    results = {}
+    with make_pool(workers) as pool:
+        futures = {pool.submit(_generate_for_store, path, out_dir, week_start): path for path in state_dbs}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as exc:
+                results[futures[future]] = f"{type(exc).__name__}: {exc}"
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="为一个或多个共享状态库批量生成学习周报（HTML + JSON）")
+    parser.add_argument("state_dbs", nargs="+", help="各用户的状态库（SQLite）路径")
+    parser.add_argument("--out", default="reports", help="输出目录")
+    parser.add_argument("--week", help="周报所在周的任意一天（默认上一个完整的自然周）")
+    parser.add_argument("--workers", type=int, help="进程数（默认 CPU 核数）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = generate_all(args.state_dbs, args.out, args.week, args.workers)
+    failed = 0
+    for path, result in results.items():
+        if isinstance(result, dict):
+            print(f"{path} -> {result['html']}")
+        else:
+            failed += 1
+            print(f"{path} 生成失败：{result}")
+    print(f"共 {len(results)} 份周报，失败 {failed} 份，用时 {time.perf_counter() - start:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()